@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
-from .models import User
+from .models import LoyaltyTransaction, User
 
 
 @admin.register(User)
@@ -86,4 +86,24 @@ class UserAdmin(BaseUserAdmin):
     def full_name(self, obj):
         return obj.full_name
     
-    full_name.short_description = 'Nom complet'
\ No newline at end of file
+    full_name.short_description = 'Nom complet'
+
+
+@admin.register(LoyaltyTransaction)
+class LoyaltyTransactionAdmin(admin.ModelAdmin):
+    """Journal des points (lecture seule : les mouvements ne se modifient pas)"""
+    
+    list_display = ['user', 'points', 'amount', 'reason', 'order', 'created_at']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['user__email', 'order__order_number']
+    list_select_related = ['user', 'order']
+    raw_id_fields = ['user', 'order']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -5,4 +5,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
-    verbose_name = 'Gestion des comptes'
\ No newline at end of file
+    verbose_name = 'Gestion des comptes'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
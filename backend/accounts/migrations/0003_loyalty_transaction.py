@@ -0,0 +1,54 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_opening_balances(apps, schema_editor):
+    """Solde initial : le journal explique les points existants"""
+    User = apps.get_model('accounts', 'User')
+    LoyaltyTransaction = apps.get_model('accounts', 'LoyaltyTransaction')
+    balances = (
+        User.objects.exclude(loyalty_points=0)
+        .values_list('pk', 'loyalty_points', 'total_spent')
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for user_id, points, total_spent in balances:
+        batch.append(LoyaltyTransaction(user_id=user_id, points=points, amount=total_spent, reason='OPENING'))
+        if len(batch) >= 2000:
+            LoyaltyTransaction.objects.bulk_create(batch)
+            batch = []
+    LoyaltyTransaction.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_avatar_variants'),
+        ('orders', '0006_order_id_uuid7'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(verbose_name='Points')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Montant')),
+                ('reason', models.CharField(choices=[('OPENING', 'Solde initial'), ('PURCHASE', 'Achat'), ('ADJUSTMENT', 'Ajustement')], max_length=20, verbose_name='Motif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_transactions', to='orders.order', verbose_name='Commande')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_transactions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Mouvement de points',
+                'verbose_name_plural': 'Mouvements de points',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='loyalty_user_created_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('order__isnull', False)), fields=('order', 'reason'), name='unique_loyalty_order_reason')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,40 @@
 # backend/accounts/models.py
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
 from django.conf import settings
 from django.utils import timezone
 
 
+def loyalty_points_for(amount):
+    """Points gagnés pour un montant dépensé"""
+    return int(amount * settings.POINTS_PER_EURO)
+
+
+def _tiers_by_threshold():
+    """Tiers du plus exigeant au moins exigeant"""
+    return sorted(settings.LOYALTY_TIERS.items(), key=lambda item: item[1]['min_points'], reverse=True)
+
+
+def loyalty_tier_for(points):
+    tiers = _tiers_by_threshold()
+    for tier, config in tiers:
+        if points >= config['min_points']:
+            return tier
+    return tiers[-1][0]
+
+
+def loyalty_tier_case(points):
+    """Même règle que loyalty_tier_for, calculée par la base (CASE) sur une expression"""
+    tiers = _tiers_by_threshold()
+    return Case(
+        *[When(GreaterThanOrEqual(points, config['min_points']), then=Value(tier)) for tier, config in tiers],
+        default=Value(tiers[-1][0]),
+        output_field=models.CharField(),
+    )
+
+
 class UserManager(BaseUserManager):
     """Manager personnalisé pour le modèle User"""
     
@@ -43,6 +73,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     # Avatar
     avatar = models.ImageField('Photo de profil', upload_to='avatars/', null=True, blank=True)
+    avatar_variants = models.JSONField('Variantes de l\'avatar', default=dict, blank=True, editable=False)
     
     # Statut
     is_active = models.BooleanField('Actif', default=True)
@@ -84,6 +115,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        avatar = instance.__dict__.get('avatar')
+        instance._loaded_avatar = getattr(avatar, 'name', avatar)
+        return instance
+    
     @property
     def full_name(self):
         """Retourne le nom complet de l'utilisateur"""
@@ -91,36 +129,109 @@ class User(AbstractBaseUser, PermissionsMixin):
             return f"{self.first_name} {self.last_name}"
         return self.email
     
-    def add_loyalty_points(self, points):
-        """Ajouter des points de fidélité et mettre à jour le tier"""
-        self.loyalty_points += points
-        self.update_loyalty_tier()
-        self.save()
+    def add_loyalty_points(self, points, reason='ADJUSTMENT', order=None):
+        """Ajouter (ou retirer) des points de fidélité, via le journal LoyaltyTransaction"""
+        return self.credit_loyalty(points, reason=reason, order=order)
     
     def update_loyalty_tier(self):
         """Mettre à jour le tier de fidélité basé sur les points"""
-        points = self.loyalty_points
-        
-        if points >= settings.LOYALTY_TIERS['PLATINUM']['min_points']:
-            self.loyalty_tier = 'PLATINUM'
-        elif points >= settings.LOYALTY_TIERS['GOLD']['min_points']:
-            self.loyalty_tier = 'GOLD'
-        elif points >= settings.LOYALTY_TIERS['SILVER']['min_points']:
-            self.loyalty_tier = 'SILVER'
-        else:
-            self.loyalty_tier = 'BRONZE'
+        self.loyalty_tier = loyalty_tier_for(self.loyalty_points)
     
     def get_loyalty_discount(self):
         """Retourne le pourcentage de réduction du tier actuel"""
         return settings.LOYALTY_TIERS[self.loyalty_tier]['discount']
     
-    def record_purchase(self, amount):
-        """Enregistrer un achat"""
-        self.total_purchases += 1
-        self.total_spent += amount
-        
-        # Ajouter des points de fidélité (1 point par euro)
-        points = int(amount * settings.POINTS_PER_EURO)
-        self.add_loyalty_points(points)
+    def record_purchase(self, amount, order=None):
+        """Enregistrer un achat : statistiques et points (POINTS_PER_EURO par euro)"""
+        return self.credit_loyalty(
+            loyalty_points_for(amount),
+            reason='PURCHASE',
+            order=order,
+            amount=amount,
+            purchases=1
+        )
+    
+    def credit_loyalty(self, points, reason, order=None, amount=0, purchases=0):
+        """
+        Une ligne dans le journal + un seul UPDATE du compte : points, tier
+        (CASE sur LOYALTY_TIERS), achats et total dépensé sont calculés par la
+        base à partir des valeurs courantes, donc sans perte sous concurrence.
+        Les champs de l'instance sont ensuite relus : ils reflètent aussi les
+        crédits concurrents.
+        """
+        with transaction.atomic():
+            LoyaltyTransaction.objects.create(
+                user=self,
+                order=order,
+                points=points,
+                amount=amount,
+                reason=reason
+            )
+            new_points = F('loyalty_points') + points
+            User.objects.filter(pk=self.pk).update(
+                loyalty_points=new_points,
+                loyalty_tier=loyalty_tier_case(new_points),
+                total_purchases=F('total_purchases') + purchases,
+                total_spent=F('total_spent') + amount,
+            )
         
-        self.save()
\ No newline at end of file
+        self.refresh_from_db(fields=['loyalty_points', 'loyalty_tier', 'total_purchases', 'total_spent'])
+        return points
+
+
+class LoyaltyTransaction(models.Model):
+    """Journal des points de fidélité (ajout seul : une ligne par mouvement)"""
+    
+    REASON_CHOICES = [
+        ('OPENING', 'Solde initial'),
+        ('PURCHASE', 'Achat'),
+        ('ADJUSTMENT', 'Ajustement'),
+    ]
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='loyalty_transactions',
+        verbose_name='Utilisateur'
+    )
+    
+    # Commande à l'origine des points (un achat n'est crédité qu'une fois)
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='loyalty_transactions',
+        verbose_name='Commande'
+    )
+    
+    points = models.IntegerField('Points')
+    amount = models.DecimalField('Montant', max_digits=10, decimal_places=2, default=0)
+    reason = models.CharField('Motif', max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField('Date', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Mouvement de points'
+        verbose_name_plural = 'Mouvements de points'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'reason'],
+                condition=models.Q(order__isnull=False),
+                name='unique_loyalty_order_reason'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='loyalty_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.points:+d} points - {self.user.email} ({self.get_reason_display()})"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Le journal de fidélité est en ajout seul : créez un mouvement inverse")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Le journal de fidélité est en ajout seul : créez un mouvement inverse")
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from tatlight_backend.images import variant_urls
 
 User = get_user_model()
 
@@ -12,6 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
     
     full_name = serializers.CharField(read_only=True)
     avatar = serializers.ImageField(required=False, allow_null=True)
+    avatar_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = User
@@ -22,6 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name',
             'full_name',
             'avatar',
+            'avatar_variants',
             'loyalty_points',
             'loyalty_tier',
             'total_purchases',
@@ -37,6 +40,10 @@ class UserSerializer(serializers.ModelSerializer):
             'total_spent',
             'date_joined',
         ]
+    
+    def get_avatar_variants(self, obj):
+        """Miniatures de l'avatar (vide tant qu'elles ne sont pas générées)"""
+        return variant_urls(obj.avatar_variants, self.context.get('request'))
 
 
 class RegisterSerializer(serializers.ModelSerializer):
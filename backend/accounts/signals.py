@@ -0,0 +1,23 @@
+# backend/accounts/signals.py
+"""
+Signaux de l'application comptes
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from tatlight_backend.images import schedule_image_variants
+
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    """Générer les miniatures de l'avatar quand il change"""
+    if raw:
+        return
+
+    if instance.avatar and instance.avatar.name != getattr(instance, '_loaded_avatar', None):
+        schedule_image_variants(instance, 'avatar', 'avatar_variants')
+
+    instance._loaded_avatar = instance.avatar.name if instance.avatar else None
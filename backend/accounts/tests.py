@@ -1,3 +1,34 @@
+# backend/accounts/tests.py
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from .models import LoyaltyTransaction, User, loyalty_tier_case, loyalty_tier_for
+
+
+class LoyaltyTests(TestCase):
+    """Crédit de points : journal + un UPDATE, tier calculé par la base (CASE)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='fidele@example.com', password='x')
+
+    def test_case_matches_python_rule_at_every_threshold(self):
+        for points in (0, 99, 100, 499, 500, 999, 1000, 5000):
+            User.objects.filter(pk=self.user.pk).update(loyalty_points=points, loyalty_tier=loyalty_tier_case(points))
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.loyalty_tier, loyalty_tier_for(points), points)
+
+    def test_record_purchase_updates_ledger_and_account(self):
+        self.user.record_purchase(Decimal('120.50'))
+        self.assertEqual(
+            (self.user.loyalty_points, self.user.loyalty_tier, self.user.total_purchases, self.user.total_spent),
+            (120, 'SILVER', 1, Decimal('120.50'))
+        )
+        entry = LoyaltyTransaction.objects.get(user=self.user)
+        self.assertEqual((entry.points, entry.reason, entry.amount), (120, 'PURCHASE', Decimal('120.50')))
+
+    def test_instance_reflects_concurrent_credits(self):
+        # Une autre copie du compte (autre requête) crédite entre-temps
+        User.objects.get(pk=self.user.pk).credit_loyalty(450, reason='ADJUSTMENT')
+        self.user.record_purchase(Decimal('60'))
+        self.assertEqual((self.user.loyalty_points, self.user.loyalty_tier), (510, 'GOLD'))
@@ -7,6 +7,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 
+from tatlight_backend.conditional import conditional_view
+
 from .serializers import (
     RegisterSerializer,
     UserSerializer,
@@ -18,6 +20,15 @@ from .serializers import (
 User = get_user_model()
 
 
+def profile_validators(view, request, *args, **kwargs):
+    """
+    Le profil est déjà chargé par l'authentification JWT : l'ETag est calculé
+    à partir des champs exposés, sans requête ni sérialisation
+    """
+    user = request.user
+    return [str(getattr(user, name, '')) for name in UserSerializer.Meta.fields], None
+
+
 class RegisterView(generics.CreateAPIView):
     """
     API endpoint pour l'inscription d'un nouvel utilisateur
@@ -92,6 +103,7 @@ class ProfileView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional_view(profile_validators)
     def get(self, request):
         serializer = UserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
@@ -0,0 +1,190 @@
+# backend/orders/download_log.py
+"""
+Journalisation bufferisée des téléchargements
+
+Chaque téléchargement ajoute un événement dans un buffer en mémoire (par
+processus) ; le buffer est écrit en base par lots (bulk_create) dès qu'il
+atteint DOWNLOAD_LOG_BATCH_SIZE ou toutes les DOWNLOAD_LOG_FLUSH_INTERVAL
+secondes.
+
+Chaque événement est aussi ajouté à un fichier de spool local (JSON lines)
+avant d'être bufferisé. Le fichier est supprimé une fois son lot écrit en
+base : si le worker meurt avant, `manage.py replay_download_spool` rejoue
+les fichiers restants (livraison "au moins une fois").
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.models import Product
+from tatlight_backend.tasks import run_in_background
+
+from .models import Download, Order
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = '.jsonl'
+
+
+def events_to_downloads(events):
+    """
+    Instances Download à partir des événements ; ignore ceux dont l'utilisateur,
+    la commande ou le produit a disparu (une seule clé étrangère invalide ferait
+    échouer tout le lot, à chaque replay)
+    """
+    user_ids = {event['user_id'] for event in events}
+    order_ids = {event['order_id'] for event in events}
+    product_ids = {event['product_id'] for event in events}
+    existing_users = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    existing_orders = {str(pk) for pk in Order.objects.filter(pk__in=order_ids).values_list('pk', flat=True)}
+    existing_products = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+    return [
+        Download(
+            user_id=event['user_id'],
+            product_id=event['product_id'],
+            order_id=event['order_id'],
+            ip_address=event['ip_address'],
+            downloaded_at=parse_datetime(event['downloaded_at']),
+        )
+        for event in events
+        if event['user_id'] in existing_users
+        and event['order_id'] in existing_orders
+        and event['product_id'] in existing_products
+    ]
+
+
+def read_spool_file(path):
+    """Événements d'un fichier de spool (une dernière ligne tronquée est ignorée)"""
+    events = []
+    with open(path, encoding='utf-8') as spool:
+        for line in spool:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning("Ligne de spool illisible ignorée dans %s", path)
+    return events
+
+
+class DownloadLogBuffer:
+    """Buffer des téléchargements d'un processus"""
+
+    def __init__(self, spool_dir, batch_size, flush_interval):
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = []
+        self.spool = None
+        self.flush_scheduled = False
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    def _open_spool(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        name = f'downloads-{self.pid}-{uuid.uuid4().hex}{SPOOL_SUFFIX}'
+        # Mode append non bufferisé : chaque ligne est confiée à l'OS immédiatement
+        return open(os.path.join(self.spool_dir, name), 'ab', buffering=0)
+
+    def append(self, event):
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+        with self.lock:
+            if self.spool is None:
+                self.spool = self._open_spool()
+            self.spool.write(line)
+            self.events.append(event)
+
+            should_flush = len(self.events) >= self.batch_size and not self.flush_scheduled
+            if should_flush:
+                self.flush_scheduled = True
+
+        self._ensure_timer()
+        if should_flush:
+            run_in_background(self.flush)
+
+    def _take(self):
+        """Détacher le lot courant et son fichier de spool"""
+        with self.lock:
+            events, spool = self.events, self.spool
+            self.events, self.spool = [], None
+            self.flush_scheduled = False
+            self.last_flush = time.monotonic()
+        if spool is not None:
+            spool.close()
+        return events, spool
+
+    def flush(self):
+        events, spool = self._take()
+        if not events:
+            return 0
+
+        try:
+            Download.objects.bulk_create(events_to_downloads(events), batch_size=self.batch_size)
+        except Exception:
+            # Le fichier de spool est conservé pour replay_download_spool
+            logger.exception("Échec de l'écriture de %d téléchargement(s), conservés dans %s", len(events), spool.name)
+            return 0
+
+        os.remove(spool.name)
+        return len(events)
+
+    def _ensure_timer(self):
+        if self.timer is not None:
+            return
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Thread(target=self._run_timer, name='download-log-flush', daemon=True)
+                self.timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self.events and time.monotonic() - self.last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                finally:
+                    close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Buffer du processus courant (recréé après un fork)"""
+    global _buffer
+    if _buffer is None or _buffer.pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is None or _buffer.pid != os.getpid():
+                _buffer = DownloadLogBuffer(
+                    spool_dir=settings.DOWNLOAD_LOG_SPOOL_DIR,
+                    batch_size=settings.DOWNLOAD_LOG_BATCH_SIZE,
+                    flush_interval=settings.DOWNLOAD_LOG_FLUSH_INTERVAL,
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_download(user_id, product_id, order_id, ip_address=None):
+    """Enregistrer un téléchargement sans écrire en base sur le chemin de la requête"""
+    buffer = get_buffer()
+    buffer.append({
+        'user_id': user_id,
+        'product_id': product_id,
+        'order_id': str(order_id),
+        'ip_address': ip_address,
+        'downloaded_at': timezone.now().isoformat(),
+    })
+    if settings.BACKGROUND_TASKS_EAGER:
+        buffer.flush()
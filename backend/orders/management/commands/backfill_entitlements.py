@@ -0,0 +1,44 @@
+# backend/orders/management/commands/backfill_entitlements.py
+"""
+Construire la table Entitlement à partir des commandes terminées existantes
+Usage: python manage.py backfill_entitlements [--batch-size 1000]
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Entitlement, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Crée les accès produits (Entitlement) des commandes terminées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        rows = (
+            OrderItem.objects
+            .filter(order__status='COMPLETED')
+            .order_by('order__created_at', 'pk')
+            .values_list('order__user_id', 'product_id', 'order_id')
+            .iterator(chunk_size=batch_size)
+        )
+
+        batch = []
+        processed = 0
+        for user_id, product_id, order_id in rows:
+            batch.append(Entitlement(user_id=user_id, product_id=product_id, order_id=order_id))
+            if len(batch) >= batch_size:
+                Entitlement.objects.bulk_create(batch, ignore_conflicts=True)
+                processed += len(batch)
+                batch = []
+
+        if batch:
+            Entitlement.objects.bulk_create(batch, ignore_conflicts=True)
+            processed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {processed} article(s) traité(s), {Entitlement.objects.count()} accès au total"
+        ))
@@ -0,0 +1,207 @@
+# backend/orders/management/commands/benchmark_indexes.py
+"""
+Comparer les plans d'exécution des requêtes fréquentes avec et sans les index
+Usage: python manage.py benchmark_indexes [--orders 200000] [--products 20000] [--runs 5]
+
+Les données sont générées dans une transaction annulée à la fin, et les index
+sont supprimés puis restaurés par ce même rollback : la base est inchangée.
+Sur PostgreSQL, DROP INDEX verrouille les tables jusqu'à la fin : à lancer
+sur une copie de la base (refusé hors DEBUG sans --force).
+"""
+
+import random
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import User
+from orders.models import Order
+from products.models import Category, Product
+
+# Index comparés (Meta.indexes des modèles)
+BENCHMARKED_INDEXES = {
+    Order: ('order_user_status_idx', 'order_completed_created_idx', 'order_transaction_ref_idx'),
+    Product: ('product_active_created_idx', 'product_active_sales_idx', 'product_active_price_idx'),
+}
+
+SEED_BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def without_auto_now_add(model):
+    """Dates de création aléatoires pour le jeu de données (auto_now_add désactivé)"""
+    field = model._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def hot_queries(sample):
+    """(libellé, queryset) des requêtes à comparer, sur des valeurs du jeu généré"""
+    now = timezone.now()
+    return [
+        (
+            "Commandes terminées d'un client (mes commandes, statistiques)",
+            Order.objects.filter(user_id=sample['user_id'], status='COMPLETED').order_by('-created_at')[:20],
+        ),
+        (
+            "Chiffre d'affaires par jour sur 30 jours (dashboard admin)",
+            Order.objects.filter(status='COMPLETED', created_at__gte=now - timedelta(days=30))
+            .annotate(day=TruncDate('created_at')).values('day').annotate(total=Sum('total')).order_by('day'),
+        ),
+        (
+            "Commande par référence de transaction (vérification, webhooks)",
+            Order.objects.filter(transaction_ref=sample['transaction_ref']),
+        ),
+        (
+            "Catalogue, plus récents",
+            Product.objects.filter(is_active=True).order_by('-created_at', '-pk')[:20],
+        ),
+        (
+            "Catalogue, meilleures ventes",
+            Product.objects.filter(is_active=True).order_by('-sales_count', '-pk')[:20],
+        ),
+        (
+            "Catalogue, prix croissant",
+            Product.objects.filter(is_active=True).order_by('price', 'pk')[:20],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare les plans EXPLAIN des requêtes fréquentes avec et sans index, sur un jeu généré"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200000)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--runs', type=int, default=5, help='Exécutions par requête (médiane)')
+        parser.add_argument('--force', action='store_true', help='Autoriser hors DEBUG')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Hors DEBUG, lancez ce benchmark sur une copie de la base avec --force")
+
+        self.runs = options['runs']
+        try:
+            with transaction.atomic():
+                sample = self.seed(options['users'], options['products'], options['orders'])
+                self.analyze()
+                queries = hot_queries(sample)
+
+                with_indexes = [self.measure(queryset) for _, queryset in queries]
+                self.drop_indexes()
+                self.analyze()
+                without_indexes = [self.measure(queryset) for _, queryset in queries]
+
+                for (label, _), before, after in zip(queries, without_indexes, with_indexes):
+                    self.report(label, before, after)
+
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark terminé (données et index restaurés)"))
+
+    def seed(self, user_count, product_count, order_count):
+        started = time.monotonic()
+        now = timezone.now()
+        run = uuid.uuid4().hex[:8]
+
+        users = User.objects.bulk_create(
+            [User(email=f'bench-{run}-{i}@example.invalid', password='!') for i in range(user_count)],
+            batch_size=SEED_BATCH_SIZE
+        )
+        user_ids = [user.pk for user in users]
+
+        category = Category.objects.first()
+        if category is None:
+            category = Category.objects.create(name=Category._meta.get_field('name').choices[0][0])
+
+        with without_auto_now_add(Product):
+            for start in range(0, product_count, SEED_BATCH_SIZE):
+                Product.objects.bulk_create([
+                    Product(
+                        title=f'Produit {i}',
+                        slug=f'bench-{run}-{i}',
+                        description='',
+                        category=category,
+                        file_type='pdf',
+                        price=Decimal(random.randint(100, 10000)) / 100,
+                        sales_count=random.randint(0, 500),
+                        is_active=random.random() < 0.8,
+                        created_at=now - timedelta(minutes=random.randint(0, 60 * 24 * 730)),
+                    )
+                    for i in range(start, min(start + SEED_BATCH_SIZE, product_count))
+                ])
+
+        statuses = ['COMPLETED'] * 6 + ['PENDING', 'FAILED', 'REFUNDED']
+        transaction_ref = None
+        with without_auto_now_add(Order):
+            for start in range(0, order_count, SEED_BATCH_SIZE):
+                orders = []
+                for i in range(start, min(start + SEED_BATCH_SIZE, order_count)):
+                    amount = Decimal(random.randint(100, 10000)) / 100
+                    transaction_ref = f'BENCH-{run}-{i}'
+                    orders.append(Order(
+                        order_number=f'BENCH-{run}-{i}',
+                        user_id=random.choice(user_ids),
+                        subtotal=amount,
+                        total=amount,
+                        status=random.choice(statuses),
+                        transaction_ref=transaction_ref,
+                        created_at=now - timedelta(minutes=random.randint(0, 60 * 24 * 730)),
+                    ))
+                Order.objects.bulk_create(orders)
+
+        self.stdout.write(
+            f"Jeu généré : {user_count} utilisateurs, {product_count} produits, "
+            f"{order_count} commandes en {time.monotonic() - started:.1f}s"
+        )
+        return {'user_id': random.choice(user_ids), 'transaction_ref': transaction_ref}
+
+    def analyze(self):
+        """Statistiques à jour pour le planificateur"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def drop_indexes(self):
+        # SQL direct : le schema editor SQLite refuse de s'ouvrir dans une transaction
+        with connection.cursor() as cursor:
+            for names in BENCHMARKED_INDEXES.values():
+                for name in names:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+
+    def measure(self, queryset):
+        """(plan, médiane en ms)"""
+        plan = queryset.explain()
+        durations = []
+        for _ in range(self.runs):
+            started = time.perf_counter()
+            list(queryset.all())
+            durations.append((time.perf_counter() - started) * 1000)
+        return plan, statistics.median(durations)
+
+    def report(self, label, before, after):
+        (plan_before, ms_before), (plan_after, ms_after) = before, after
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+        self.stdout.write(f"  Sans index : {ms_before:.2f} ms")
+        self.stdout.write('    ' + plan_before.replace('\n', '\n    '))
+        self.stdout.write(f"  Avec index : {ms_after:.2f} ms")
+        self.stdout.write('    ' + plan_after.replace('\n', '\n    '))
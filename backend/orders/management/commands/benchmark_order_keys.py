@@ -0,0 +1,112 @@
+# backend/orders/management/commands/benchmark_order_keys.py
+"""
+Comparer le débit d'insertion avec des clés uuid4 (aléatoires) et UUIDv7 (ordonnées)
+Usage: python manage.py benchmark_order_keys [--rows 200000] [--batch-size 2000]
+
+Deux tables temporaires reproduisent Order (clé primaire UUID) et OrderItem
+(clé étrangère indexée vers la commande). Les mêmes lignes y sont insérées
+par lots, seule la génération de la clé change. Le débit de la fin du
+remplissage montre l'effet de la taille des index sur les clés aléatoires.
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from orders.models import Order
+from tatlight_backend.ids import uuid7
+
+KEY_SCHEMES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+# Part finale du remplissage mesurée séparément
+TAIL_FRACTION = 0.1
+
+
+class Command(BaseCommand):
+    help = "Compare le débit d'insertion des commandes avec des clés uuid4 et UUIDv7"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Commandes insérées par schéma')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pk_field = Order._meta.pk
+        self.key_type = pk_field.db_type(connection)
+        self.prepare = lambda value: pk_field.get_db_prep_value(value, connection)
+
+        for name, generate in KEY_SCHEMES.items():
+            self.create_tables(name)
+            try:
+                total, tail, size = self.fill(name, generate, options['rows'], options['batch_size'])
+            finally:
+                self.drop_tables(name)
+
+            line = (
+                f"{name} : {options['rows'] / total:,.0f} commandes/s au total, "
+                f"{tail:,.0f}/s sur les derniers {TAIL_FRACTION:.0%} ({total:.1f}s)"
+            )
+            if size is not None:
+                line += f", index des clés {size / 1024 / 1024:.1f} Mo"
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark terminé (tables temporaires supprimées)"))
+
+    def table_names(self, name):
+        return f'bench_order_{name}', f'bench_item_{name}'
+
+    def create_tables(self, name):
+        orders, items = self.table_names(name)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {quote(orders)} ('
+                f'id {self.key_type} PRIMARY KEY, total DECIMAL(10, 2) NOT NULL, status VARCHAR(20) NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {quote(items)} ('
+                f'order_id {self.key_type} NOT NULL, product_id INTEGER NOT NULL, price DECIMAL(10, 2) NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX {quote(items + "_order_idx")} ON {quote(items)} (order_id)')
+
+    def drop_tables(self, name):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for table in self.table_names(name):
+                cursor.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+
+    def fill(self, name, generate, rows, batch_size):
+        """(durée totale, débit de la fin, taille de l'index de clé primaire ou None)"""
+        orders, items = self.table_names(name)
+        quote = connection.ops.quote_name
+        insert_order = f'INSERT INTO {quote(orders)} (id, total, status) VALUES (%s, %s, %s)'
+        insert_item = f'INSERT INTO {quote(items)} (order_id, product_id, price) VALUES (%s, %s, %s)'
+        tail_start = rows - int(rows * TAIL_FRACTION)
+
+        started = time.perf_counter()
+        tail_started = None
+        inserted = 0
+        while inserted < rows:
+            count = min(batch_size, rows - inserted)
+            if tail_started is None and inserted + count > tail_start:
+                tail_started, tail_rows = time.perf_counter(), rows - inserted
+
+            keys = [self.prepare(generate()) for _ in range(count)]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(insert_order, [(key, '9.99', 'PENDING') for key in keys])
+                cursor.executemany(insert_item, [(key, index % 500, '9.99') for index, key in enumerate(keys)])
+            inserted += count
+
+        finished = time.perf_counter()
+        return finished - started, tail_rows / (finished - tail_started), self.index_size(orders)
+
+    def index_size(self, table):
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_relation_size(%s)', [f'{table}_pkey'])
+            return cursor.fetchone()[0]
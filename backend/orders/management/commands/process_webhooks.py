@@ -0,0 +1,42 @@
+# backend/orders/management/commands/process_webhooks.py
+"""
+Traiter la boîte de réception des webhooks (WebhookEvent)
+Usage: python manage.py process_webhooks [--batch-size 100] [--max-attempts 8]
+       python manage.py process_webhooks --loop [--interval 2]   # worker permanent
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Traite les webhooks reçus par lots, avec reprises et backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--loop', action='store_true', help='Tourner en continu')
+        parser.add_argument('--interval', type=float, default=2, help='Attente quand la file est vide (s)')
+
+    def handle(self, *args, **options):
+        total = {}
+        while True:
+            counts = process_pending_events(options['batch_size'], options['max_attempts'])
+            for key, value in counts.items():
+                total[key] = total.get(key, 0) + value
+
+            if counts:
+                self.stdout.write(', '.join(f"{key}: {value}" for key, value in sorted(counts.items())))
+                continue  # lot plein ou non : on revide la file avant d'attendre
+
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+        summary = ', '.join(f"{key}: {value}" for key, value in sorted(total.items())) or 'rien à traiter'
+        self.stdout.write(self.style.SUCCESS(f"✅ Webhooks : {summary}"))
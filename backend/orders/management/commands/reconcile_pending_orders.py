@@ -0,0 +1,164 @@
+# backend/orders/management/commands/reconcile_pending_orders.py
+"""
+Réconcilier les commandes PENDING abandonnées avec Flutterwave
+Usage: python manage.py reconcile_pending_orders [--older-than 1500] [--batch-size 200] [--workers 8]
+       python manage.py reconcile_pending_orders --delete      # supprimer au lieu de passer en FAILED
+       python manage.py reconcile_pending_orders --dry-run
+
+Les commandes en attente depuis plus de --older-than minutes sont parcourues
+par lots (pagination par curseur sur created_at, pk) et vérifiées auprès du
+prestataire en parallèle (pool de threads borné, cache des vérifications).
+Payées : terminées par complete_order, comme un webhook. Échouées, annulées
+ou inconnues du prestataire : passées en FAILED (ou supprimées) par lot.
+Encore en attente chez le prestataire, prestataire indisponible ou autre
+erreur : laissées pour le prochain passage.
+
+Par défaut, seules les commandes plus anciennes que la durée de validité du
+lien de paiement (FLUTTERWAVE_PAYMENT_LINK_LIFETIME) sont fermées : le client
+ne peut plus payer. Une commande FAILED sans paiement reste de toute façon
+terminable par un paiement tardif (orders.services.is_completable) ; une
+commande supprimée (--delete) ne l'est plus. Chaque opération ne touche que des commandes
+encore PENDING : la commande peut tourner en tâche planifiée.
+
+Un seul passage à la fois, toutes machines confondues (tatlight_backend.locks :
+verrou consultatif PostgreSQL, sinon cache partagé obligatoire).
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.models import Order
+from orders.services import complete_order, payment_covers_order
+from payments.flutterwave import GatewayError, GatewayUnavailable, get_client
+from payments.verification import FINAL_STATUSES, verify_transaction
+from tatlight_backend.locks import exclusive_lock
+from tatlight_backend.pagination import keyset_filter
+
+LOCK_NAME = 'orders:reconcile_pending_orders'
+LOCK_TIMEOUT = 60 * 60
+
+# Marge après l'expiration du lien de paiement (minutes)
+LINK_EXPIRY_MARGIN = 60
+
+# Réponse de Flutterwave pour une référence jamais utilisée
+UNKNOWN_TRANSACTION_STATUSES = {400, 404}
+UNKNOWN_TRANSACTION_MESSAGE = 'no transaction was found'
+
+PAID = 'payées'
+ABANDONED = 'abandonnées'
+STILL_PENDING = 'en attente'
+UNAVAILABLE = 'non vérifiées'
+
+
+def verify(order):
+    """(commande, résultat, données de la transaction) ; appelé dans un thread du pool"""
+    if not order.transaction_ref:
+        return order, ABANDONED, {}
+    try:
+        data = verify_transaction(order.transaction_ref)
+    except GatewayUnavailable:
+        return order, UNAVAILABLE, {}
+    except GatewayError as exc:
+        # Transaction inconnue : lien de paiement jamais utilisé. Toute autre
+        # erreur (401/403 : clé invalide...) ne dit rien de la commande.
+        if (exc.status_code in UNKNOWN_TRANSACTION_STATUSES
+                and UNKNOWN_TRANSACTION_MESSAGE in str(exc).lower()):
+            return order, ABANDONED, {}
+        return order, UNAVAILABLE, {}
+
+    if payment_covers_order(order, data):
+        return order, PAID, data
+    if data.get('status') in FINAL_STATUSES:
+        return order, ABANDONED, data
+    return order, STILL_PENDING, data
+
+
+class Command(BaseCommand):
+    help = "Vérifie les commandes PENDING anciennes auprès de Flutterwave et nettoie les abandonnées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int,
+            default=settings.FLUTTERWAVE_PAYMENT_LINK_LIFETIME + LINK_EXPIRY_MARGIN,
+            help='Âge minimum (minutes), par défaut après expiration du lien de paiement'
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8, help='Vérifications simultanées')
+        parser.add_argument('--delete', action='store_true', help='Supprimer les commandes abandonnées')
+        parser.add_argument('--dry-run', action='store_true', help='Vérifier sans rien modifier')
+
+    def handle(self, *args, **options):
+        try:
+            with exclusive_lock(LOCK_NAME, LOCK_TIMEOUT) as acquired:
+                if not acquired:
+                    self.stdout.write(self.style.WARNING("Une réconciliation est déjà en cours"))
+                    return
+                counts, elapsed = self.reconcile(options)
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        checked = sum(counts.values())
+        rate = checked / elapsed if elapsed else 0
+        summary = ', '.join(f"{label}: {count}" for label, count in counts.items())
+        action = ' (simulation)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {checked} commande(s) vérifiée(s) en {elapsed:.1f}s ({rate:.0f}/s){action} — {summary}"
+        ))
+
+    def reconcile(self, options):
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        queryset = (
+            Order.objects
+            .filter(status='PENDING', created_at__lt=cutoff)
+            .only('id', 'status', 'total', 'transaction_ref', 'created_at')
+            .order_by('created_at', 'pk')
+        )
+        counts = {PAID: 0, ABANDONED: 0, STILL_PENDING: 0, UNAVAILABLE: 0}
+        breaker = get_client().breaker
+        cursor = None
+
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='reconcile') as executor:
+            while True:
+                batch = queryset
+                if cursor is not None:
+                    batch = keyset_filter(batch, 'created_at', False, *cursor)
+                batch = list(batch[:options['batch_size']])
+                if not batch:
+                    break
+                cursor = (batch[-1].created_at, batch[-1].pk)
+
+                abandoned = []
+                for order, outcome, data in executor.map(verify, batch):
+                    counts[outcome] += 1
+                    if outcome == ABANDONED:
+                        abandoned.append(order.pk)
+                    elif outcome == PAID and not options['dry_run']:
+                        complete_order(order, data.get('payment_type') or 'flutterwave', payment_id=data.get('id') or '')
+
+                if abandoned and not options['dry_run']:
+                    self.close_abandoned(abandoned, options['delete'])
+
+                self.stdout.write(', '.join(f"{label}: {count}" for label, count in counts.items()))
+
+                if breaker.state == breaker.OPEN:
+                    self.stdout.write(self.style.WARNING(
+                        "Flutterwave indisponible (circuit ouvert) : arrêt, reprise au prochain passage"
+                    ))
+                    break
+
+        return counts, time.monotonic() - started
+
+    def close_abandoned(self, order_ids, delete):
+        """Un seul UPDATE (ou DELETE) par lot, limité aux commandes encore PENDING"""
+        abandoned = Order.objects.filter(pk__in=order_ids, status='PENDING')
+        if delete:
+            abandoned.delete()
+        else:
+            abandoned.update(status='FAILED', updated_at=timezone.now())
@@ -0,0 +1,56 @@
+# backend/orders/management/commands/replay_download_spool.py
+"""
+Rejouer les fichiers de spool des téléchargements non écrits en base
+(worker arrêté avant le flush de son buffer, base indisponible...)
+Usage: python manage.py replay_download_spool [--min-age 60] [--dry-run]
+"""
+
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.download_log import SPOOL_SUFFIX, events_to_downloads, read_spool_file
+from orders.models import Download
+
+
+class Command(BaseCommand):
+    help = "Écrit en base les téléchargements restés dans les fichiers de spool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help="Ignorer les fichiers modifiés il y a moins de N secondes (buffers encore actifs)"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        pattern = os.path.join(settings.DOWNLOAD_LOG_SPOOL_DIR, f'*{SPOOL_SUFFIX}')
+        cutoff = time.time() - options['min_age']
+
+        files = replayed = 0
+        for path in sorted(glob.glob(pattern)):
+            if os.path.getmtime(path) > cutoff:
+                continue
+
+            events = read_spool_file(path)
+            downloads = events_to_downloads(events) if events else []
+            files += 1
+            replayed += len(downloads)
+
+            if options['dry_run']:
+                self.stdout.write(f"{path}: {len(downloads)} téléchargement(s)")
+                continue
+
+            with transaction.atomic():
+                Download.objects.bulk_create(downloads, batch_size=options['batch_size'])
+            os.remove(path)
+
+        action = 'à rejouer' if options['dry_run'] else 'rejoué(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {replayed} téléchargement(s) {action} depuis {files} fichier(s)"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        ('products', '0003_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granted_at', models.DateTimeField(auto_now_add=True, verbose_name='Accordé le')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='orders.order', verbose_name='Commande')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='products.product', verbose_name='Produit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Accès produit',
+                'verbose_name_plural': 'Accès produits',
+                'constraints': [models.UniqueConstraint(fields=('user', 'product'), name='unique_entitlement_user_product')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_download_downloaded_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='transaction_ref',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Référence de transaction'),
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=30, verbose_name='Prestataire')),
+                ('event_id', models.CharField(max_length=100, verbose_name="ID de l'événement")),
+                ('event_type', models.CharField(blank=True, max_length=100, verbose_name='Type')),
+                ('payload', models.JSONField(verbose_name='Contenu')),
+                ('status', models.CharField(choices=[('PENDING', 'À traiter'), ('PROCESSED', 'Traité'), ('IGNORED', 'Ignoré'), ('FAILED', 'Échec définitif')], default='PENDING', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Reçu le')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Traité le')),
+            ],
+            options={
+                'verbose_name': 'Événement webhook',
+                'verbose_name_plural': 'Événements webhook',
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webhook_event_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id'), name='unique_webhook_event')],
+            },
+        ),
+    ]
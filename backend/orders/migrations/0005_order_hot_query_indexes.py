@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+from tatlight_backend.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('orders', '0004_webhook_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'COMPLETED')), fields=['created_at'], name='order_completed_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['transaction_ref'], name='order_transaction_ref_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-18 14:21
+
+import tatlight_backend.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='id',
+            field=models.UUIDField(default=tatlight_backend.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -1,7 +1,18 @@
 # backend/orders/models.py
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-import uuid
+from django.utils import timezone
+
+from tatlight_backend.ids import uuid7, uuid7_datetime
+
+
+def order_number_for(order_id):
+    """
+    Numéro lisible dérivé de l'identifiant : date (heure locale) du UUIDv7
+    + 8 derniers caractères hexadécimaux de sa partie aléatoire
+    """
+    created = uuid7_datetime(order_id) or timezone.now()
+    return f"TAT-{timezone.localtime(created):%Y%m%d%H%M%S}-{order_id.hex[-8:].upper()}"
 
 
 class Order(models.Model):
@@ -16,7 +27,8 @@ class Order(models.Model):
     ]
     
     # Identifiants
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # UUIDv7 : clés croissantes, insertions en fin d'index (les anciens uuid4 restent valides)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     order_number = models.CharField('Numéro de commande', max_length=50, unique=True)
     
     # Utilisateur
@@ -38,6 +50,7 @@ class Order(models.Model):
     # Paiement
     payment_method = models.CharField('Méthode de paiement', max_length=50, blank=True)
     payment_id = models.CharField('ID de paiement', max_length=255, blank=True)
+    transaction_ref = models.CharField('Référence de transaction', max_length=100, blank=True)
     
     # Points de fidélité gagnés
     loyalty_points_earned = models.IntegerField('Points gagnés', default=0)
@@ -51,16 +64,31 @@ class Order(models.Model):
         verbose_name = 'Commande'
         verbose_name_plural = 'Commandes'
         ordering = ['-created_at']
+        indexes = [
+            # Commandes d'un client (statistiques, mes commandes, achats)
+            models.Index(fields=['user', 'status', '-created_at'], name='order_user_status_idx'),
+            # Chiffre d'affaires par période (dashboard admin)
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='COMPLETED'),
+                name='order_completed_created_idx'
+            ),
+            # Vérification des paiements et webhooks
+            models.Index(fields=['transaction_ref'], name='order_transaction_ref_idx'),
+        ]
     
     def __str__(self):
         return f"Commande #{self.order_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Générer un numéro de commande unique
-            import datetime
-            timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-            self.order_number = f"TAT-{timestamp}-{str(uuid.uuid4())[:8].upper()}"
+            self.order_number = order_number_for(self.id)
         super().save(*args, **kwargs)
 
 
@@ -114,7 +142,8 @@ class Download(models.Model):
         verbose_name='Commande'
     )
     
-    downloaded_at = models.DateTimeField('Téléchargé le', auto_now_add=True)
+    # Pas d'auto_now_add : les événements bufferisés (orders.download_log) gardent leur heure
+    downloaded_at = models.DateTimeField('Téléchargé le', default=timezone.now)
     ip_address = models.GenericIPAddressField('Adresse IP', null=True, blank=True)
     
     class Meta:
@@ -123,4 +152,134 @@ class Download(models.Model):
         ordering = ['-downloaded_at']
     
     def __str__(self):
-        return f"{self.user.email} - {self.product.title}"
\ No newline at end of file
+        return f"{self.user.email} - {self.product.title}"
+
+
+class EntitlementManager(models.Manager):
+    """Manager des droits d'accès aux produits"""
+    
+    def grant_for_order(self, order):
+        """Donner accès aux produits d'une commande terminée"""
+        product_ids = order.items.values_list('product_id', flat=True)
+        return self.bulk_create(
+            [
+                self.model(user_id=order.user_id, product_id=product_id, order=order)
+                for product_id in product_ids
+            ],
+            ignore_conflicts=True
+        )
+    
+    def revoke_for_order(self, order):
+        """
+        Retirer l'accès aux produits d'une commande (remboursement). Un accès
+        est rattaché à la première commande qui l'a accordé : les produits
+        encore achetés par une autre commande terminée lui sont rattachés.
+        """
+        with transaction.atomic():
+            revoked = self.filter(order=order)
+            product_ids = list(revoked.values_list('product_id', flat=True))
+            deleted, _ = revoked.delete()
+            if not product_ids:
+                return deleted
+
+            still_owned = dict(
+                OrderItem.objects
+                .filter(order__user_id=order.user_id, order__status='COMPLETED', product_id__in=product_ids)
+                .exclude(order_id=order.pk)
+                .order_by('-order__created_at')
+                .values_list('product_id', 'order_id')
+            )
+            self.bulk_create(
+                [
+                    self.model(user_id=order.user_id, product_id=product_id, order_id=order_id)
+                    for product_id, order_id in still_owned.items()
+                ],
+                ignore_conflicts=True
+            )
+        return deleted - len(still_owned)
+    
+    def owned_product_ids(self, user):
+        """Ids des produits possédés par un utilisateur"""
+        return set(self.filter(user=user).values_list('product_id', flat=True))
+
+
+class Entitlement(models.Model):
+    """Produits possédés par un utilisateur (index des achats terminés)"""
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='entitlements',
+        verbose_name='Utilisateur'
+    )
+    
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='entitlements',
+        verbose_name='Produit'
+    )
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='entitlements',
+        verbose_name='Commande'
+    )
+    
+    granted_at = models.DateTimeField('Accordé le', auto_now_add=True)
+    
+    objects = EntitlementManager()
+    
+    class Meta:
+        verbose_name = 'Accès produit'
+        verbose_name_plural = 'Accès produits'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_entitlement_user_product'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.product.title}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Boîte de réception des webhooks des prestataires de paiement.
+    Le webhook ne fait qu'insérer l'événement brut ; la commande
+    process_webhooks le traite ensuite (avec reprises).
+    """
+    
+    STATUS_CHOICES = [
+        ('PENDING', 'À traiter'),
+        ('PROCESSED', 'Traité'),
+        ('IGNORED', 'Ignoré'),
+        ('FAILED', 'Échec définitif'),
+    ]
+    
+    provider = models.CharField('Prestataire', max_length=30)
+    # Identifiant de l'événement chez le prestataire : les renvois sont dédupliqués
+    event_id = models.CharField('ID de l\'événement', max_length=100)
+    event_type = models.CharField('Type', max_length=100, blank=True)
+    payload = models.JSONField('Contenu')
+    
+    status = models.CharField('Statut', max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField('Tentatives', default=0)
+    next_attempt_at = models.DateTimeField('Prochaine tentative', default=timezone.now)
+    last_error = models.TextField('Dernière erreur', blank=True)
+    
+    received_at = models.DateTimeField('Reçu le', default=timezone.now)
+    processed_at = models.DateTimeField('Traité le', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Événement webhook'
+        verbose_name_plural = 'Événements webhook'
+        ordering = ['received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_event_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.provider} {self.event_type} #{self.event_id}"
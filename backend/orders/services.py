@@ -0,0 +1,152 @@
+# backend/orders/services.py
+"""
+Opérations métier sur les commandes, partagées par les vues et les webhooks
+"""
+
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.utils import timezone
+
+from accounts.models import loyalty_points_for
+from products.models import Product
+
+from .models import Entitlement, Order, OrderItem
+
+# Nombre maximum de produits par commande
+MAX_CART_SIZE = 50
+
+
+class CheckoutError(Exception):
+    """Panier refusé ; le message est destiné au client"""
+
+    def __init__(self, message, product_ids=None):
+        super().__init__(message)
+        self.product_ids = product_ids or []
+
+
+def new_transaction_ref():
+    return f"TATLIGHT-{uuid.uuid4().hex[:16].upper()}"
+
+
+def create_pending_order(user, product_ids):
+    """
+    Commande PENDING pour un panier, en un nombre de requêtes fixe : produits
+    déjà possédés vérifiés en une requête, prix chargés par in_bulk, articles
+    créés par bulk_create. La réduction du tier de fidélité est appliquée.
+    Lève CheckoutError si le panier est invalide.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        raise CheckoutError("Panier vide")
+    if len(product_ids) > MAX_CART_SIZE:
+        raise CheckoutError(f"{MAX_CART_SIZE} produits au maximum par commande")
+
+    owned = list(
+        Entitlement.objects
+        .filter(user=user, product_id__in=product_ids)
+        .values_list('product_id', flat=True)
+    )
+    if owned:
+        raise CheckoutError("Vous avez déjà acheté certains de ces produits", sorted(owned))
+
+    products = Product.objects.filter(is_active=True).only('id', 'price').in_bulk(product_ids)
+    missing = [product_id for product_id in product_ids if product_id not in products]
+    if missing:
+        raise CheckoutError("Produits introuvables ou indisponibles", missing)
+
+    subtotal = sum((products[product_id].price for product_id in product_ids), Decimal('0'))
+    discount = (subtotal * Decimal(user.get_loyalty_discount()) / 100).quantize(Decimal('0.01'))
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            subtotal=subtotal,
+            discount=discount,
+            total=subtotal - discount,
+            status='PENDING',
+            transaction_ref=new_transaction_ref(),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, price=products[product_id].price)
+            for product_id in product_ids
+        ])
+    return order
+
+
+def increment_sales_counts(order):
+    """
+    Ventes des produits d'une commande : un seul UPDATE, incrément fait par la
+    base (F + CASE par produit), donc sans perte sous commandes concurrentes
+    """
+    quantities = dict(
+        order.items.order_by().values_list('product_id').annotate(quantity=Count('id'))
+    )
+    if not quantities:
+        return 0
+
+    if len(set(quantities.values())) == 1:
+        increment = Value(next(iter(quantities.values())))
+    else:
+        increment = Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    return Product.objects.filter(pk__in=quantities).update(sales_count=F('sales_count') + increment)
+
+
+def payment_covers_order(order, data):
+    """La transaction Flutterwave (`data`) est réussie et couvre le total, dans la bonne devise"""
+    try:
+        amount = Decimal(str(data.get('amount')))
+    except InvalidOperation:
+        return False
+    return (
+        amount.is_finite()
+        and data.get('status') == 'successful'
+        and str(data.get('currency', '')).upper() == settings.FLUTTERWAVE_CURRENCY
+        and amount >= order.total
+    )
+
+
+def is_completable(order):
+    """
+    Commande qu'un paiement réussi peut terminer : PENDING, ou FAILED sans
+    paiement enregistré (fermée par reconcile_pending_orders alors que le lien
+    de paiement était encore utilisable)
+    """
+    return order.status == 'PENDING' or (order.status == 'FAILED' and not order.payment_id)
+
+
+def complete_order(order, payment_method='', payment_id=''):
+    """
+    Marquer une commande payée : statut, ventes des produits, fidélité.
+    Idempotent : la ligne est verrouillée et seule une commande encore
+    terminable l'est. Retourne la commande à jour, ou None si elle était déjà traitée.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().select_related('user').get(pk=order.pk)
+        if not is_completable(order):
+            return None
+
+        order.status = 'COMPLETED'
+        order.payment_method = payment_method or order.payment_method
+        order.payment_id = str(payment_id or order.payment_id)
+        order.completed_at = timezone.now()
+        order.loyalty_points_earned = loyalty_points_for(order.total)
+        # post_save (orders.signals) crée les Entitlement
+        order.save(update_fields=[
+            'status', 'payment_method', 'payment_id', 'completed_at', 'loyalty_points_earned', 'updated_at'
+        ])
+
+        increment_sales_counts(order)
+
+        # Points fidélité : une ligne de journal + un UPDATE atomique du compte
+        order.user.record_purchase(order.total, order=order)
+
+    return order
@@ -0,0 +1,27 @@
+# backend/orders/signals.py
+"""
+Signaux de l'application commandes
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Entitlement, Order
+
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, raw=False, **kwargs):
+    """Maintenir les Entitlement quand une commande est terminée ou remboursée"""
+    if raw:
+        return
+
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if previous_status == instance.status:
+        return
+
+    if instance.status == 'COMPLETED':
+        Entitlement.objects.grant_for_order(instance)
+    elif previous_status == 'COMPLETED':
+        Entitlement.objects.revoke_for_order(instance)
+
+    instance._loaded_status = instance.status
@@ -1,3 +1,710 @@
-from django.test import TestCase
+# backend/orders/tests.py
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from io import StringIO
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import User
+from products.models import Category, Product
+from tatlight_backend.ids import uuid7, uuid7_datetime
+from tatlight_backend.locks import exclusive_lock
+from payments import stub_server
+from payments.flutterwave import CircuitBreaker, FlutterwaveClient, GatewayError, GatewayUnavailable
+from payments.verification import verify_transaction
+
+from .management.commands.reconcile_pending_orders import ABANDONED, LOCK_NAME, UNAVAILABLE, verify
+from .download_log import DownloadLogBuffer
+from .models import Download, Entitlement, Order, OrderItem, WebhookEvent, order_number_for
+from .services import CheckoutError, complete_order, create_pending_order, increment_sales_counts
+from . import webhooks
+from .webhooks import process_pending_events
+
+LOCAL = ZoneInfo('Africa/Porto-Novo')
+
+
+def make_user(email='client@example.com'):
+    return User.objects.create_user(email=email, password='x')
+
+
+def make_order(user, total='10.00', **fields):
+    total = Decimal(total)
+    return Order.objects.create(user=user, subtotal=total, total=total, **fields)
+
+
+class MyOrdersDateFilterTests(APITestCase):
+    """Filtres date_from / date_to : jours entiers, heure locale"""
+
+    url = '/api/orders/my-orders/'
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        self.orders = {}
+        for label, moment in (
+            ('veille', datetime(2025, 3, 9, 23, 59, 59, tzinfo=LOCAL)),
+            ('debut', datetime(2025, 3, 10, 0, 0, tzinfo=LOCAL)),
+            ('fin', datetime(2025, 3, 11, 23, 59, 59, tzinfo=LOCAL)),
+            ('lendemain', datetime(2025, 3, 12, 0, 0, tzinfo=LOCAL)),
+        ):
+            order = make_order(self.user)
+            Order.objects.filter(pk=order.pk).update(created_at=moment)
+            self.orders[order.order_number] = label
+
+    def labels(self, response):
+        return sorted(self.orders[order['order_number']] for order in response.data['results'])
+
+    def test_range_includes_whole_days(self):
+        response = self.client.get(self.url, {'date_from': '2025-03-10', 'date_to': '2025-03-11'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.labels(response), ['debut', 'fin'])
+
+    def test_range_uses_plain_created_at_bounds(self):
+        with self.assertNumQueries(2) as context:
+            self.client.get(self.url, {'date_from': '2025-03-10', 'date_to': '2025-03-11'})
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"created_at" >=', sql)
+        self.assertIn('"created_at" <', sql)
+        self.assertNotIn('django_datetime_cast_date', sql)
+
+    def test_impossible_date_is_a_400(self):
+        for value in ('2025-02-30', '2025-13-01', 'demain'):
+            response = self.client.get(self.url, {'date_from': value})
+            self.assertEqual(response.status_code, 400, value)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlutterwaveClientTests(SimpleTestCase):
+    """Client réel contre payments.stub_server : reprises, délais, disjoncteur"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = stub_server.build_server(stub_server.build_parser().parse_args(['--port', '0', '--quiet']))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.options = stub_server.build_parser().parse_args(['--quiet', '--amount', '10', '--currency', 'EUR'])
+        self.server.requests = 0
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+        self.client = FlutterwaveClient(
+            secret_key='test',
+            base_url=f'http://127.0.0.1:{self.server.server_port}/v3',
+            connect_timeout=1,
+            read_timeout=0.3,
+            max_retries=2,
+            backoff=0,
+            breaker=self.breaker,
+        )
+
+    def fail_with(self, status):
+        self.server.options.error_rate = 1
+        self.server.options.error_status = status
+
+    def test_verification_succeeds(self):
+        data = self.client.verify_payment('TX-1')
+        self.assertEqual((data['status'], data['amount']), ('successful', 10))
+        self.assertEqual(self.client.metrics.snapshot()['verify_payment:ok']['count'], 1)
+
+    def test_idempotent_call_is_retried_on_503(self):
+        self.fail_with(503)
+        with self.assertRaises(GatewayUnavailable) as raised:
+            self.client.verify_payment('TX-1')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_non_idempotent_call_is_not_replayed_once_sent(self):
+        self.fail_with(503)
+        order = mock.Mock(transaction_ref='TX-1', total=Decimal('10.00'), order_number='TAT-1', id='1')
+        user = mock.Mock(email='client@example.com', full_name='Client')
+        with self.assertRaises(GatewayUnavailable):
+            self.client.create_payment(order, user)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_4xx_is_not_retried_and_keeps_the_circuit_closed(self):
+        self.server.options.amount = None
+        with self.assertRaises(GatewayError) as raised:
+            self.client.verify_payment('INCONNUE')
+        self.assertNotIsInstance(raised.exception, GatewayUnavailable)
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_read_timeout_bounds_the_call(self):
+        self.server.options.hang = True
+        self.client.max_retries = 0
+        started = time.monotonic()
+        with self.assertRaises(GatewayUnavailable):
+            self.client.verify_payment('TX-1')
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIn('verify_payment:timeout', self.client.metrics.snapshot())
+
+    def test_breaker_opens_then_recovers_through_a_single_probe(self):
+        self.fail_with(500)
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                self.client.verify_payment('TX-1')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        # Circuit ouvert : refus immédiat, le prestataire n'est pas appelé
+        sent = self.server.requests
+        with self.assertRaises(GatewayUnavailable):
+            self.client.verify_payment('TX-1')
+        self.assertEqual(self.server.requests, sent)
+        self.assertEqual(self.client.metrics.snapshot()['verify_payment:rejected']['count'], 1)
+
+        # Semi-ouvert : un essai réussi referme le circuit
+        self.server.options.error_rate = 0
+        self.clock.now += 31
+        self.client.verify_payment('TX-1')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.fail_with(500)
+        self.client.max_retries = 0
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                self.client.verify_payment('TX-1')
+        self.clock.now += 31
+        with self.assertRaises(GatewayUnavailable):
+            self.client.verify_payment('TX-1')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.opened_at, 31)
+
+    def test_probe_is_released_after_an_unexpected_exception(self):
+        self.breaker.state, self.breaker.opened_at = CircuitBreaker.OPEN, 0
+        self.clock.now = 31
+        with self.assertRaises(TypeError):
+            self.client.request('verify_payment', 'GET', '/transactions/verify_by_reference', argument_inconnu=1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.client.verify_payment('TX-1')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class GatewayMetricsEndpointTests(APITestCase):
+    url = '/api/orders/gateway-metrics/'
+
+    def test_staff_only(self):
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_snapshot_of_the_process_client(self):
+        staff = make_user('staff@example.com')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'pid', 'breaker', 'calls'})
+        self.assertIn(response.data['breaker']['state'], ('closed', 'open', 'half_open'))
+
+
+@override_settings(PAYMENT_VERIFICATION_FINAL_TIMEOUT=3600, PAYMENT_VERIFICATION_PENDING_TIMEOUT=0)
+class VerifyTransactionCacheTests(SimpleTestCase):
+    """Seule une transaction réussie est mise en cache longtemps"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = FlutterwaveClient(secret_key='test', base_url='http://127.0.0.1:9/v3', read_timeout=10, backoff=0.2)
+        self.client.verify_payment = mock.Mock()
+        patcher = mock.patch('payments.verification.get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def verify_twice(self, status):
+        self.client.verify_payment.return_value = {'status': status, 'amount': 10}
+        verify_transaction('TX-1')
+        verify_transaction('TX-1')
+        return self.client.verify_payment.call_count
+
+    def test_successful_is_cached(self):
+        self.assertEqual(self.verify_twice('successful'), 1)
+
+    def test_failed_and_cancelled_are_not_cached_for_long(self):
+        self.assertEqual(self.verify_twice('failed'), 2)
+        cache.clear()
+        self.client.verify_payment.reset_mock()
+        self.assertEqual(self.verify_twice('cancelled'), 2)
+
+    def hold_lock_then(self, action, delay=0.2):
+        lock_key = 'payments:verify:' + hashlib.sha1(b'TX-1').hexdigest() + ':lock'
+        cache.add(lock_key, 1, timeout=60)
+        timer = threading.Timer(delay, action, args=[lock_key])
+        timer.start()
+        self.addCleanup(timer.join)
+
+    def test_waiter_uses_the_leader_result(self):
+        self.hold_lock_then(lambda lock_key: cache.set(lock_key[:-len(':lock')], {'status': 'successful'}, 60))
+        self.assertEqual(verify_transaction('TX-1'), {'status': 'successful'})
+        self.client.verify_payment.assert_not_called()
+
+    def test_waiter_takes_over_when_the_leader_fails(self):
+        self.client.verify_payment.return_value = {'status': 'pending'}
+        self.hold_lock_then(cache.delete)
+        self.assertEqual(verify_transaction('TX-1'), {'status': 'pending'})
+        self.client.verify_payment.assert_called_once()
+
+    def test_lock_outlives_every_retry(self):
+        self.client.verify_payment.return_value = {'status': 'pending'}
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            verify_transaction('TX-1')
+        timeout = add.call_args.kwargs['timeout']
+        # 3 essais de (3.05 + 10)s et 0.4 + 0.8s d'attente
+        self.assertGreaterEqual(timeout, 3 * 13.05 + 1.2)
+
+
+class ReconcilePendingOrdersTests(TestCase):
+    def setUp(self):
+        # Le verrou exige un cache partagé entre processus
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        shared_cache = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir.name},
+        })
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        self.user = make_user()
+
+    def make_stale_order(self, minutes):
+        order = make_order(self.user, transaction_ref=f'TATLIGHT-{minutes}')
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(minutes=minutes))
+        return order
+
+    def verify_with_error(self, message, status_code):
+        order = make_order(self.user, transaction_ref='TATLIGHT-X')
+        error = GatewayError(message, status_code=status_code)
+        with mock.patch('orders.management.commands.reconcile_pending_orders.verify_transaction', side_effect=error):
+            return verify(order)[1]
+
+    def test_only_unknown_transactions_are_abandoned(self):
+        self.assertEqual(self.verify_with_error('No transaction was found for this id', 400), ABANDONED)
+        self.assertEqual(self.verify_with_error('No transaction was found for this id', 404), ABANDONED)
+        self.assertEqual(self.verify_with_error('Invalid authorization key', 401), UNAVAILABLE)
+        self.assertEqual(self.verify_with_error('Forbidden', 403), UNAVAILABLE)
+        self.assertEqual(self.verify_with_error('Invalid tx_ref', 400), UNAVAILABLE)
+
+    def reconcile(self, *args):
+        error = GatewayError('No transaction was found for this id', status_code=400)
+        with mock.patch('orders.management.commands.reconcile_pending_orders.verify_transaction', side_effect=error):
+            call_command('reconcile_pending_orders', *args, stdout=StringIO())
+
+    def test_default_age_waits_for_the_payment_link_to_expire(self):
+        recent = self.make_stale_order(120)
+        expired = self.make_stale_order(26 * 60)
+        self.reconcile()
+        statuses = dict(Order.objects.values_list('pk', 'status'))
+        self.assertEqual((statuses[recent.pk], statuses[expired.pk]), ('PENDING', 'FAILED'))
+
+    def test_ties_on_created_at_are_all_visited_across_batches(self):
+        orders = [self.make_stale_order(26 * 60) for _ in range(3)]
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(created_at=timezone.now() - timedelta(days=2))
+        self.reconcile('--batch-size', '1')
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'FAILED'})
+
+    def test_a_second_run_waits_for_the_lock(self):
+        order = self.make_stale_order(26 * 60)
+        out = StringIO()
+        with exclusive_lock(LOCK_NAME, 60) as acquired:
+            self.assertTrue(acquired)
+            call_command('reconcile_pending_orders', stdout=out)
+        self.assertIn('déjà en cours', out.getvalue())
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'PENDING')
+
+        self.reconcile()
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'FAILED')
+
+    def test_a_process_local_cache_is_refused_without_postgresql(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('verrou consultatif PostgreSQL')
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.assertRaisesMessage(CommandError, 'cache partagé'):
+                call_command('reconcile_pending_orders', stdout=StringIO())
+
+    def test_late_payment_completes_a_closed_order(self):
+        order = self.make_stale_order(120)
+        self.reconcile('--older-than', '60')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'FAILED')
+
+        WebhookEvent.objects.create(provider='flutterwave', event_id='charge.completed:77', event_type='charge.completed', payload={
+            'event': 'charge.completed',
+            'data': {'id': 77, 'tx_ref': order.transaction_ref, 'status': 'successful', 'amount': 10, 'currency': 'EUR'},
+        })
+        self.assertEqual(process_pending_events(), {'PROCESSED': 1})
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.payment_id), ('COMPLETED', '77'))
+
+
+@override_settings(FLUTTERWAVE_SECRET_HASH='secret', FLUTTERWAVE_CURRENCY='EUR')
+class FlutterwaveWebhookTests(APITestCase):
+    """Boîte de réception : accusé immédiat, dédoublonnage, traitement avec reprises"""
+
+    url = '/api/orders/webhook/flutterwave/'
+
+    def setUp(self):
+        self.order = make_order(make_user(), transaction_ref='TATLIGHT-WH')
+        self.payload = {
+            'event': 'charge.completed',
+            'data': {'id': 501, 'tx_ref': 'TATLIGHT-WH', 'status': 'successful', 'amount': 10, 'currency': 'EUR'},
+        }
+
+    def post(self, payload, signature='secret'):
+        return self.client.post(self.url, payload, format='json', HTTP_VERIF_HASH=signature)
+
+    def test_redeliveries_are_stored_once(self):
+        self.assertEqual(self.post(self.payload).status_code, 200)
+        self.assertEqual(self.post(self.payload).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_bad_signature_is_rejected(self):
+        self.assertEqual(self.post(self.payload, signature='faux').status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_event_completes_the_order_once(self):
+        self.post(self.payload)
+        self.assertEqual(process_pending_events(), {'PROCESSED': 1})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+
+        # Même paiement notifié sous un autre identifiant : ignoré
+        self.post({**self.payload, 'data': {**self.payload['data'], 'id': 502}})
+        self.assertEqual(process_pending_events(), {'IGNORED': 1})
+        self.assertEqual(self.order.user.loyalty_transactions.count(), 1)
+
+    def test_partial_payment_is_ignored(self):
+        self.post({**self.payload, 'data': {**self.payload['data'], 'amount': 5}})
+        self.assertEqual(process_pending_events(), {'IGNORED': 1})
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'PENDING')
+
+    def test_a_crash_keeps_the_events_already_processed(self):
+        self.post(self.payload)
+        self.post({**self.payload, 'event': 'charge.updated'})
+        real_process_event = webhooks.process_event
+        calls = []
+
+        def crash_on_second(event, max_attempts):
+            calls.append(event.pk)
+            if len(calls) == 2:
+                raise RuntimeError('worker arrêté')
+            real_process_event(event, max_attempts)
+
+        with mock.patch('orders.webhooks.process_event', side_effect=crash_on_second):
+            with self.assertRaises(RuntimeError):
+                process_pending_events()
+        self.assertEqual(WebhookEvent.objects.get(pk=calls[0]).status, 'PROCESSED')
+        self.assertEqual(WebhookEvent.objects.get(pk=calls[1]).status, 'PENDING')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'COMPLETED')
+
+    def test_errors_are_retried_with_backoff_then_fail(self):
+        self.post(self.payload)
+        handlers = {('flutterwave', 'charge.completed'): mock.Mock(side_effect=RuntimeError('base indisponible'))}
+        with mock.patch.dict('orders.webhooks.WEBHOOK_HANDLERS', handlers):
+            with self.assertLogs('orders.webhooks', 'ERROR'):
+                self.assertEqual(process_pending_events(max_attempts=2), {'PENDING': 1})
+            event = WebhookEvent.objects.get()
+            self.assertEqual(event.attempts, 1)
+            self.assertGreater(event.next_attempt_at, timezone.now() + timedelta(seconds=20))
+            self.assertIn('base indisponible', event.last_error)
+
+            # Pas encore dû : rien à traiter
+            self.assertEqual(process_pending_events(max_attempts=2), {})
+
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            with self.assertLogs('orders.webhooks', 'ERROR'):
+                self.assertEqual(process_pending_events(max_attempts=2), {'FAILED': 1})
+
+
+def make_products(count):
+    category = Category.objects.get_or_create(name='ebooks', defaults={'slug': 'ebooks'})[0]
+    start = Product.objects.count()
+    return [
+        Product.objects.create(
+            category=category, title=f'Produit {start + index}', slug=f'produit-{start + index}',
+            description='', file_type='pdf', price=Decimal('10.00'), image=''
+        )
+        for index in range(count)
+    ]
+
+
+class CheckoutTests(TestCase):
+    """Nombre de requêtes indépendant de la taille du panier"""
+
+    def setUp(self):
+        self.user = make_user()
+
+    def queries_for(self, products):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                order = create_pending_order(self.user, [product.pk for product in products])
+        self.assertEqual(order.items.count(), len(products))
+        return len(context.captured_queries)
+
+    def test_order_creation_queries_do_not_grow_with_the_cart(self):
+        self.assertEqual(self.queries_for(make_products(1)), self.queries_for(make_products(20)))
+
+    def test_completion_queries_do_not_grow_with_the_cart(self):
+        counts = []
+        for size in (1, 20):
+            order = create_pending_order(self.user, [product.pk for product in make_products(size)])
+            with CaptureQueriesContext(connection) as context:
+                complete_order(order, 'card', payment_id='1')
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Product.objects.filter(sales_count=1).count(), 21)
+
+    def test_loyalty_discount_is_applied(self):
+        User.objects.filter(pk=self.user.pk).update(loyalty_tier='GOLD')
+        self.user.refresh_from_db()
+        order = create_pending_order(self.user, [product.pk for product in make_products(2)])
+        self.assertEqual((order.subtotal, order.discount, order.total), (Decimal('20.00'), Decimal('2.00'), Decimal('18.00')))
+
+    def test_invalid_carts(self):
+        owned, inactive = make_products(2)
+        Product.objects.filter(pk=inactive.pk).update(is_active=False)
+        complete_order(create_pending_order(self.user, [owned.pk]))
+        for product_ids, message in (
+            ([], 'Panier vide'),
+            ([owned.pk], 'déjà acheté'),
+            ([inactive.pk], 'introuvables'),
+            (list(range(1, 60)), '50 produits'),
+        ):
+            with self.assertRaisesMessage(CheckoutError, message):
+                create_pending_order(self.user, product_ids)
+
+
+class SalesCountTests(TestCase):
+    """Ventes incrémentées en un seul UPDATE, quelle que soit la composition de la commande"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.products = make_products(3)
+
+    def order_with(self, *products):
+        order = make_order(self.user)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, price=product.price)
+        return order
+
+    def increment(self, order):
+        with CaptureQueriesContext(connection) as context:
+            rows = increment_sales_counts(order)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        return rows, updates
+
+    def sales(self):
+        return list(Product.objects.order_by('pk').values_list('sales_count', flat=True))
+
+    def test_same_quantity_for_every_product(self):
+        rows, updates = self.increment(self.order_with(*self.products))
+        self.assertEqual(rows, 3)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"products_product"', updates[0])
+        self.assertEqual(self.sales(), [1, 1, 1])
+
+    def test_different_quantities_use_a_single_case_update(self):
+        first, second, _ = self.products
+        rows, updates = self.increment(self.order_with(first, first, second))
+        self.assertEqual(rows, 2)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE WHEN', updates[0])
+        self.assertEqual(self.sales(), [2, 1, 0])
+
+    def test_empty_order_updates_nothing(self):
+        self.assertEqual(self.increment(make_order(self.user)), (0, []))
+
+
+class OrderKeyTests(TestCase):
+    """Clés UUIDv7 : croissantes, datées, compatibles avec les uuid4 existants"""
+
+    def test_keys_are_strictly_increasing(self):
+        keys = [uuid7() for _ in range(5000)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        # Même ordre sous forme de texte (colonne char(32) sous SQLite)
+        self.assertEqual([key.hex for key in keys], sorted(key.hex for key in keys))
+
+    def test_sequence_overflow_stays_ordered(self):
+        with mock.patch('tatlight_backend.ids.time.time_ns', return_value=1_700_000_000_000_000_000):
+            keys = [uuid7() for _ in range(5000)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_version_variant_and_timestamp(self):
+        key = uuid7()
+        self.assertEqual((key.version, key.variant), (7, uuid.RFC_4122))
+        self.assertLess(abs((uuid7_datetime(key) - timezone.now()).total_seconds()), 1)
+        self.assertIsNone(uuid7_datetime(uuid.uuid4()))
+
+    def test_orders_sort_by_primary_key_in_creation_order(self):
+        user = make_user()
+        created = [make_order(user).pk for _ in range(20)]
+        self.assertEqual(list(Order.objects.order_by('pk').values_list('pk', flat=True)), created)
+
+    def test_order_number_uses_local_creation_time(self):
+        key = uuid.UUID(int=(1_700_000_000_000 << 80) | (0x7 << 76) | (0b10 << 62) | 0xABCDEF12)
+        # 2023-11-14 22:13:20 UTC = 23:13:20 à Porto-Novo
+        self.assertEqual(order_number_for(key), 'TAT-20231114231320-ABCDEF12')
+
+
+class EntitlementTests(TestCase):
+    """Accès produits maintenus par orders.signals à partir du statut des commandes"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.shared, self.other = make_products(2)
+
+    def completed_order(self, *products):
+        order = create_pending_order(self.user, [product.pk for product in products])
+        return complete_order(order)
+
+    def owned(self):
+        return dict(Entitlement.objects.filter(user=self.user).values_list('product_id', 'order_id'))
+
+    def refund(self, order):
+        order.status = 'REFUNDED'
+        order.save()
+
+    def test_completion_grants_and_refund_revokes(self):
+        order = self.completed_order(self.shared, self.other)
+        self.assertEqual(self.owned(), {self.shared.pk: order.pk, self.other.pk: order.pk})
+        self.refund(order)
+        self.assertEqual(self.owned(), {})
+
+    def test_refund_keeps_products_bought_by_another_order(self):
+        first = self.completed_order(self.shared)
+        # Achat du même produit par une deuxième commande (hors parcours panier)
+        second = make_order(self.user)
+        OrderItem.objects.create(order=second, product=self.shared, price=Decimal('10.00'))
+        OrderItem.objects.create(order=second, product=self.other, price=Decimal('10.00'))
+        second = complete_order(second)
+        self.assertEqual(self.owned(), {self.shared.pk: first.pk, self.other.pk: second.pk})
+
+        self.refund(first)
+        self.assertEqual(self.owned(), {self.shared.pk: second.pk, self.other.pk: second.pk})
+
+        self.refund(second)
+        self.assertEqual(self.owned(), {})
+
+    def test_backfill_builds_entitlements_for_completed_orders_only(self):
+        completed = self.completed_order(self.shared)
+        pending = make_order(self.user)
+        OrderItem.objects.create(order=pending, product=self.other, price=Decimal('10.00'))
+        Entitlement.objects.all().delete()
+
+        for _ in range(2):  # idempotente
+            call_command('backfill_entitlements', '--batch-size', '1', stdout=StringIO())
+            self.assertEqual(self.owned(), {self.shared.pk: completed.pk})
+
+
+class BenchmarkIndexesTests(TestCase):
+    def test_small_run_leaves_data_and_indexes_untouched(self):
+        out = StringIO()
+        call_command(
+            'benchmark_indexes', '--orders', '60', '--products', '15', '--users', '5', '--runs', '1', '--force',
+            stdout=out
+        )
+        self.assertIn('Benchmark terminé', out.getvalue())
+        if connection.vendor == 'sqlite':
+            self.assertIn('USING INDEX order_user_status_idx', out.getvalue())
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Product.objects.exists())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Order._meta.db_table)
+        self.assertIn('order_user_status_idx', constraints)
+
+
+class DownloadLogTests(TestCase):
+    """Historique bufferisé : écriture par lots, spool conservé en cas d'échec, replay"""
+
+    def setUp(self):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_dir = spool_dir.name
+        timer_patch = mock.patch.object(DownloadLogBuffer, '_ensure_timer')
+        timer_patch.start()
+        self.addCleanup(timer_patch.stop)
+
+        self.user = make_user()
+        self.product = make_products(1)[0]
+        self.order = make_order(self.user)
+
+    def event(self, user_id=None, order_id=None):
+        return {
+            'user_id': user_id or self.user.pk,
+            'product_id': self.product.pk,
+            'order_id': str(order_id or self.order.pk),
+            'ip_address': '127.0.0.1',
+            'downloaded_at': timezone.now().isoformat(),
+        }
+
+    def spool_files(self):
+        return glob.glob(os.path.join(self.spool_dir, '*.jsonl'))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_events_are_written_once_the_batch_is_full(self):
+        buffer = DownloadLogBuffer(self.spool_dir, batch_size=3, flush_interval=60)
+        buffer.append(self.event())
+        buffer.append(self.event())
+        self.assertFalse(Download.objects.exists())
+        [spool] = self.spool_files()
+        with open(spool) as lines:
+            self.assertEqual(len(lines.readlines()), 2)
+
+        buffer.append(self.event())
+        self.assertEqual(Download.objects.count(), 3)
+        self.assertEqual(self.spool_files(), [])
+
+    def test_failed_flush_keeps_the_spool_file(self):
+        buffer = DownloadLogBuffer(self.spool_dir, batch_size=100, flush_interval=60)
+        buffer.append(self.event())
+        with mock.patch.object(Download.objects, 'bulk_create', side_effect=RuntimeError('base indisponible')):
+            with self.assertLogs('orders.download_log', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(self.spool_files()), 1)
+        self.assertEqual(buffer.flush(), 0)  # le lot a été détaché du buffer
+
+    def test_replay_skips_events_whose_user_or_order_is_gone(self):
+        gone = make_user('parti@example.com')
+        events = [self.event(), self.event(user_id=gone.pk), self.event(order_id=uuid.uuid4())]
+        gone.delete()
+        with open(os.path.join(self.spool_dir, 'downloads-1-test.jsonl'), 'w') as spool:
+            spool.writelines(json.dumps(event) + '\n' for event in events)
+            spool.write('{"tronqué')
+
+        out = StringIO()
+        with override_settings(DOWNLOAD_LOG_SPOOL_DIR=self.spool_dir), self.assertLogs('orders.download_log', 'WARNING'):
+            call_command('replay_download_spool', '--min-age', '0', stdout=out)
+        # Les clés étrangères sont différées jusqu'au commit : les vérifier ici
+        connection.check_constraints()
+        self.assertIn('1 téléchargement(s) rejoué(s) depuis 1 fichier(s)', out.getvalue())
+        self.assertEqual(list(Download.objects.values_list('user_id', 'order_id')), [(self.user.pk, self.order.pk)])
+        self.assertEqual(self.spool_files(), [])
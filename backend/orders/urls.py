@@ -1,8 +1,18 @@
 # backend/orders/urls.py
 from django.urls import path
 
+from . import views, webhooks
+
 app_name = 'orders'
 
 urlpatterns = [
-    # Les endpoints commandes seront implémentés dans la prochaine phase
-]
\ No newline at end of file
+    # Paiements
+    path('create-payment/', views.create_payment, name='create-payment'),
+    path('checkout/', views.checkout, name='checkout'),
+    path('verify-payment/', views.verify_payment, name='verify-payment'),
+    path('my-orders/', views.my_orders, name='my-orders'),
+    path('gateway-metrics/', views.gateway_metrics, name='gateway-metrics'),
+    
+    # Webhooks des prestataires (traités par manage.py process_webhooks)
+    path('webhook/flutterwave/', webhooks.flutterwave_webhook, name='flutterwave-webhook'),
+]
@@ -3,22 +3,28 @@
 Views pour la gestion des commandes et paiements
 """
 
+from datetime import datetime, time as datetime_time, timedelta
+
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-from products.models import Product
+from tatlight_backend.pagination import KeysetPagination
 from .models import Order, OrderItem
-from payments.flutterwave import FlutterwavePayment
+from .services import CheckoutError, complete_order, create_pending_order, is_completable, payment_covers_order
+from payments.flutterwave import GatewayError, GatewayUnavailable, get_client
+from payments.verification import verify_transaction
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_payment(request):
     """
-    Créer un paiement Flutterwave
+    Créer un paiement Flutterwave pour un produit
     POST /api/orders/create-payment/
     
     Body:
@@ -29,8 +35,6 @@ def create_payment(request):
     }
     """
     product_id = request.data.get('product_id')
-    payment_method = request.data.get('payment_method', 'all')
-    phone_number = request.data.get('phone_number', '')
     
     if not product_id:
         return Response(
@@ -38,72 +42,80 @@ def create_payment(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    product = get_object_or_404(Product, id=product_id, is_active=True)
+    return start_checkout(request, [product_id])
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def checkout(request):
+    """
+    Payer un panier : une commande, un seul paiement Flutterwave
+    POST /api/orders/checkout/
     
-    # Vérifier si l'utilisateur a déjà acheté ce produit
-    existing_order = Order.objects.filter(
-        user=request.user,
-        status='COMPLETED'
-    ).filter(items__product=product).first()
+    Body:
+    {
+        "product_ids": [1, 4, 7],
+        "payment_method": "card" | "mobilemoney" | "paypal" | "all",
+        "phone_number": "+22997123456"  // Si mobilemoney
+    }
+    
+    La réduction du tier de fidélité est appliquée au total.
+    """
+    product_ids = request.data.get('product_ids')
     
-    if existing_order:
+    if not isinstance(product_ids, list) or not product_ids:
         return Response(
-            {'error': 'Vous avez déjà acheté ce produit'},
+            {'error': 'product_ids requis (liste d\'identifiants)'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Créer une commande en attente
-    order = Order.objects.create(
-        user=request.user,
-        total_amount=product.price,
-        status='PENDING'
-    )
+    return start_checkout(request, product_ids)
+
+
+def start_checkout(request, product_ids):
+    """Commande en attente + lien de paiement (requêtes indépendantes de la taille du panier)"""
+    payment_method = request.data.get('payment_method', 'all')
+    phone_number = request.data.get('phone_number', '')
     
-    # Ajouter l'item
-    OrderItem.objects.create(
-        order=order,
-        product=product,
-        quantity=1,
-        price=product.price
-    )
+    try:
+        product_ids = [int(product_id) for product_id in product_ids]
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'Identifiants de produits invalides'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Initialiser le paiement Flutterwave
-    payment = FlutterwavePayment()
+    # Créer une commande en attente (référence connue avant l'appel au prestataire)
+    try:
+        order = create_pending_order(request.user, product_ids)
+    except CheckoutError as exc:
+        return Response(
+            {'error': str(exc), 'product_ids': exc.product_ids},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    if payment_method == 'mobilemoney' and phone_number:
-        from payments.flutterwave import MobileMoneyPayment
-        mobile_payment = MobileMoneyPayment()
-        result = mobile_payment.create_mtn_payment(
-            user=request.user,
-            product=product,
+    # Initialiser le paiement Flutterwave (client partagé, délais bornés)
+    try:
+        payment_link = get_client().create_payment(
+            order,
+            request.user,
+            payment_method=payment_method,
             phone_number=phone_number
         )
-    else:
-        result = payment.create_payment(
-            user=request.user,
-            product=product,
-            payment_method=payment_method
-        )
-    
-    if result['status'] == 'success':
-        # Sauvegarder la référence de transaction
-        order.transaction_ref = result['tx_ref']
-        order.save()
-        
-        return Response({
-            'status': 'success',
-            'payment_link': result['payment_link'],
-            'tx_ref': result['tx_ref'],
-            'order_id': order.id
-        })
-    
-    # Si échec, supprimer la commande
-    order.delete()
+    except GatewayError as exc:
+        # Si échec, supprimer la commande
+        order.delete()
+        return gateway_error_response(exc)
     
-    return Response(
-        {'error': result.get('message', 'Erreur lors de la création du paiement')},
-        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-    )
+    return Response({
+        'status': 'success',
+        'payment_link': payment_link,
+        'tx_ref': order.transaction_ref,
+        'order_id': order.id,
+        'subtotal': float(order.subtotal),
+        'discount': float(order.discount),
+        'total_amount': float(order.total)
+    })
 
 
 @api_view(['POST'])
@@ -127,17 +139,7 @@ def verify_payment(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Vérifier le paiement via Flutterwave
-    payment = FlutterwavePayment()
-    verification = payment.verify_payment(tx_ref)
-    
-    if verification['status'] != 'success':
-        return Response(
-            {'error': 'Paiement non trouvé ou échoué'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Trouver la commande
+    # Trouver la commande (avant d'interroger le prestataire)
     try:
         order = Order.objects.get(
             transaction_ref=tx_ref,
@@ -149,104 +151,132 @@ def verify_payment(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Marquer comme payée
-    if order.status == 'PENDING':
-        order.status = 'COMPLETED'
-        order.payment_method = verification.get('payment_type', 'flutterwave')
-        order.save()
-        
-        # Mettre à jour les stats produit
-        for item in order.items.all():
-            product = item.product
-            product.sales_count += item.quantity
-            product.save()
-        
-        # Ajouter des points de fidélité
-        order.user.record_purchase(
-            amount=order.total_amount,
-            order=order
-        )
-        
+    # Déjà payée (webhook ou appel précédent) : réponse depuis la base, sans le prestataire
+    if order.status == 'COMPLETED':
+        return Response(paid_order_response(order))
+    if not is_completable(order):
         return Response({
-            'status': 'success',
-            'message': 'Paiement confirmé',
-            'order': {
-                'id': order.id,
-                'order_number': order.order_number,
-                'total_amount': float(order.total_amount),
-                'status': order.status,
-                'products': [
-                    {
-                        'title': item.product.title,
-                        'price': float(item.price)
-                    }
-                    for item in order.items.all()
-                ]
-            }
+            'status': 'already_processed',
+            'message': 'Cette commande a déjà été traitée'
         })
     
-    return Response({
-        'status': 'already_processed',
-        'message': 'Cette commande a déjà été traitée'
-    })
-
-
-@api_view(['POST'])
-def flutterwave_webhook(request):
-    """
-    Webhook Flutterwave
-    POST /api/orders/webhook/flutterwave/
-    """
-    # Traiter le webhook
-    payment = FlutterwavePayment()
-    result = payment.process_webhook(request.data)
+    # Vérifier le paiement via Flutterwave (résultat en cache par tx_ref, appels regroupés)
+    try:
+        transaction_data = verify_transaction(tx_ref)
+    except GatewayUnavailable as exc:
+        return gateway_error_response(exc)
+    except GatewayError:
+        transaction_data = {}
     
-    if result['status'] == 'success' and result['action'] == 'payment_completed':
-        tx_ref = result['tx_ref']
-        
-        # Trouver et mettre à jour la commande
-        try:
-            order = Order.objects.get(transaction_ref=tx_ref)
-            
-            if order.status == 'PENDING':
-                order.status = 'COMPLETED'
-                order.payment_method = 'flutterwave'
-                order.save()
-                
-                # Mettre à jour stats
-                for item in order.items.all():
-                    product = item.product
-                    product.sales_count += item.quantity
-                    product.save()
-                
-                # Points fidélité
-                order.user.record_purchase(
-                    amount=order.total_amount,
-                    order=order
-                )
-        except Order.DoesNotExist:
-            pass
+    if not payment_covers_order(order, transaction_data):
+        return Response(
+            {'error': 'Paiement non trouvé ou échoué'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    return Response({'status': 'received'})
+    # Marquer comme payée (statut, ventes et fidélité dans une transaction)
+    completed = complete_order(
+        order,
+        transaction_data.get('payment_type') or 'flutterwave',
+        payment_id=transaction_data.get('id') or ''
+    )
+    if completed is None:
+        # Terminée entre-temps par un webhook ou un appel concurrent
+        completed = Order.objects.get(pk=order.pk)
+        if completed.status != 'COMPLETED':
+            return Response({
+                'status': 'already_processed',
+                'message': 'Cette commande a déjà été traitée'
+            })
+    
+    return Response(paid_order_response(completed))
+
+
+def paid_order_response(order):
+    return {
+        'status': 'success',
+        'message': 'Paiement confirmé',
+        'order': {
+            'id': order.id,
+            'order_number': order.order_number,
+            'total_amount': float(order.total),
+            'status': order.status,
+            'products': [
+                {
+                    'title': item.product.title,
+                    'price': float(item.price)
+                }
+                for item in order.items.select_related('product')
+            ]
+        }
+    }
+
+
+def gateway_error_response(exc):
+    """503 si le prestataire est indisponible (circuit ouvert, délais), 502 sinon"""
+    if isinstance(exc, GatewayUnavailable):
+        return Response(
+            {'error': 'Service de paiement momentanément indisponible, réessayez dans quelques instants'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response(
+        {'error': str(exc) or 'Erreur lors de la création du paiement'},
+        status=status.HTTP_502_BAD_GATEWAY
+    )
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def my_orders(request):
     """
-    Mes commandes
+    Mes commandes (paginées par curseur, plus récentes d'abord)
     GET /api/orders/my-orders/
+    GET /api/orders/my-orders/?status=COMPLETED&date_from=2025-01-01&date_to=2025-12-31
+    GET /api/orders/my-orders/?cursor=... - Page suivante (lien `next`)
+    
+    Nombre de requêtes constant : commandes + articles (avec produits) préchargés
     """
-    orders = Order.objects.filter(
-        user=request.user
-    ).order_by('-created_at')
+    orders = Order.objects.filter(user=request.user)
+    
+    # Filtres
+    order_status = request.query_params.get('status', '')
+    if order_status:
+        if order_status not in dict(Order.STATUS_CHOICES):
+            return Response({'error': 'Statut invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        orders = orders.filter(status=order_status)
+    
+    # Bornes en début de jour (fuseau du site) : created_at__gte / __lt utilisent l'index,
+    # contrairement à created_at__date
+    for param, lookup, offset in (('date_from', 'created_at__gte', 0), ('date_to', 'created_at__lt', 1)):
+        value = request.query_params.get(param, '')
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:  # 2025-02-30 : bon format, date inexistante
+                day = None
+            if day is None:
+                return Response({'error': f'{param} invalide (AAAA-MM-JJ)'}, status=status.HTTP_400_BAD_REQUEST)
+            start = timezone.make_aware(datetime.combine(day + timedelta(days=offset), datetime_time.min))
+            orders = orders.filter(**{lookup: start})
+    
+    orders = orders.prefetch_related(
+        Prefetch(
+            'items',
+            queryset=OrderItem.objects.select_related('product').only(
+                'id', 'order_id', 'price', 'product__id', 'product__title', 'product__image'
+            )
+        )
+    )
+    
+    paginator = KeysetPagination(ordering_fields=('created_at',), default_ordering='-created_at')
+    page = paginator.paginate_queryset(orders, request)
     
     result = []
-    for order in orders:
+    for order in page:
         result.append({
             'id': order.id,
             'order_number': order.order_number,
-            'total_amount': float(order.total_amount),
+            'total_amount': float(order.total),
             'status': order.status,
             'payment_method': order.payment_method,
             'created_at': order.created_at.isoformat(),
@@ -256,10 +286,30 @@ def my_orders(request):
                     'title': item.product.title,
                     'image': item.product.image.url if item.product.image else None,
                     'price': float(item.price),
-                    'quantity': item.quantity
+                    'quantity': 1  # Produits numériques : un article par produit
                 }
                 for item in order.items.all()
             ]
         })
     
-    return Response(result)
\ No newline at end of file
+    return paginator.get_paginated_response(result)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def gateway_metrics(request):
+    """
+    Appels Flutterwave du processus qui répond (un worker) : latences et disjoncteur
+    GET /api/orders/gateway-metrics/
+    """
+    client = get_client()
+    breaker = client.breaker
+    return Response({
+        'pid': client.pid,
+        'breaker': {
+            'state': breaker.state,
+            'failures': breaker.failures,
+            'reset_timeout': breaker.reset_timeout,
+        },
+        'calls': client.metrics.snapshot(),
+    })
@@ -0,0 +1,186 @@
+# backend/orders/webhooks.py
+"""
+Webhooks des prestataires de paiement (boîte de réception durable)
+
+Le endpoint HTTP vérifie la signature, insère l'événement brut dans
+WebhookEvent (unique par prestataire + id d'événement : un renvoi est ignoré)
+et répond 200 immédiatement. Le traitement (commande terminée, ventes,
+fidélité) est fait par `manage.py process_webhooks`, avec reprises et
+backoff exponentiel : la latence du webhook ne dépend plus de la base.
+"""
+
+import hmac
+import json
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+
+from .models import Order, WebhookEvent
+from .services import complete_order, is_completable, payment_covers_order
+
+logger = logging.getLogger(__name__)
+
+FLUTTERWAVE = 'flutterwave'
+
+# Reprises : 30s, 1min, 2min... plafonné à 1h, avec gigue
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+
+
+class WebhookIgnored(Exception):
+    """L'événement ne concerne aucune commande à traiter (pas de reprise)"""
+
+
+def verify_flutterwave_signature(request):
+    """Flutterwave renvoie dans `verif-hash` le secret configuré sur le dashboard"""
+    secret = settings.FLUTTERWAVE_SECRET_HASH
+    received = request.headers.get('verif-hash', '')
+    if not secret:
+        logger.error("FLUTTERWAVE_SECRET_HASH n'est pas configuré : webhook refusé")
+        return False
+    return hmac.compare_digest(received.encode(), secret.encode())
+
+
+def flutterwave_event_id(payload):
+    """Flutterwave n'a pas d'id d'événement : type + id de transaction"""
+    data = payload.get('data') or {}
+    transaction_id = data.get('id') or data.get('tx_ref')
+    if not transaction_id:
+        return None
+    return f"{payload.get('event', '')}:{transaction_id}"
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def flutterwave_webhook(request):
+    """
+    Webhook Flutterwave
+    POST /api/orders/webhook/flutterwave/
+    """
+    if not verify_flutterwave_signature(request):
+        return Response({'error': 'Signature invalide'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return Response({'error': 'JSON invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    event_id = flutterwave_event_id(payload) if isinstance(payload, dict) else None
+    if not event_id:
+        return Response({'error': 'Événement sans identifiant'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Un seul INSERT ... ON CONFLICT DO NOTHING : les renvois sont dédupliqués
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(
+            provider=FLUTTERWAVE,
+            event_id=event_id,
+            event_type=payload.get('event', ''),
+            payload=payload,
+        )],
+        ignore_conflicts=True
+    )
+
+    return Response({'status': 'received'})
+
+
+def handle_flutterwave_charge_completed(event):
+    data = event.payload.get('data') or {}
+    if data.get('status') != 'successful':
+        raise WebhookIgnored(f"paiement {data.get('status')!r}")
+
+    order = Order.objects.filter(transaction_ref=data.get('tx_ref')).first()
+    if order is None:
+        raise WebhookIgnored(f"aucune commande pour {data.get('tx_ref')!r}")
+    if not is_completable(order):
+        raise WebhookIgnored(f"commande déjà {order.status}")
+
+    # Montant réellement payé (un webhook ne doit pas valider un paiement partiel)
+    if not payment_covers_order(order, data):
+        raise WebhookIgnored("montant ou devise ne correspondant pas à la commande")
+
+    payment_method = data.get('payment_type') or FLUTTERWAVE
+    if complete_order(order, payment_method=payment_method, payment_id=data.get('id') or '') is None:
+        raise WebhookIgnored("commande terminée entre-temps")
+
+
+WEBHOOK_HANDLERS = {
+    (FLUTTERWAVE, 'charge.completed'): handle_flutterwave_charge_completed,
+}
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def process_event(event, max_attempts):
+    """Traiter un événement verrouillé ; met à jour son statut (sans sauvegarder)"""
+    handler = WEBHOOK_HANDLERS.get((event.provider, event.event_type))
+    event.attempts += 1
+    now = timezone.now()
+
+    if handler is None:
+        event.status = 'IGNORED'
+        event.last_error = "aucun traitement pour ce type d'événement"
+        event.processed_at = now
+        return
+
+    try:
+        with transaction.atomic():
+            handler(event)
+    except WebhookIgnored as exc:
+        event.status = 'IGNORED'
+        event.last_error = str(exc)
+        event.processed_at = now
+    except Exception as exc:
+        logger.exception("Échec du traitement du webhook %s", event)
+        event.last_error = f"{type(exc).__name__}: {exc}"
+        if event.attempts >= max_attempts:
+            event.status = 'FAILED'
+        else:
+            event.next_attempt_at = now + retry_delay(event.attempts)
+    else:
+        event.status = 'PROCESSED'
+        event.last_error = ''
+        event.processed_at = now
+
+
+def claim_next_event():
+    """Prochain événement dû, verrouillé (à appeler dans une transaction) ; None si la file est vide"""
+    return (
+        WebhookEvent.objects
+        .select_for_update(skip_locked=True)
+        .filter(status='PENDING', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at')
+        .first()
+    )
+
+
+def process_pending_events(batch_size=100, max_attempts=8):
+    """
+    Traiter jusqu'à `batch_size` événements dus, chacun dans sa propre
+    transaction : le verrou de la ligne n'est tenu que le temps de son
+    traitement, la commande terminée (et l'invalidation du cache) est validée
+    aussitôt, et une erreur n'annule pas les événements déjà traités.
+    Plusieurs workers peuvent tourner en parallèle : les lignes verrouillées
+    par un autre worker sont sautées.
+    Retourne le nombre d'événements traités par statut.
+    """
+    counts = {}
+    for _ in range(batch_size):
+        with transaction.atomic():
+            event = claim_next_event()
+            if event is None:
+                break
+            process_event(event, max_attempts)
+            event.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'processed_at'])
+        counts[event.status] = counts.get(event.status, 0) + 1
+    return counts
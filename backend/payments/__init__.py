@@ -0,0 +1 @@
+# backend/payments/__init__.py
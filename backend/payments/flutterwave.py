@@ -0,0 +1,316 @@
+# backend/payments/flutterwave.py
+"""
+Client Flutterwave partagé par le processus
+
+Une seule session HTTP par worker (connexions keep-alive réutilisées), des
+délais stricts (connexion, lecture), quelques reprises avec gigue et un
+disjoncteur : après une série d'échecs, les appels échouent immédiatement
+(GatewayUnavailable) au lieu d'occuper un worker pendant toute la durée des
+timeouts. Chaque appel est mesuré (GatewayMetrics + logs).
+
+Pour tester contre un faux prestataire local :
+    python -m payments.stub_server --port 8765 --latency 2 --error-rate 0.3
+    FLUTTERWAVE_BASE_URL=http://127.0.0.1:8765/v3
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Bornes (secondes) de l'histogramme des latences
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Statuts HTTP pour lesquels une requête idempotente est retentée
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+PAYMENT_OPTIONS = {
+    'card': 'card',
+    'mobilemoney': 'mobilemoneyfranco',
+    'paypal': 'paypal',
+    'all': 'card,mobilemoneyfranco,paypal',
+}
+
+
+class GatewayError(Exception):
+    """Réponse d'erreur ou illisible du prestataire"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GatewayUnavailable(GatewayError):
+    """Prestataire injoignable, trop lent, ou circuit ouvert"""
+
+
+class CircuitBreaker:
+    """
+    Fermé : les appels passent. Après `failure_threshold` échecs consécutifs,
+    ouvert : les appels sont refusés pendant `reset_timeout` secondes. Puis
+    semi-ouvert : un seul appel d'essai ; succès -> fermé, échec -> ouvert.
+    L'appelant libère l'essai (release) s'il se termine sans verdict.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        # Thread qui effectue l'appel d'essai (semi-ouvert)
+        self._probe = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe = None
+            if self.state == self.HALF_OPEN:
+                if self._probe is not None:
+                    return False
+                self._probe = threading.get_ident()
+            return True
+
+    def release(self):
+        """Fin d'un appel sans record_* (exception inattendue) : l'essai peut être refait"""
+        with self._lock:
+            if self._probe == threading.get_ident():
+                self._probe = None
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Flutterwave : circuit refermé")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        "Flutterwave : circuit ouvert pour %ss après %s échec(s)",
+                        self.reset_timeout, self.failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._probe = None
+
+
+class GatewayMetrics:
+    """Nombre d'appels, latences et histogramme par (opération, résultat)"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, outcome, seconds):
+        with self._lock:
+            stats = self._stats.setdefault((operation, outcome), {
+                'count': 0,
+                'total': 0.0,
+                'max': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            })
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+            stats['buckets'][index] += 1
+
+    def snapshot(self):
+        """{'opération:résultat': {count, avg_ms, max_ms, buckets}}"""
+        labels = [f'<={bound}s' for bound in LATENCY_BUCKETS] + [f'>{LATENCY_BUCKETS[-1]}s']
+        with self._lock:
+            return {
+                f'{operation}:{outcome}': {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total'] / stats['count'] * 1000, 1),
+                    'max_ms': round(stats['max'] * 1000, 1),
+                    'buckets': dict(zip(labels, stats['buckets'])),
+                }
+                for (operation, outcome), stats in self._stats.items()
+            }
+
+
+def _request_not_sent(exc):
+    """La requête n'a pas atteint le prestataire : la rejouer est sans risque"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0] if exc.args else None, 'reason', None)
+    return isinstance(reason, NewConnectionError)
+
+
+class FlutterwaveClient:
+    """Appels à l'API Flutterwave v3 (une instance par processus : get_client())"""
+
+    def __init__(self, secret_key, base_url, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.2, pool_size=10, breaker=None, metrics=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or GatewayMetrics()
+        self.pid = os.getpid()
+
+        # Les reprises sont gérées ici (gigue, idempotence), pas par urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def max_call_duration(self):
+        """Durée maximale d'un appel idempotent : tous les essais et les attentes entre eux"""
+        attempts = self.max_retries + 1
+        waits = sum(self.backoff * 2 ** attempt for attempt in range(1, attempts))
+        return attempts * sum(self.timeout) + waits
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter : les workers ne retentent pas tous au même instant
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def request(self, operation, method, path, idempotent=False, **kwargs):
+        """
+        Réponse JSON du prestataire. Les requêtes non idempotentes ne sont
+        rejouées que si elles n'ont pas été envoyées (échec de connexion).
+        """
+        if not self.breaker.allow():
+            self.metrics.observe(operation, 'rejected', 0)
+            raise GatewayUnavailable("Service de paiement momentanément indisponible")
+
+        try:
+            return self._send(operation, method, path, idempotent, **kwargs)
+        finally:
+            # Sans effet si record_success / record_failure a déjà tranché
+            self.breaker.release()
+
+    def _send(self, operation, method, path, idempotent, **kwargs):
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            error = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as exc:
+                retryable = idempotent or _request_not_sent(exc)
+                outcome = 'timeout' if isinstance(exc, requests.Timeout) else 'network_error'
+                error = GatewayUnavailable(f"Flutterwave injoignable ({type(exc).__name__})")
+            else:
+                retryable = idempotent and response.status_code in RETRY_STATUSES
+                outcome = 'ok' if response.status_code < 400 else f'http_{response.status_code}'
+
+            elapsed = time.monotonic() - started
+            self.metrics.observe(operation, outcome, elapsed)
+            logger.info("Flutterwave %s %s en %.0fms (essai %s)", operation, outcome, elapsed * 1000, attempt + 1)
+
+            if error is None and response.status_code < 500 and response.status_code != 429:
+                break
+            if retryable and attempt < self.max_retries:
+                attempt += 1
+                self._sleep_before_retry(attempt)
+                continue
+
+            self.breaker.record_failure()
+            if error is None:
+                error = GatewayUnavailable(
+                    f"Flutterwave a répondu {response.status_code}", status_code=response.status_code
+                )
+            raise error
+
+        # Le prestataire a répondu (y compris 4xx) : il est en bonne santé
+        self.breaker.record_success()
+        try:
+            body = response.json()
+        except ValueError:
+            raise GatewayError("Réponse Flutterwave illisible", status_code=response.status_code)
+
+        if response.status_code >= 400 or body.get('status') != 'success':
+            raise GatewayError(body.get('message') or "Erreur Flutterwave", status_code=response.status_code)
+        return body
+
+    def create_payment(self, order, user, payment_method='all', phone_number=''):
+        """Lien de paiement (Flutterwave Standard) pour une commande en attente"""
+        customer = {
+            'email': user.email,
+            'name': user.full_name,
+        }
+        if phone_number:
+            customer['phonenumber'] = phone_number
+
+        body = self.request('create_payment', 'POST', '/payments', json={
+            'tx_ref': order.transaction_ref,
+            'amount': str(order.total),
+            'currency': settings.FLUTTERWAVE_CURRENCY,
+            'redirect_url': f'{settings.FRONTEND_URL}/payment/callback',
+            'payment_options': PAYMENT_OPTIONS.get(payment_method, PAYMENT_OPTIONS['all']),
+            # Lien expiré avant que reconcile_pending_orders ne ferme la commande
+            'session_duration': settings.FLUTTERWAVE_PAYMENT_LINK_LIFETIME,
+            'customer': customer,
+            'customizations': {
+                'title': 'Tatlight',
+                'description': f'Commande {order.order_number}',
+            },
+            'meta': {'order_id': str(order.id)},
+        })
+        try:
+            return body['data']['link']
+        except (KeyError, TypeError):
+            raise GatewayError("Lien de paiement absent de la réponse Flutterwave")
+
+    def verify_payment(self, tx_ref):
+        """Données de la transaction (status, amount, currency, payment_type...)"""
+        body = self.request(
+            'verify_payment', 'GET', '/transactions/verify_by_reference',
+            idempotent=True, params={'tx_ref': tx_ref}
+        )
+        return body.get('data') or {}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Client du processus (recréé après un fork : la session ne se partage pas)"""
+    global _client
+    if _client is None or _client.pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client.pid != os.getpid():
+                _client = FlutterwaveClient(
+                    secret_key=settings.FLUTTERWAVE_SECRET_KEY,
+                    base_url=settings.FLUTTERWAVE_BASE_URL,
+                    connect_timeout=settings.FLUTTERWAVE_CONNECT_TIMEOUT,
+                    read_timeout=settings.FLUTTERWAVE_READ_TIMEOUT,
+                    max_retries=settings.FLUTTERWAVE_MAX_RETRIES,
+                    pool_size=settings.FLUTTERWAVE_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.FLUTTERWAVE_BREAKER_THRESHOLD,
+                        reset_timeout=settings.FLUTTERWAVE_BREAKER_RESET_TIMEOUT,
+                    ),
+                )
+    return _client
@@ -0,0 +1,145 @@
+# backend/payments/stub_server.py
+"""
+Faux serveur Flutterwave pour le développement et les tests de charge
+Usage: python -m payments.stub_server [--port 8765] [--latency 0.5] [--error-rate 0.2] [--error-status 503]
+
+Reproduit les réponses de POST /v3/payments et de
+GET /v3/transactions/verify_by_reference, avec une latence et un taux
+d'erreur configurables pour observer les délais, les reprises et le
+disjoncteur du client (FLUTTERWAVE_BASE_URL=http://127.0.0.1:8765/v3).
+
+    --amount / --currency : montant renvoyé par la vérification (sinon une
+                            référence jamais créée répond 400, comme Flutterwave)
+    --status failed       : transactions non réussies
+    --hang                : accepter la connexion sans jamais répondre
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'FlutterwaveStub/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive, comme le vrai prestataire
+
+    def log_message(self, format, *args):
+        if not self.server.options.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def simulate(self):
+        """Latence et erreurs ; True si une erreur a été renvoyée"""
+        options = self.server.options
+        with self.server.lock:
+            self.server.requests += 1
+        if options.hang:
+            time.sleep(3600)
+        if options.latency:
+            time.sleep(options.latency * random.uniform(0.5, 1.5))
+        if random.random() < options.error_rate:
+            self.send_json(options.error_status, {'status': 'error', 'message': 'Stub: erreur simulée', 'data': None})
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            payload = {}
+        if self.simulate():
+            return
+
+        if urlparse(self.path).path.rstrip('/').endswith('/payments'):
+            tx_ref = payload.get('tx_ref', '')
+            self.server.transactions[tx_ref] = payload
+            self.send_json(200, {
+                'status': 'success',
+                'message': 'Hosted Link',
+                'data': {'link': f'http://{self.headers.get("Host")}/pay/{tx_ref}'},
+            })
+            return
+        self.send_json(404, {'status': 'error', 'message': 'Not found', 'data': None})
+
+    def do_GET(self):
+        if self.simulate():
+            return
+
+        url = urlparse(self.path)
+        if not url.path.rstrip('/').endswith('/transactions/verify_by_reference'):
+            self.send_json(404, {'status': 'error', 'message': 'Not found', 'data': None})
+            return
+
+        options = self.server.options
+        tx_ref = parse_qs(url.query).get('tx_ref', [''])[0]
+        created = self.server.transactions.get(tx_ref)
+        if created is None and options.amount is None:
+            self.send_json(400, {'status': 'error', 'message': 'No transaction was found for this id', 'data': None})
+            return
+        created = created or {}
+        self.send_json(200, {
+            'status': 'success',
+            'message': 'Transaction fetched successfully',
+            'data': {
+                'id': abs(hash(tx_ref)) % 10 ** 8,
+                'tx_ref': tx_ref,
+                'status': options.status,
+                'amount': options.amount if options.amount is not None else float(created.get('amount') or 0),
+                'currency': options.currency or created.get('currency', 'EUR'),
+                'payment_type': 'card',
+            },
+        })
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='Latence moyenne (secondes)')
+    parser.add_argument('--error-rate', type=float, default=0, help="Proportion de réponses en erreur (0 à 1)")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--status', default='successful', help='Statut des transactions vérifiées')
+    parser.add_argument('--amount', type=float, help='Montant renvoyé (par défaut celui du paiement créé)')
+    parser.add_argument('--currency', help='Devise renvoyée (par défaut celle du paiement créé)')
+    parser.add_argument('--hang', action='store_true', help='Ne jamais répondre')
+    parser.add_argument('--quiet', action='store_true')
+    return parser
+
+
+def build_server(options):
+    """Serveur prêt à servir (--port 0 : port libre, voir server.server_port)"""
+    server = ThreadingHTTPServer((options.host, options.port), StubHandler)
+    server.daemon_threads = True
+    server.options = options
+    server.transactions = {}
+    server.requests = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def main():
+    options = build_parser().parse_args()
+    server = build_server(options)
+    print(f"Faux Flutterwave sur http://{options.host}:{server.server_port}/v3")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
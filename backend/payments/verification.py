@@ -0,0 +1,121 @@
+# backend/payments/verification.py
+"""
+Vérification des transactions Flutterwave, mise en cache et regroupée
+
+La page de confirmation du frontend interroge verify_payment en boucle pour
+la même référence. Le résultat est mis en cache par tx_ref : longtemps pour
+une transaction réussie, quelques secondes sinon (un paiement échoué ou
+annulé peut être retenté avec le même lien). Les appels simultanés pour la
+même référence ne font qu'une requête au prestataire : dans le processus
+(SingleFlight), et entre processus via un verrou dans le cache. Les autres
+processus attendent le résultat tant que le verrou est tenu ; il expire au
+plus tard avec l'appel le plus long possible (reprises comprises).
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .flutterwave import get_client
+
+# Statuts Flutterwave qui terminent une tentative de paiement
+FINAL_STATUSES = {'successful', 'failed', 'cancelled'}
+
+# Seul statut définitif : mis en cache longtemps
+SETTLED_STATUS = 'successful'
+
+# Intervalle d'interrogation du cache en attendant un autre processus (secondes)
+LOCK_POLL_INTERVAL = 0.05
+
+
+class SingleFlight:
+    """Un seul appel en cours par clé ; les appels concurrents en partagent le résultat"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_flight = SingleFlight()
+
+
+def _cache_key(tx_ref):
+    # tx_ref vient du client : condensé pour une clé sûre quel que soit le backend
+    return 'payments:verify:' + hashlib.sha1(tx_ref.encode()).hexdigest()
+
+
+def _result_timeout(data):
+    if data.get('status') == SETTLED_STATUS:
+        return settings.PAYMENT_VERIFICATION_FINAL_TIMEOUT
+    return settings.PAYMENT_VERIFICATION_PENDING_TIMEOUT
+
+
+def _fetch(tx_ref, key):
+    client = get_client()
+    lock_key = f'{key}:lock'
+    # Le verrou couvre l'appel entier, reprises comprises, sinon un autre processus le doublerait
+    lock_timeout = math.ceil(client.max_call_duration()) + 1
+
+    # Un autre processus interroge déjà le prestataire : attendre son résultat.
+    # S'il échoue (erreur non mise en cache), le verrou est libéré et l'un des
+    # processus en attente le reprend ; au pire il expire après lock_timeout.
+    while not cache.add(lock_key, 1, timeout=lock_timeout):
+        time.sleep(LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+    try:
+        data = cache.get(key)
+        if data is None:
+            data = client.verify_payment(tx_ref)
+            cache.set(key, data, _result_timeout(data))
+    finally:
+        cache.delete(lock_key)
+    return data
+
+
+def verify_transaction(tx_ref):
+    """
+    Données de la transaction (comme FlutterwaveClient.verify_payment), depuis
+    le cache si possible. Les erreurs du prestataire ne sont pas mises en cache.
+    """
+    key = _cache_key(tx_ref)
+    data = cache.get(key)
+    if data is not None:
+        return data
+    return _flight.do(key, lambda: _fetch(tx_ref, key))
@@ -2,6 +2,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Sum
+from tatlight_backend.images import smallest_variant_url
 from .models import Category, Product, ProductFile, Review
 
 
@@ -15,10 +16,9 @@ class CategoryAdmin(admin.ModelAdmin):
     
     def products_count(self, obj):
         """Nombre de produits dans la catégorie"""
-        count = obj.products.filter(is_active=True).count()
         return format_html(
             '<span style="font-weight: bold; color: #D4AF37;">{}</span>',
-            count
+            obj.active_products_count
         )
     
     products_count.short_description = 'Produits actifs'
@@ -95,11 +95,11 @@ class ProductAdmin(admin.ModelAdmin):
     actions = ['activate_products', 'deactivate_products', 'feature_products', 'unfeature_products']
     
     def image_preview(self, obj):
-        """Aperçu de l'image"""
+        """Aperçu de l'image (miniature si disponible)"""
         if obj.image:
             return format_html(
                 '<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" />',
-                obj.image.url
+                smallest_variant_url(obj.image_variants) or obj.image.url
             )
         return '—'
     
@@ -3,4 +3,13 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
-    verbose_name = 'Gestion des produits'
\ No newline at end of file
+    verbose_name = 'Gestion des produits'
+    
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401
+        from .search import register_sqlite_functions, ensure_search_schema_after_migrate
+        
+        connection_created.connect(register_sqlite_functions)
+        post_migrate.connect(ensure_search_schema_after_migrate, sender=self)
@@ -0,0 +1,126 @@
+# backend/products/cache.py
+"""
+Cache partagé des réponses publiques du catalogue
+
+Chaque entrée est associée à des tags ('catalog', 'categories', 'product:<id>').
+Un tag possède une version stockée dans le cache : la clé d'une réponse inclut
+les versions de ses tags, donc invalider un tag (changer sa version) rend
+inaccessibles toutes les réponses qui en dépendent, sans avoir à les lister.
+Une version commence par l'horodatage de l'invalidation : les vues s'en
+servent aussi pour leur en-tête Last-Modified (tags_last_modified).
+"""
+
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+# Tags utilisés par les vues et les signaux
+CATALOG_TAG = 'catalog'
+CATEGORIES_TAG = 'categories'
+
+
+def product_tag(product_id):
+    return f'product:{product_id}'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return f'catalog:tag:{tag}'
+
+
+def _new_version():
+    """'<horodatage>-<aléa>' : unique, et datée pour Last-Modified"""
+    return f'{int(time.time())}-{uuid.uuid4().hex}'
+
+
+def tags_last_modified(versions):
+    """Date de la dernière invalidation parmi des versions de tags, None si inconnue"""
+    timestamps = [
+        int(version.split('-', 1)[0]) for version in versions
+        if version.split('-', 1)[0].isdigit()
+    ]
+    if not timestamps:
+        return None
+    return datetime.fromtimestamp(max(timestamps), tz=timezone.utc)
+
+
+def get_tag_versions(tags):
+    """Récupérer (ou initialiser) les versions des tags en un seul aller-retour"""
+    cache = get_cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        # Version aléatoire : une entrée écrite avec une ancienne version
+        # (tag expulsé du cache) ne peut jamais redevenir valide
+        for key, version in missing.items():
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+            versions[key] = version
+
+    return [versions[_tag_key(tag)] for tag in tags]
+
+
+def invalidate_tags(*tags):
+    """Invalider les tags après le commit de la transaction en cours"""
+    tags = {tag for tag in tags if tag}
+    if not tags:
+        return
+
+    def bump():
+        get_cache().set_many({_tag_key(tag): _new_version() for tag in tags}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def build_cache_key(request, tags):
+    """Clé dépendant du chemin, des paramètres (filtres, recherche, tri, page) et des tags"""
+    query = sorted(request.query_params.lists())
+    versions = get_tag_versions(tags)
+    raw = f'{request.path}?{query}|{versions}'
+    return 'catalog:response:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def is_cacheable(request):
+    """Seules les requêtes GET anonymes partagent une même réponse"""
+    return request.method == 'GET' and not request.user.is_authenticated
+
+
+def cache_catalog_response(*tags):
+    """
+    Décorateur pour les actions en lecture seule d'un ViewSet.
+    Les tags peuvent contenir des paramètres d'URL : 'product:{pk}'
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view_method(self, request, *args, **kwargs)
+
+            resolved_tags = [tag.format(**kwargs) for tag in tags]
+            key = build_cache_key(request, resolved_tags)
+            cache = get_cache()
+
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
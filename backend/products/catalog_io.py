@@ -0,0 +1,95 @@
+# backend/products/catalog_io.py
+"""
+Format d'échange du catalogue (commandes import_catalog / export_catalog)
+
+Une ligne par produit, en CSV (avec en-tête) ou en JSON lines :
+    slug, title, description, category (slug), file_type, price, image, is_active, featured
+Les fichiers sont lus et écrits en flux : la mémoire reste constante.
+"""
+
+import csv
+import json
+import sys
+from contextlib import nullcontext
+
+CATALOG_COLUMNS = (
+    'slug',
+    'title',
+    'description',
+    'category',
+    'file_type',
+    'price',
+    'image',
+    'is_active',
+    'featured',
+)
+
+FORMATS = ('csv', 'jsonl')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'oui', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'non', 'off', ''}
+
+
+def guess_format(path, default='csv'):
+    for extension in FORMATS:
+        if path.endswith(f'.{extension}'):
+            return extension
+    if path.endswith('.json'):
+        return 'jsonl'
+    return default
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"booléen invalide : {value!r}")
+
+
+def open_stream(path, mode):
+    """Fichier texte UTF-8, ou stdin/stdout pour '-' (non fermés en sortie)"""
+    if path == '-':
+        return nullcontext(sys.stdin if 'r' in mode else sys.stdout)
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def read_rows(stream, fmt):
+    """Itérer sur (numéro de ligne, dict) sans charger le fichier ; dict = None si illisible"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class RowWriter:
+    """Écriture CSV ou JSON lines, ligne par ligne"""
+
+    def __init__(self, stream, fmt, columns=CATALOG_COLUMNS):
+        self.stream = stream
+        self.fmt = fmt
+        self.columns = columns
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, fieldnames=columns)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+            self.stream.write('\n')
@@ -0,0 +1,83 @@
+# backend/products/facets.py
+"""
+Compteurs de facettes du catalogue (catégorie, type de fichier, mis en avant, tranches de prix)
+
+Tous les compteurs sont calculés par une seule requête d'agrégation
+conditionnelle : COUNT(*) FILTER (WHERE ...) sur Postgres, SUM(CASE ...) ailleurs.
+La liste des catégories est lue dans le cache (tag 'categories') : pas de
+requête supplémentaire tant qu'aucune catégorie ne change.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Q
+
+from .cache import CATEGORIES_TAG, get_cache, get_tag_versions
+from .models import Category, Product
+
+# Bornes des tranches de prix (€) : <10, 10-25, 25-50, 50-100, >=100
+PRICE_FACET_BOUNDS = (Decimal('10'), Decimal('25'), Decimal('50'), Decimal('100'))
+
+
+def price_ranges(bounds=PRICE_FACET_BOUNDS):
+    """[(min, max), ...] ; None pour une borne ouverte"""
+    edges = (None,) + tuple(bounds) + (None,)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _price_filter(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def facet_categories():
+    """[(id, slug), ...] des catégories, en cache jusqu'à l'invalidation du tag 'categories'"""
+    cache = get_cache()
+    key = 'catalog:facet_categories:' + get_tag_versions([CATEGORIES_TAG])[0]
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.order_by('name').values_list('id', 'slug'))
+        cache.set(key, categories, settings.CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+def catalog_facets(queryset):
+    """Facettes des produits de `queryset` (déjà filtré par la recherche / les filtres)"""
+    categories = facet_categories()
+    file_types = [value for value, _ in Product.FILE_TYPE_CHOICES]
+    ranges = price_ranges()
+
+    aggregates = {
+        'total': Count('pk'),
+        'price_min': Min('price'),
+        'price_max': Max('price'),
+        'featured_true': Count('pk', filter=Q(featured=True)),
+    }
+    for category_id, _ in categories:
+        aggregates[f'category_{category_id}'] = Count('pk', filter=Q(category_id=category_id))
+    for file_type in file_types:
+        aggregates[f'file_type_{file_type}'] = Count('pk', filter=Q(file_type=file_type))
+    for index, (low, high) in enumerate(ranges):
+        aggregates[f'price_{index}'] = Count('pk', filter=_price_filter(low, high))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'categories': {slug: counts[f'category_{category_id}'] for category_id, slug in categories},
+        'file_types': {file_type: counts[f'file_type_{file_type}'] for file_type in file_types},
+        'featured': {
+            'true': counts['featured_true'],
+            'false': counts['total'] - counts['featured_true'],
+        },
+        'price_ranges': [
+            {'min': low, 'max': high, 'count': counts[f'price_{index}']}
+            for index, (low, high) in enumerate(ranges)
+        ],
+        'price': {'min': counts['price_min'], 'max': counts['price_max']},
+    }
@@ -0,0 +1,21 @@
+# backend/products/filters.py
+from rest_framework import filters
+
+from .search import search_products
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """Recherche plein texte (?search=) via products.search au lieu de icontains"""
+    
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        return search_products(queryset, term)
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """Sans ?ordering= explicite, une recherche est triée par pertinence"""
+    
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_score' in queryset.query.annotations:
+            return ['-search_score', '-pk']
+        return super().get_ordering(request, queryset, view)
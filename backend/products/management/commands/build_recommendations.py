@@ -0,0 +1,120 @@
+# backend/products/management/commands/build_recommendations.py
+"""
+Calculer les recommandations "les clients ont aussi acheté"
+Usage: python manage.py build_recommendations [--top-k 10] [--min-common 1]
+
+Similarité cosinus entre produits sur la matrice commandes x produits :
+    sim(i, j) = co_achats(i, j) / sqrt(ventes(i) * ventes(j))
+Les co-achats sont comptés de façon vectorisée (paires en coordonnées
+éparses + np.unique), sans jamais matérialiser la matrice produits x produits.
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import OrderItem
+from products.cache import CATALOG_TAG, invalidate_tags
+from products.models import ProductRecommendation
+
+
+def co_purchase_pairs(order_index, product_index):
+    """
+    Toutes les paires (i, j), i != j, de produits achetés dans une même commande.
+    Les deux tableaux doivent être triés par commande.
+    """
+    order_sizes = np.bincount(order_index)
+    order_starts = np.concatenate(([0], np.cumsum(order_sizes)[:-1]))
+
+    # Chaque article est associé à tous les articles de sa commande
+    sizes = order_sizes[order_index]
+    left = np.repeat(np.arange(len(order_index)), sizes)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    right = np.repeat(order_starts[order_index], sizes) + offsets
+
+    keep = left != right
+    return product_index[left[keep]], product_index[right[keep]]
+
+
+def top_k_neighbours(order_index, product_index, n_products, top_k, min_common):
+    """Retourne (produit, voisin, score, rang) pour les top_k voisins de chaque produit"""
+    sales = np.bincount(product_index, minlength=n_products).astype(np.float64)
+
+    left, right = co_purchase_pairs(order_index, product_index)
+    if not len(left):
+        return []
+
+    # Comptage des paires (i, j) : codage linéaire puis np.unique
+    codes, counts = np.unique(left.astype(np.int64) * n_products + right, return_counts=True)
+    keep = counts >= min_common
+    codes, counts = codes[keep], counts[keep]
+    sources, targets = np.divmod(codes, n_products)
+
+    scores = counts / np.sqrt(sales[sources] * sales[targets])
+
+    # Tri par produit source puis score décroissant, on garde les top_k de chaque groupe
+    order = np.lexsort((-scores, sources))
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    group_starts = np.searchsorted(sources, sources, side='left')
+    ranks = np.arange(len(sources)) - group_starts
+    keep = ranks < top_k
+
+    return zip(sources[keep], targets[keep], scores[keep], ranks[keep])
+
+
+class Command(BaseCommand):
+    help = "Construit la table des recommandations à partir de l'historique des commandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10, help='Voisins conservés par produit')
+        parser.add_argument('--min-common', type=int, default=1, help='Co-achats minimum')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        rows = list(
+            OrderItem.objects
+            .filter(order__status='COMPLETED')
+            .values_list('order_id', 'product_id')
+            .distinct()
+        )
+        if not rows:
+            self.stdout.write("Aucune commande terminée : rien à calculer.")
+            return
+
+        orders, products = zip(*rows)
+        order_ids, order_index = np.unique(np.array([str(o) for o in orders]), return_inverse=True)
+        product_ids, product_index = np.unique(np.array(products, dtype=np.int64), return_inverse=True)
+
+        sort = np.argsort(order_index, kind='stable')
+        neighbours = top_k_neighbours(
+            order_index[sort],
+            product_index[sort],
+            len(product_ids),
+            options['top_k'],
+            options['min_common'],
+        )
+
+        recommendations = [
+            ProductRecommendation(
+                product_id=int(product_ids[source]),
+                recommended_id=int(product_ids[target]),
+                score=float(score),
+                rank=int(rank),
+            )
+            for source, target, score, rank in neighbours
+        ]
+
+        with transaction.atomic():
+            ProductRecommendation.objects.all().delete()
+            ProductRecommendation.objects.bulk_create(recommendations, batch_size=options['batch_size'])
+            invalidate_tags(CATALOG_TAG)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(recommendations)} recommandation(s) pour {len(product_ids)} produit(s) "
+            f"à partir de {len(order_ids)} commande(s) en {elapsed:.2f}s"
+        ))
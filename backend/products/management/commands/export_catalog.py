@@ -0,0 +1,53 @@
+# backend/products/management/commands/export_catalog.py
+"""
+Exporter le catalogue en CSV ou JSON lines (format relu par import_catalog)
+Usage: python manage.py export_catalog produits.csv [--format jsonl] [--active-only]
+       python manage.py export_catalog - --format jsonl > produits.jsonl
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.catalog_io import CATALOG_COLUMNS, FORMATS, RowWriter, guess_format, open_stream
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Exporte les produits en flux (mémoire constante)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier de sortie ('-' pour la sortie standard)")
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--active-only', action='store_true')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+
+        products = Product.objects.order_by('pk')
+        if options['active_only']:
+            products = products.filter(is_active=True)
+
+        # values_list + iterator : ni instances ni cache de queryset
+        rows = products.values_list(
+            'slug',
+            'title',
+            'description',
+            'category__slug',
+            'file_type',
+            'price',
+            'image',
+            'is_active',
+            'featured',
+        ).iterator(chunk_size=options['chunk_size'])
+
+        exported = 0
+        with open_stream(options['path'], 'w') as stream:
+            writer = RowWriter(stream, fmt)
+            for values in rows:
+                row = dict(zip(CATALOG_COLUMNS, values))
+                row['price'] = str(row['price'])
+                writer.write(row)
+                exported += 1
+
+        if options['path'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"✅ {exported} produit(s) exporté(s) vers {options['path']}"))
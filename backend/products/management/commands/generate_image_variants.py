@@ -0,0 +1,56 @@
+# backend/products/management/commands/generate_image_variants.py
+"""
+Générer les miniatures des images existantes (produits et avatars)
+Usage: python manage.py generate_image_variants [--force] [--workers 4] [--only products|avatars]
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.models import Product
+from tatlight_backend.images import update_image_variants
+
+User = get_user_model()
+
+TARGETS = {
+    'products': (Product, 'image', 'image_variants'),
+    'avatars': (User, 'avatar', 'avatar_variants'),
+}
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes WebP/JPEG des images produits et des avatars"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Régénérer même si des variantes existent')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--only', choices=sorted(TARGETS))
+
+    def handle(self, *args, **options):
+        targets = [options['only']] if options['only'] else list(TARGETS)
+
+        for target in targets:
+            model, field, variants_field = TARGETS[target]
+
+            queryset = model._default_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            if not options['force']:
+                queryset = queryset.filter(**{variants_field: {}})
+            pks = list(queryset.values_list('pk', flat=True))
+
+            def work(pk):
+                try:
+                    update_image_variants(model, pk, field, variants_field)
+                finally:
+                    close_old_connections()
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                list(executor.map(work, pks))
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {target}: {len(pks)} image(s) traitée(s) en {time.monotonic() - started:.1f}s"
+            ))
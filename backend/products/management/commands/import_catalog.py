@@ -0,0 +1,216 @@
+# backend/products/management/commands/import_catalog.py
+"""
+Importer (upsert) des produits depuis un fichier CSV ou JSON lines
+Usage: python manage.py import_catalog produits.csv [--format jsonl] [--batch-size 1000] [--dry-run]
+       cat produits.jsonl | python manage.py import_catalog - --format jsonl
+
+Les produits sont identifiés par leur slug (dérivé du titre si absent) :
+un slug existant est mis à jour, sinon le produit est créé. Les lignes sont
+écrites par lots (bulk_create update_conflicts) dans une transaction par lot.
+Seules les colonnes présentes dans une ligne sont mises à jour : les lignes
+JSON lines n'ont pas toutes les mêmes clés.
+"""
+
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from products.cache import CATALOG_TAG, CATEGORIES_TAG, invalidate_tags
+from products.catalog_io import FORMATS, guess_format, open_stream, parse_bool, read_rows
+from products.models import Category, Product
+
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+FILE_TYPES = {value for value, _ in Product.FILE_TYPE_CHOICES}
+
+# Prix admis par Product.price (max_digits=10, decimal_places=2)
+PRICE_FIELD = Product._meta.get_field('price')
+PRICE_QUANTUM = Decimal(1).scaleb(-PRICE_FIELD.decimal_places)
+PRICE_LIMIT = Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)
+
+# Colonnes du fichier -> champs du modèle mis à jour en cas de conflit
+UPDATABLE_FIELDS = {
+    'title': 'title',
+    'description': 'description',
+    'category': 'category',
+    'file_type': 'file_type',
+    'price': 'price',
+    'image': 'image',
+    'is_active': 'is_active',
+    'featured': 'featured',
+}
+
+
+def parse_price(value):
+    """Prix fini, positif et stockable ; NaN, Infinity et 1e20 passent Decimal() mais pas la base"""
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        price = None
+    if price is not None and price.is_finite() and 0 <= price < PRICE_LIMIT:
+        price = price.quantize(PRICE_QUANTUM)
+        # L'arrondi peut atteindre la limite (99999999.999)
+        if price < PRICE_LIMIT:
+            return price
+    raise ValueError(f"prix invalide : {value!r}")
+
+
+class SlugAllocator:
+    """
+    Slugs uniques générés en mémoire : titre -> slug, puis -2, -3... si un
+    autre produit du fichier a déjà pris ce slug. Aucune requête par ligne.
+    """
+
+    def __init__(self):
+        self.used = set()
+        self.next_suffix = {}
+
+    def allocate(self, title, explicit=None):
+        if explicit:
+            slug = slugify(explicit)[:SLUG_MAX_LENGTH]
+            self.used.add(slug)
+            return slug
+
+        base = slugify(title)[:SLUG_MAX_LENGTH] or 'produit'
+        slug = base
+        while slug in self.used:
+            suffix = self.next_suffix.get(base, 2)
+            self.next_suffix[base] = suffix + 1
+            slug = f'{base[:SLUG_MAX_LENGTH - len(str(suffix)) - 1]}-{suffix}'
+        self.used.add(slug)
+        return slug
+
+
+class Command(BaseCommand):
+    help = "Importe des produits (CSV ou JSON lines) par lots, en mettant à jour les slugs existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer ('-' pour l'entrée standard)")
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Valider sans écrire')
+        parser.add_argument('--max-errors', type=int, default=20, help='Erreurs affichées au maximum')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        # Catégories résolues en mémoire, par slug ou par nom
+        categories = {}
+        for category_id, slug, name in Category.objects.values_list('id', 'slug', 'name'):
+            categories[slug] = categories[name] = category_id
+
+        self.slugs = SlugAllocator()
+        self.errors = 0
+        self.max_errors = options['max_errors']
+
+        imported = 0
+        # Par slug : une même ligne répétée dans un lot ne doit être écrite qu'une fois
+        batch = {}
+
+        try:
+            stream = open_stream(options['path'], 'r')
+        except OSError as exc:
+            raise CommandError(f"Impossible d'ouvrir {options['path']} : {exc}")
+
+        with stream:
+            for line_number, row in read_rows(stream, fmt):
+                if row is None:
+                    self.reject(line_number, "ligne illisible")
+                    continue
+
+                product = self.build_product(line_number, row, categories)
+                if product is None:
+                    continue
+                update_fields = tuple(
+                    field for column, field in UPDATABLE_FIELDS.items() if column in row
+                ) + ('updated_at',)
+                batch[product.slug] = (product, update_fields)
+
+                if len(batch) >= batch_size:
+                    imported += self.write_batch(batch.values(), options['dry_run'])
+                    batch = {}
+
+        if batch:
+            imported += self.write_batch(batch.values(), options['dry_run'])
+
+        if imported and not options['dry_run']:
+            # bulk_create ne déclenche pas products.signals : compteurs et cache à la main
+            with transaction.atomic():
+                Category.objects.all().refresh_products_count()
+                invalidate_tags(CATALOG_TAG, CATEGORIES_TAG)
+
+        elapsed = time.monotonic() - started
+        action = 'validé(s)' if options['dry_run'] else 'importé(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {imported} produit(s) {action} en {elapsed:.1f}s, {self.errors} ligne(s) rejetée(s)"
+        ))
+        if imported and not options['dry_run']:
+            self.stdout.write("Miniatures : python manage.py generate_image_variants --only products")
+
+    def reject(self, line_number, message):
+        self.errors += 1
+        if self.errors <= self.max_errors:
+            self.stderr.write(f"Ligne {line_number} : {message}")
+
+    def build_product(self, line_number, row, categories):
+        """Product non sauvegardé, ou None si la ligne est invalide"""
+        title = (row.get('title') or '').strip()
+        if not title:
+            self.reject(line_number, "titre manquant")
+            return None
+
+        category_id = categories.get((row.get('category') or '').strip())
+        if category_id is None:
+            self.reject(line_number, f"catégorie inconnue : {row.get('category')!r}")
+            return None
+
+        file_type = (row.get('file_type') or '').strip()
+        if file_type not in FILE_TYPES:
+            self.reject(line_number, f"type de fichier invalide : {file_type!r}")
+            return None
+
+        try:
+            price = parse_price(row.get('price', ''))
+            is_active = parse_bool(row.get('is_active', True))
+            featured = parse_bool(row.get('featured', False))
+        except ValueError as exc:
+            self.reject(line_number, str(exc))
+            return None
+
+        return Product(
+            slug=self.slugs.allocate(title, (row.get('slug') or '').strip()),
+            title=title[:255],
+            description=row.get('description') or '',
+            category_id=category_id,
+            file_type=file_type,
+            price=price,
+            image=row.get('image') or '',
+            is_active=is_active,
+            featured=featured,
+        )
+
+    def write_batch(self, batch, dry_run):
+        """batch : (produit, champs à mettre à jour) ; un bulk_create par jeu de colonnes"""
+        groups = {}
+        for product, update_fields in batch:
+            groups.setdefault(update_fields, []).append(product)
+        if dry_run:
+            return sum(len(products) for products in groups.values())
+
+        now = timezone.now()
+        with transaction.atomic():
+            for update_fields, products in groups.items():
+                for product in products:
+                    product.updated_at = now
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['slug'],
+                    update_fields=list(update_fields),
+                )
+        return sum(len(products) for products in groups.values())
@@ -0,0 +1,21 @@
+# backend/products/management/commands/recount_category_products.py
+"""
+Recalculer Category.active_products_count pour toutes les catégories
+Usage: python manage.py recount_category_products
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recalcule le compteur de produits actifs de chaque catégorie"
+
+    def handle(self, *args, **options):
+        updated = Category.objects.all().refresh_products_count()
+
+        for name, count in Category.objects.values_list('name', 'active_products_count'):
+            self.stdout.write(f"  {name}: {count} produit(s) actif(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {updated} catégorie(s) recalculée(s)"))
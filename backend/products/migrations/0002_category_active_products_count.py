@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_active_products_count(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+
+    counts = dict(
+        Product.objects.filter(is_active=True)
+        .order_by()
+        .values_list('category')
+        .annotate(total=Count('pk'))
+    )
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.active_products_count = counts.get(category.pk, 0)
+    Category.objects.bulk_update(categories, ['active_products_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_products_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Produits actifs'),
+        ),
+        migrations.RunPython(backfill_active_products_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Index de recherche plein texte des produits (voir products/search.py)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from products.search import ensure_search_schema
+    ensure_search_schema(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from products.search import drop_search_schema
+    drop_search_schema(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_category_active_products_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
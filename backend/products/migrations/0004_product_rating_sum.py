@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:57
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+
+    totals = (
+        Review.objects.order_by()
+        .values_list('product')
+        .annotate(total=Sum('rating'), count=Count('pk'))
+    )
+    products = []
+    for product_id, total, count in totals:
+        rating = (Decimal(total) / count).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+        products.append(Product(pk=product_id, rating_sum=total, reviews_count=count, rating=rating))
+    Product.objects.bulk_update(products, ['rating_sum', 'reviews_count', 'rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Somme des notes'),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,30 @@
 # backend/products/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .cache import CATALOG_TAG, CATEGORIES_TAG, invalidate_tags
+
+
+class CategoryQuerySet(models.QuerySet):
+    """QuerySet des catégories"""
+    
+    def refresh_products_count(self):
+        """
+        Recalculer le compteur de produits actifs des catégories sélectionnées
+        en une seule requête UPDATE (sous-requête groupée par catégorie)
+        """
+        active_count = Product.objects.filter(
+            category=OuterRef('pk'),
+            is_active=True
+        ).order_by().values('category').annotate(total=Count('pk')).values('total')
+        
+        return self.update(
+            active_products_count=Coalesce(Subquery(active_count), Value(0))
+        )
+
 
 class Category(models.Model):
     """Catégories de produits"""
@@ -18,6 +41,11 @@ class Category(models.Model):
     description = models.TextField('Description', blank=True)
     icon = models.CharField('Icône', max_length=50, blank=True)
     
+    # Compteur dénormalisé, maintenu par products.signals
+    active_products_count = models.PositiveIntegerField('Produits actifs', default=0, editable=False)
+    
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Catégorie'
         verbose_name_plural = 'Catégories'
@@ -31,6 +59,68 @@ class Category(models.Model):
         super().save(*args, **kwargs)
 
 
+class ProductQuerySet(models.QuerySet):
+    """QuerySet des produits"""
+    
+    # Champs dont la modification fait varier Category.active_products_count
+    COUNTER_FIELDS = {'is_active', 'category', 'category_id'}
+    
+    # Valeurs dérivées (ventes, notes, miniatures) : ne modifient pas le contenu
+    DERIVED_FIELDS = {'sales_count', 'rating', 'rating_sum', 'reviews_count', 'image_variants'}
+    
+    def update(self, **kwargs):
+        """
+        queryset.update() ne déclenche aucun signal : on resynchronise ici
+        les compteurs des catégories touchées (avant et après la mise à jour).
+        updated_at (auto_now) n'est renseigné que pour une modification du
+        contenu ; les mises à jour des valeurs dérivées passent seulement par
+        l'invalidation du cache catalogue, prise en compte par les ETag/Last-Modified.
+        """
+        if set(kwargs) - self.DERIVED_FIELDS:
+            kwargs.setdefault('updated_at', timezone.now())
+        
+        if not self.COUNTER_FIELDS.intersection(kwargs):
+            rows = super().update(**kwargs)
+            if rows:
+                invalidate_tags(CATALOG_TAG)
+            return rows
+        
+        with transaction.atomic(using=self.db):
+            category_ids = set(
+                self.order_by().values_list('category_id', flat=True).distinct()
+            )
+            rows = super().update(**kwargs)
+            
+            new_category = kwargs.get('category', kwargs.get('category_id'))
+            if new_category is not None:
+                category_ids.add(getattr(new_category, 'pk', new_category))
+            
+            if rows:
+                Category.objects.filter(pk__in=category_ids).refresh_products_count()
+                invalidate_tags(CATALOG_TAG, CATEGORIES_TAG)
+        
+        return rows
+    
+    def apply_review_delta(self, rating_delta, count_delta):
+        """
+        Mettre à jour la note en un seul UPDATE atomique :
+        rating_sum/reviews_count sont incrémentés en base (F-expressions) et
+        rating est recalculé à partir des nouvelles valeurs dans la même instruction
+        """
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('reviews_count') + count_delta
+        average = Cast(
+            Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+            DecimalField(max_digits=12, decimal_places=4)
+        )
+        
+        return self.update(
+            rating_sum=new_sum,
+            reviews_count=new_count,
+            rating=Coalesce(Round(average, 1), Value(0), output_field=DecimalField(max_digits=2, decimal_places=1)),
+        )
+
+
 class Product(models.Model):
     """Produits digitaux"""
     
@@ -58,11 +148,13 @@ class Product(models.Model):
     # Prix
     price = models.DecimalField('Prix', max_digits=10, decimal_places=2)
     
-    # Image de couverture
+    # Image de couverture (+ miniatures générées par tatlight_backend.images)
     image = models.ImageField('Image', upload_to='products/')
+    image_variants = models.JSONField('Variantes de l\'image', default=dict, blank=True, editable=False)
     
-    # Stats
+    # Stats (rating = rating_sum / reviews_count, maintenus par products.signals)
     rating = models.DecimalField('Note moyenne', max_digits=2, decimal_places=1, default=0)
+    rating_sum = models.PositiveIntegerField('Somme des notes', default=0, editable=False)
     reviews_count = models.IntegerField('Nombre d\'avis', default=0)
     sales_count = models.IntegerField('Nombre de ventes', default=0)
     
@@ -74,14 +166,47 @@ class Product(models.Model):
     created_at = models.DateTimeField('Date de création', auto_now_add=True)
     updated_at = models.DateTimeField('Date de modification', auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Produit'
         verbose_name_plural = 'Produits'
         ordering = ['-created_at']
+        # Catalogue public : produits actifs, triés (pk départage la pagination par curseur)
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_created_idx'
+            ),
+            models.Index(
+                fields=['sales_count', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_sales_idx'
+            ),
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_price_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_state()
+        return instance
+    
+    def remember_loaded_state(self):
+        """Mémoriser l'état persisté (utilisé par products.signals)"""
+        self._loaded_category_id = self.__dict__.get('category_id')
+        self._loaded_is_active = self.__dict__.get('is_active')
+        image = self.__dict__.get('image')
+        self._loaded_image = getattr(image, 'name', image)
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -143,4 +268,47 @@ class Review(models.Model):
         unique_together = ['product', 'user']  # Un avis par utilisateur par produit
     
     def __str__(self):
-        return f"Avis de {self.user.email} sur {self.product.title}"
\ No newline at end of file
+        return f"Avis de {self.user.email} sur {self.product.title}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_state()
+        return instance
+    
+    def remember_loaded_state(self):
+        """Mémoriser la note persistée (utilisé par products.signals)"""
+        self._loaded_product_id = self.__dict__.get('product_id')
+        self._loaded_rating = self.__dict__.get('rating')
+
+
+class ProductRecommendation(models.Model):
+    """Produits souvent achetés ensemble (calculé par build_recommendations)"""
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Produit'
+    )
+    
+    recommended = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='recommended_for',
+        verbose_name='Produit recommandé'
+    )
+    
+    score = models.FloatField('Similarité')
+    rank = models.PositiveSmallIntegerField('Rang')
+    
+    class Meta:
+        verbose_name = 'Recommandation'
+        verbose_name_plural = 'Recommandations'
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.title} → {self.recommended.title}"
@@ -0,0 +1,314 @@
+# backend/products/search.py
+"""
+Moteur de recherche plein texte des produits
+
+- PostgreSQL : colonne tsvector `search_document` (titre pondéré A, description B)
+  maintenue par trigger, index GIN, configuration `tatlight_fr`
+  (unaccent + stemming français Snowball)
+- SQLite (local/tests) : table FTS5 `products_product_fts` maintenue par triggers ;
+  le repliement des accents et le stemming sont faits en Python via la fonction
+  SQL `tatlight_search_document`, enregistrée à chaque connexion
+- Autres bases : repli sur icontains
+
+Les résultats sont annotés avec `search_score` : pertinence mêlée aux ventes et à la note.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.db import connections
+from django.db.models import BooleanField, ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Ln
+
+# Poids des signaux de popularité dans le score final
+SALES_WEIGHT = 0.1
+RATING_WEIGHT = 0.05
+
+TS_CONFIG = 'tatlight_fr'
+PRODUCT_TABLE = 'products_product'
+FTS_TABLE = 'products_product_fts'
+SQLITE_DOCUMENT_FUNCTION = 'tatlight_search_document'
+SEARCH_MIGRATION = ('products', '0003_product_search_index')
+
+STOPWORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'en', 'et',
+    'est', 'il', 'la', 'le', 'les', 'leur', 'ma', 'mes', 'mon', 'ne', 'ou', 'par',
+    'pas', 'pour', 'qu', 'que', 'qui', 'sa', 'se', 'ses', 'son', 'sur', 'ta', 'te',
+    'tes', 'ton', 'un', 'une', 'vos', 'votre', 'vous', 'l', 'd', 'j', 'n', 's', 't',
+}
+
+# Suffixes retirés par le stemmer léger (du plus long au plus court)
+FRENCH_SUFFIXES = (
+    'issements', 'issement', 'atrices', 'ateurs', 'ations', 'atrice', 'ateur',
+    'ation', 'ements', 'ement', 'ences', 'ence', 'euses', 'euse', 'iques', 'ique',
+    'istes', 'iste', 'ismes', 'isme', 'ments', 'ment', 'ites', 'ite', 'ives', 'ive',
+    'eurs', 'eur', 'ees', 'ee', 'es', 'er', 'ez', 'e', 's', 'x',
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Mots passés à to_tsquery : lettres et chiffres seulement (aucun opérateur)
+TSQUERY_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def fold(text):
+    """Minuscules et suppression des accents ('Idées' -> 'idees')"""
+    text = (text or '').lower().replace('œ', 'oe').replace('æ', 'ae')
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=65536)
+def french_stem(word):
+    """Stemmer français léger, utilisé uniquement pour SQLite (mémoïsé : vocabulaire borné)"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('aux') and len(word) > 4:
+        return word[:-3] + 'al'
+    for suffix in FRENCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Découper, replier et raciniser un texte"""
+    return [
+        french_stem(token)
+        for token in TOKEN_RE.findall(fold(text))
+        if token not in STOPWORDS
+    ]
+
+
+def search_document(text):
+    """Document indexé dans FTS5 (fonction SQL enregistrée sur SQLite)"""
+    return ' '.join(tokenize(text))
+
+
+def build_fts_query(term):
+    """Requête FTS5 : tous les termes requis, préfixe sur le dernier (saisie en cours)"""
+    tokens = tokenize(term)
+    if not tokens:
+        return ''
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def build_tsquery(term):
+    """
+    Requête to_tsquery équivalente à build_fts_query : tous les termes requis,
+    préfixe (:*) sur le dernier. Les mots vides sont retirés ici, comme pour
+    SQLite (une requête sans lexème ne trouverait rien) ; accents et racines
+    sont traités par la configuration TS_CONFIG.
+    """
+    words = [word for word in TSQUERY_WORD_RE.findall(term) if fold(word) not in STOPWORDS]
+    if not words:
+        return ''
+    words[-1] += ':*'
+    return ' & '.join(words)
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    """Receiver de connection_created"""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            SQLITE_DOCUMENT_FUNCTION, 1, search_document, deterministic=True
+        )
+
+
+# ---------------------------------------------------------------------------
+# Schéma
+# ---------------------------------------------------------------------------
+
+POSTGRES_SCHEMA_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{TS_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {TS_CONFIG} (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION {TS_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END $$
+    """,
+    f"ALTER TABLE {PRODUCT_TABLE} ADD COLUMN IF NOT EXISTS search_document tsvector",
+    f"CREATE INDEX IF NOT EXISTS {PRODUCT_TABLE}_search_gin ON {PRODUCT_TABLE} USING gin (search_document)",
+    f"""
+    CREATE OR REPLACE FUNCTION {PRODUCT_TABLE}_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_document :=
+            setweight(to_tsvector('{TS_CONFIG}', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('{TS_CONFIG}', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    f"DROP TRIGGER IF EXISTS {PRODUCT_TABLE}_search_trigger ON {PRODUCT_TABLE}",
+    f"""
+    CREATE TRIGGER {PRODUCT_TABLE}_search_trigger
+        BEFORE INSERT OR UPDATE OF title, description ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {PRODUCT_TABLE}_search_update()
+    """,
+    f"""
+    UPDATE {PRODUCT_TABLE} SET search_document =
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B')
+    WHERE search_document IS NULL
+    """,
+]
+
+POSTGRES_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {PRODUCT_TABLE}_search_trigger ON {PRODUCT_TABLE}",
+    f"DROP FUNCTION IF EXISTS {PRODUCT_TABLE}_search_update()",
+    f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS search_document",
+    f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {TS_CONFIG}",
+]
+
+SQLITE_DOCUMENT = f"{SQLITE_DOCUMENT_FUNCTION}(new.title), {SQLITE_DOCUMENT_FUNCTION}(new.description)"
+
+# Les triggers SQLite disparaissent quand Django reconstruit la table lors
+# d'une migration : ils sont recréés (IF NOT EXISTS) après chaque migrate
+SQLITE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, {SQLITE_DOCUMENT});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {PRODUCT_TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, {SQLITE_DOCUMENT});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def ensure_search_schema(connection):
+    """Créer (de manière idempotente) l'index de recherche et le remplir si nécessaire"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_SCHEMA_SQL:
+                cursor.execute(sql)
+
+        elif connection.vendor == 'sqlite':
+            tables = connection.introspection.table_names(cursor)
+            if PRODUCT_TABLE not in tables:
+                return
+            if FTS_TABLE not in tables:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    f"title, description, tokenize='unicode61 remove_diacritics 2')"
+                )
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+                    f"SELECT id, {SQLITE_DOCUMENT_FUNCTION}(title), {SQLITE_DOCUMENT_FUNCTION}(description) "
+                    f"FROM {PRODUCT_TABLE}"
+                )
+            for sql in SQLITE_TRIGGERS_SQL:
+                cursor.execute(sql)
+
+
+def drop_search_schema(connection):
+    statements = {
+        'postgresql': POSTGRES_DROP_SQL,
+        'sqlite': SQLITE_DROP_SQL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_search_schema_after_migrate(sender, using, **kwargs):
+    """Receiver de post_migrate : rétablir les triggers SQLite"""
+    from django.db.migrations.recorder import MigrationRecorder
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if SEARCH_MIGRATION in MigrationRecorder(connection).applied_migrations():
+        ensure_search_schema(connection)
+
+
+# ---------------------------------------------------------------------------
+# Requêtes
+# ---------------------------------------------------------------------------
+
+def _with_score(queryset):
+    """Mêler la pertinence (search_rank) aux ventes et à la note"""
+    popularity = (
+        Value(1.0)
+        + Ln(F('sales_count') + Value(1.0)) * Value(SALES_WEIGHT)
+        + Cast('rating', FloatField()) * Value(RATING_WEIGHT)
+    )
+    return queryset.annotate(
+        search_score=ExpressionWrapper(F('search_rank') * popularity, output_field=FloatField())
+    )
+
+
+def search_products(queryset, term):
+    """
+    Filtrer un queryset de produits par recherche plein texte.
+    Le résultat est annoté avec `search_score` (plus grand = plus pertinent).
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        # Même sémantique que FTS5 (préfixe sur le dernier terme, saisie en cours) :
+        # websearch_to_tsquery ne sait pas chercher un préfixe
+        query = build_tsquery(term)
+        if not query:
+            return queryset
+        tsquery = f"to_tsquery('{TS_CONFIG}', %s)"
+        queryset = queryset.alias(
+            search_match=RawSQL(
+                f"{PRODUCT_TABLE}.search_document @@ {tsquery}", [query],
+                output_field=BooleanField()
+            )
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(
+                f"ts_rank_cd({PRODUCT_TABLE}.search_document, {tsquery}, 32)", [query],
+                output_field=FloatField()
+            )
+        )
+
+    elif vendor == 'sqlite':
+        fts_query = build_fts_query(term)
+        if not fts_query:
+            return queryset
+        queryset = queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [fts_query])
+        ).annotate(
+            # bm25() est négatif (plus petit = meilleur) ; titre 10x plus important
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {PRODUCT_TABLE}.id",
+                [fts_query],
+                output_field=FloatField()
+            )
+        )
+
+    else:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term)
+        ).annotate(search_rank=Value(1.0, output_field=FloatField()))
+
+    return _with_score(queryset)
@@ -1,30 +1,61 @@
 # backend/products/serializers.py
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from .models import Category, Product, ProductFile, Review
 from django.contrib.auth import get_user_model
+from django.utils.text import Truncator
+from tatlight_backend.fieldsets import SparseFieldsetSerializerMixin
+from tatlight_backend.images import variant_urls
+from tatlight_backend.pagination import KeysetPagination
 
 User = get_user_model()
 
+# Longueur de la description dans le profil ?fields=card
+CARD_DESCRIPTION_LENGTH = 160
+
+
+def get_owned_product_ids(request):
+    """
+    Ids des produits possédés par l'utilisateur connecté.
+    Une seule requête par requête HTTP : le résultat est mémorisé sur la requête.
+    """
+    if request is None or not request.user.is_authenticated:
+        return frozenset()
+    
+    owned = getattr(request, '_owned_product_ids', None)
+    if owned is None:
+        from orders.models import Entitlement
+        owned = frozenset(Entitlement.objects.owned_product_ids(request.user))
+        request._owned_product_ids = owned
+    return owned
+
 
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer pour les catégories"""
     
-    products_count = serializers.SerializerMethodField()
+    products_count = serializers.IntegerField(source='active_products_count', read_only=True)
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'icon', 'products_count']
-    
-    def get_products_count(self, obj):
-        return obj.products.filter(is_active=True).count()
 
 
 class ProductFileSerializer(serializers.ModelSerializer):
     """Serializer pour les fichiers de produit"""
     
+    # Les fichiers ne sont plus exposés directement : téléchargement contrôlé
+    download_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductFile
-        fields = ['id', 'file_type', 'file', 'name', 'order']
+        fields = ['id', 'file_type', 'name', 'order', 'download_url']
+    
+    def get_download_url(self, obj):
+        return reverse(
+            'products:product-files-download',
+            kwargs={'product_pk': obj.product_id, 'pk': obj.pk},
+            request=self.context.get('request')
+        )
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -53,11 +84,29 @@ class ReviewSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProductListSerializer(serializers.ModelSerializer):
-    """Serializer pour la liste des produits (vue résumée)"""
+class ProductListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer pour la liste des produits (vue résumée)
+    Champs réductibles via ?fields= / ?omit= ou le profil ?fields=card
+    """
     
+    field_profiles = {
+        # Cartes produit et suggestions de recherche : description tronquée (voir ProductViewSet)
+        'card': (
+            'id', 'title', 'slug', 'description', 'category_name', 'category_slug',
+            'file_type', 'price', 'image_variants', 'rating', 'reviews_count', 'is_owned',
+        ),
+    }
+    field_columns = {
+        'category_name': ('category__name',),
+        'category_slug': ('category__slug',),
+    }
+    
+    description = serializers.SerializerMethodField()
     category_name = serializers.CharField(source='category.get_name_display', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    is_owned = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -72,13 +121,30 @@ class ProductListSerializer(serializers.ModelSerializer):
             'file_type',
             'price',
             'image',
+            'image_variants',
             'rating',
             'reviews_count',
             'sales_count',
             'is_active',
             'featured',
+            'is_owned',
             'created_at',
         ]
+    
+    def get_description(self, obj):
+        """Description complète, ou extrait si la vue l'a annoté (profil card)"""
+        excerpt = getattr(obj, 'description_excerpt', None)
+        if excerpt is None:
+            return obj.description
+        return Truncator(excerpt).chars(CARD_DESCRIPTION_LENGTH)
+    
+    def get_image_variants(self, obj):
+        """Miniatures WebP/JPEG par largeur (vide tant qu'elles ne sont pas générées)"""
+        return variant_urls(obj.image_variants, self.context.get('request'))
+    
+    def get_is_owned(self, obj):
+        """Badge "acheté" sur les cartes produit"""
+        return obj.pk in get_owned_product_ids(self.context.get('request'))
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -86,8 +152,12 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     
     category_name = serializers.CharField(source='category.get_name_display', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
+    image_variants = serializers.SerializerMethodField()
     files = ProductFileSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    
+    # Seulement les derniers avis ; la suite via reviews_url (paginé par curseur)
+    reviews = serializers.SerializerMethodField()
+    reviews_url = serializers.SerializerMethodField()
     
     # Calculer si l'utilisateur a déjà acheté ce produit
     user_has_purchased = serializers.SerializerMethodField()
@@ -105,6 +175,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'file_type',
             'price',
             'image',
+            'image_variants',
             'rating',
             'reviews_count',
             'sales_count',
@@ -112,22 +183,57 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'featured',
             'files',
             'reviews',
+            'reviews_url',
             'user_has_purchased',
             'created_at',
             'updated_at',
         ]
     
+    LATEST_REVIEWS_LIMIT = 5
+    
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
+    
+    def latest_reviews(self, obj):
+        """
+        (derniers avis, autres avis ?) : une seule requête pour reviews et
+        reviews_url, auteurs compris ; le résultat est mémorisé sur le produit
+        """
+        latest = getattr(obj, '_latest_reviews', None)
+        if latest is None:
+            # Un avis de plus que la limite : indique s'il reste une suite
+            rows = list(
+                obj.reviews.select_related('user')
+                .order_by(KeysetPagination.default_ordering, '-id')[:self.LATEST_REVIEWS_LIMIT + 1]
+            )
+            latest = obj._latest_reviews = (rows[:self.LATEST_REVIEWS_LIMIT], len(rows) > self.LATEST_REVIEWS_LIMIT)
+        return latest
+    
+    def get_reviews(self, obj):
+        """Derniers avis"""
+        reviews, _ = self.latest_reviews(obj)
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+    
+    def get_reviews_url(self, obj):
+        """
+        Suite des avis (pagination par curseur), après le dernier avis embarqué ;
+        None quand tous les avis sont déjà dans reviews
+        """
+        reviews, has_more = self.latest_reviews(obj)
+        if not has_more:
+            return None
+        url = reverse(
+            'products:product-reviews-list',
+            kwargs={'product_pk': obj.pk},
+            request=self.context.get('request')
+        )
+        last = reviews[-1]
+        cursor = KeysetPagination().encode_cursor(KeysetPagination.default_ordering, last.created_at, last.pk)
+        return f'{url}?cursor={cursor}'
+    
     def get_user_has_purchased(self, obj):
         """Vérifier si l'utilisateur connecté a acheté ce produit"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            from orders.models import Order, OrderItem
-            return OrderItem.objects.filter(
-                order__user=request.user,
-                order__status='COMPLETED',
-                product=obj
-            ).exists()
-        return False
+        return obj.pk in get_owned_product_ids(self.context.get('request'))
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
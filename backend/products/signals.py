@@ -0,0 +1,91 @@
+# backend/products/signals.py
+"""
+Signaux de l'application produits
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from tatlight_backend.images import schedule_image_variants
+
+from .cache import CATALOG_TAG, CATEGORIES_TAG, invalidate_tags, product_tag
+from .models import Category, Product, ProductFile, Review
+
+
+def refresh_categories_count(*category_ids):
+    """Recalculer le compteur de produits actifs des catégories données"""
+    category_ids = {pk for pk in category_ids if pk is not None}
+    if category_ids:
+        Category.objects.filter(pk__in=category_ids).refresh_products_count()
+        invalidate_tags(CATEGORIES_TAG)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    """Maintenir Category.active_products_count après création/modification"""
+    if raw:
+        return
+
+    previous_category_id = getattr(instance, '_loaded_category_id', None)
+    previous_is_active = getattr(instance, '_loaded_is_active', None)
+
+    if created or previous_category_id != instance.category_id or previous_is_active != instance.is_active:
+        refresh_categories_count(previous_category_id, instance.category_id)
+
+    if instance.image and instance.image.name != getattr(instance, '_loaded_image', None):
+        schedule_image_variants(instance, 'image', 'image_variants')
+
+    invalidate_tags(CATALOG_TAG, product_tag(instance.pk))
+    instance.remember_loaded_state()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """Maintenir Category.active_products_count après suppression"""
+    if instance.is_active:
+        refresh_categories_count(instance.category_id)
+
+    invalidate_tags(CATALOG_TAG, product_tag(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """Les listes de produits affichent le nom de la catégorie"""
+    invalidate_tags(CATALOG_TAG, CATEGORIES_TAG)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    """Répercuter l'avis sur la note du produit (un UPDATE par produit touché)"""
+    if raw:
+        return
+
+    previous_product_id = getattr(instance, '_loaded_product_id', None)
+    previous_rating = getattr(instance, '_loaded_rating', None)
+
+    if created or previous_product_id is None:
+        Product.objects.filter(pk=instance.product_id).apply_review_delta(instance.rating, 1)
+    elif previous_product_id != instance.product_id:
+        Product.objects.filter(pk=previous_product_id).apply_review_delta(-previous_rating, -1)
+        Product.objects.filter(pk=instance.product_id).apply_review_delta(instance.rating, 1)
+    elif instance.rating != previous_rating:
+        Product.objects.filter(pk=instance.product_id).apply_review_delta(instance.rating - previous_rating, 0)
+    # Note et produit inchangés (commentaire modifié) : pas d'UPDATE, le cache est invalidé ci-dessous
+
+    invalidate_tags(CATALOG_TAG, product_tag(instance.product_id))
+    instance.remember_loaded_state()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    rating = getattr(instance, '_loaded_rating', None) or instance.rating
+    Product.objects.filter(pk=instance.product_id).apply_review_delta(-rating, -1)
+
+    invalidate_tags(CATALOG_TAG, product_tag(instance.product_id))
+
+
+@receiver(post_save, sender=ProductFile)
+@receiver(post_delete, sender=ProductFile)
+def product_file_changed(sender, instance, **kwargs):
+    invalidate_tags(product_tag(instance.product_id))
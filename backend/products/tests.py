@@ -1,3 +1,641 @@
-from django.test import TestCase
+# backend/products/tests.py
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from accounts.models import User
+from orders.models import Download, Entitlement, Order
+from tatlight_backend.images import variant_name
+from tatlight_backend.pagination import KeysetPagination
+
+from .facets import catalog_facets
+from .management.commands.build_recommendations import top_k_neighbours
+from .serializers import CARD_DESCRIPTION_LENGTH
+from .search import build_tsquery, search_products
+from .models import Category, Product, ProductFile, Review
+
+
+def make_category(name='ebooks'):
+    return Category.objects.get_or_create(name=name, defaults={'slug': name})[0]
+
+
+def make_product(category=None, **fields):
+    """Produit sans image (aucune miniature à générer)"""
+    fields.setdefault('title', 'Produit')
+    fields.setdefault('slug', f"produit-{Product.objects.count() + 1}")
+    fields.setdefault('description', '')
+    fields.setdefault('file_type', 'pdf')
+    fields.setdefault('price', Decimal('10.00'))
+    fields.setdefault('image', '')
+    return Product.objects.create(category=category or make_category(), **fields)
+
+
+class KeysetPaginationTests(TestCase):
+    """Pagination par curseur : chaque ligne une fois, dans l'ordre, même avec des égalités"""
+
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.products = [make_product(title=f'P{i}') for i in range(7)]
+        # Égalités sur created_at : l'id départage
+        for index, product in enumerate(self.products):
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(days=index // 3))
+
+    def paginate(self, ordering, cursor=None):
+        params = {'page_size': 3, 'ordering': ordering}
+        if cursor:
+            params['cursor'] = cursor
+        request = Request(self.factory.get('/', params))
+        paginator = KeysetPagination(ordering_fields=('created_at', 'price'))
+        rows = paginator.paginate_queryset(Product.objects.all(), request)
+        return paginator, rows
+
+    def walk(self, ordering):
+        seen, cursor = [], None
+        while True:
+            paginator, rows = self.paginate(ordering, cursor)
+            seen += [row.pk for row in rows]
+            cursor = paginator.next_cursor
+            if cursor is None:
+                return seen
+
+    def test_descending_walk_visits_every_row_once_in_order(self):
+        expected = list(Product.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('-created_at'), expected)
+
+    def test_ascending_walk_visits_every_row_once_in_order(self):
+        expected = list(Product.objects.order_by('created_at', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('created_at'), expected)
+
+    def test_cursor_filter_has_a_leading_range_bound(self):
+        paginator, _ = self.paginate('-created_at')
+        request = Request(self.factory.get('/', {'page_size': 3, 'ordering': '-created_at', 'cursor': paginator.next_cursor}))
+        queryset = Product.objects.all()
+        with self.assertNumQueries(1) as context:
+            KeysetPagination(ordering_fields=('created_at',)).paginate_queryset(queryset, request)
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"created_at" <=', sql)
+
+    def test_cursor_for_another_ordering_is_rejected(self):
+        paginator, _ = self.paginate('-created_at')
+        request = Request(self.factory.get('/', {'ordering': 'price', 'cursor': paginator.next_cursor}))
+        with self.assertRaises(NotFound):
+            KeysetPagination(ordering_fields=('created_at', 'price')).paginate_queryset(Product.objects.all(), request)
+
+    def test_search_score_is_never_used_as_cursor_field(self):
+        queryset = Product.objects.annotate(search_score=Value(1.0, output_field=FloatField()))
+        paginator = KeysetPagination()
+        request = Request(self.factory.get('/', {'pagination': 'cursor'}))
+        self.assertEqual(paginator.get_ordering(request, queryset, view=None), '-created_at')
+
+
+class CategoryProductsCountTests(TestCase):
+    """Category.active_products_count maintenu par products.signals et ProductQuerySet.update"""
+
+    def setUp(self):
+        self.ebooks = make_category('ebooks')
+        self.templates = make_category('templates')
+
+    def assertCounts(self, ebooks, templates):
+        counts = dict(Category.objects.values_list('slug', 'active_products_count'))
+        self.assertEqual((counts['ebooks'], counts['templates']), (ebooks, templates))
+
+    def test_create_edit_and_delete(self):
+        product = make_product(self.ebooks)
+        make_product(self.ebooks, is_active=False)
+        self.assertCounts(1, 0)
+
+        product.category = self.templates
+        product.save()
+        self.assertCounts(0, 1)
+
+        product.is_active = False
+        product.save()
+        self.assertCounts(0, 0)
+
+        product.is_active = True
+        product.save()
+        self.assertCounts(0, 1)
+        product.delete()
+        self.assertCounts(0, 0)
+
+    def test_queryset_update(self):
+        make_product(self.ebooks)
+        make_product(self.ebooks)
+        Product.objects.update(category=self.templates)
+        self.assertCounts(0, 2)
+        Product.objects.filter(category=self.templates).update(is_active=False)
+        self.assertCounts(0, 0)
+
+    def test_recount_fixes_drifted_counters(self):
+        make_product(self.ebooks)
+        Category.objects.update(active_products_count=42)
+        out = StringIO()
+        call_command('recount_category_products', stdout=out)
+        self.assertCounts(1, 0)
+        self.assertIn('2 catégorie(s) recalculée(s)', out.getvalue())
+
+
+class ReviewRatingTests(TestCase):
+    """Note moyenne maintenue par deltas (products.signals)"""
+
+    def setUp(self):
+        self.product = make_product()
+        self.other = make_product()
+        self.users = [User.objects.create_user(email=f'avis{i}@example.com', password='x') for i in range(3)]
+
+    def assertRating(self, product, rating, count, rating_sum):
+        product.refresh_from_db()
+        self.assertEqual((product.rating, product.reviews_count, product.rating_sum), (Decimal(rating), count, rating_sum))
+
+    def test_create_update_move_and_delete(self):
+        first = Review.objects.create(product=self.product, user=self.users[0], rating=5, comment='top')
+        Review.objects.create(product=self.product, user=self.users[1], rating=2, comment='bof')
+        self.assertRating(self.product, '3.5', 2, 7)
+
+        first.rating = 4
+        first.save()
+        self.assertRating(self.product, '3.0', 2, 6)
+
+        first.product = self.other
+        first.save()
+        self.assertRating(self.product, '2.0', 1, 2)
+        self.assertRating(self.other, '4.0', 1, 4)
+
+        first.delete()
+        self.assertRating(self.other, '0.0', 0, 0)
+
+    def test_comment_only_edit_skips_the_product_update(self):
+        review = Review.objects.create(product=self.product, user=self.users[0], rating=3, comment='ok')
+        review.comment = 'finalement très bien'
+        with CaptureQueriesContext(connection) as context:
+            review.save()
+        self.assertFalse(any('UPDATE "products_product"' in query['sql'] for query in context.captured_queries))
+        self.assertRating(self.product, '3.0', 1, 3)
+
+
+class ImageVariantNameTests(TestCase):
+    def test_sources_with_the_same_stem_do_not_collide(self):
+        png = variant_name('products/photo.png', 320, 'webp')
+        jpg = variant_name('products/photo.jpg', 320, 'webp')
+        self.assertEqual(png, 'products/variants/photo-png-320w.webp')
+        self.assertNotEqual(png, jpg)
+
+
+class CatalogFacetsTests(TestCase):
+    """Compteurs de facettes : une seule requête une fois les catégories en cache"""
+
+    def setUp(self):
+        cache.clear()
+        ebooks, templates = make_category('ebooks'), make_category('templates')
+        make_product(ebooks, price=Decimal('5.00'), featured=True)
+        make_product(ebooks, price=Decimal('30.00'), file_type='audio')
+        make_product(templates, price=Decimal('150.00'))
+
+    def test_counts(self):
+        facets = catalog_facets(Product.objects.all())
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(facets['categories'], {'ebooks': 2, 'templates': 1})
+        self.assertEqual(facets['file_types']['audio'], 1)
+        self.assertEqual(facets['featured'], {'true': 1, 'false': 2})
+        self.assertEqual([bucket['count'] for bucket in facets['price_ranges']], [1, 0, 1, 0, 1])
+        self.assertEqual(facets['price'], {'min': Decimal('5.00'), 'max': Decimal('150.00')})
+
+    def test_single_query_once_categories_are_cached(self):
+        catalog_facets(Product.objects.all())
+        with self.assertNumQueries(1):
+            catalog_facets(Product.objects.filter(category__slug='ebooks'))
+
+    def test_new_category_appears_after_commit(self):
+        catalog_facets(Product.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            make_category('formations')
+        self.assertEqual(catalog_facets(Product.objects.all())['categories']['formations'], 0)
+
+
+class ProductListLastModifiedTests(APITestCase):
+    """Last-Modified suit les invalidations du catalogue, pas seulement MAX(updated_at)"""
+
+    url = '/api/products/products/'
+
+    def setUp(self):
+        cache.clear()
+        self.products = [make_product(title=f'P{i}') for i in range(2)]
+        Product.objects.update(updated_at=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+
+    def test_deactivation_moves_last_modified_forward(self):
+        with mock.patch('products.cache.time.time', return_value=1_700_000_000):
+            first = self.client.get(self.url)
+        self.assertEqual(first['Last-Modified'], 'Tue, 14 Nov 2023 22:13:20 GMT')
+
+        with mock.patch('products.cache.time.time', return_value=1_700_000_100):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.products[0].is_active = False
+                self.products[0].save()
+
+        second = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Last-Modified'], 'Tue, 14 Nov 2023 22:15:00 GMT')
+
+        third = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=second['Last-Modified'])
+        self.assertEqual(third.status_code, 304)
+
+
+class ProductUpdatedAtTests(APITestCase):
+    """updated_at suit les modifications du contenu, pas les valeurs dérivées"""
+
+    old = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.product = make_product()
+        Product.objects.update(updated_at=self.old)
+        self.user = User.objects.create_user(email='avis@example.com', password='x')
+
+    def updated_at(self):
+        return Product.objects.values_list('updated_at', flat=True).get(pk=self.product.pk)
+
+    def test_derived_values_keep_updated_at(self):
+        products = Product.objects.filter(pk=self.product.pk)
+        products.update(sales_count=F('sales_count') + 1)
+        products.apply_review_delta(4, 1)
+        products.update(image_variants={'320': {'webp': 'x.webp'}})
+        self.assertEqual(self.updated_at(), self.old)
+
+        products.update(price=Decimal('12.00'))
+        self.assertGreater(self.updated_at(), self.old)
+
+    def test_a_new_review_still_changes_the_detail_etag(self):
+        url = f'/api/products/products/{self.product.pk}/'
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.user, rating=4, comment='Bien')
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['reviews_count'], 1)
+        self.assertEqual(self.updated_at(), self.old)
+
+
+class CatalogCacheTests(APITestCase):
+    """Réponses publiques en cache, invalidées par version de tag"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = make_category()
+        self.product = make_product(self.category, title='Guide', featured=True)
+        self.user = User.objects.create_user(email='avis@example.com', password='x')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_hits_skip_the_database(self):
+        self.get('/api/products/categories/')
+        with self.assertNumQueries(0):
+            self.get('/api/products/categories/')
+
+        self.get('/api/products/products/featured/')
+        with self.assertNumQueries(0):
+            self.get('/api/products/products/featured/')
+
+        self.get('/api/products/products/')
+        # Seulement la requête des validateurs (COUNT + MAX(updated_at))
+        with self.assertNumQueries(1):
+            self.get('/api/products/products/')
+
+    def test_product_write_invalidates_the_catalog(self):
+        self.assertEqual(self.get('/api/products/products/featured/')[0]['title'], 'Guide')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = 'Guide illustré'
+            self.product.save()
+        self.assertEqual(self.get('/api/products/products/featured/')[0]['title'], 'Guide illustré')
+
+    def test_category_write_invalidates_categories_and_products(self):
+        self.assertEqual(self.get('/api/products/categories/')['results'][0]['description'], '')
+        self.get('/api/products/products/featured/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.description = 'Livres numériques'
+            self.category.name = 'templates'
+            self.category.save()
+        self.assertEqual(self.get('/api/products/categories/')['results'][0]['description'], 'Livres numériques')
+        self.assertEqual(self.get('/api/products/products/featured/')[0]['category_name'], 'Templates Canva')
+
+    def test_review_write_invalidates_the_catalog(self):
+        self.assertEqual(self.get('/api/products/products/featured/')[0]['reviews_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.user, rating=5, comment='Top')
+        featured = self.get('/api/products/products/featured/')[0]
+        self.assertEqual((featured['reviews_count'], featured['rating']), (1, '5.0'))
+
+
+class TopKNeighboursTests(SimpleTestCase):
+    """Voisins par similarité cosinus sur un petit historique au classement connu"""
+
+    # Commandes (triées) -> produits ; ventes : 0:5, 1:4, 2:3, 3:1
+    ORDERS = [[0, 1, 2], [0, 1], [0, 2], [0, 3], [1, 2], [0, 1]]
+
+    def neighbours(self, top_k=10, min_common=1):
+        order_index = np.array([order for order, products in enumerate(self.ORDERS) for _ in products])
+        product_index = np.array([product for products in self.ORDERS for product in products])
+        result = {}
+        for source, target, score, rank in top_k_neighbours(order_index, product_index, 4, top_k, min_common):
+            result.setdefault(int(source), []).append((int(target), round(float(score), 3), int(rank)))
+        return result
+
+    def test_ranking_by_cosine_similarity(self):
+        # sim(0, 1) = 3 / sqrt(5 * 4), sim(1, 2) = 2 / sqrt(4 * 3)...
+        self.assertEqual(self.neighbours(), {
+            0: [(1, 0.671, 0), (2, 0.516, 1), (3, 0.447, 2)],
+            1: [(0, 0.671, 0), (2, 0.577, 1)],
+            2: [(1, 0.577, 0), (0, 0.516, 1)],
+            3: [(0, 0.447, 0)],
+        })
+
+    def test_a_product_is_never_its_own_neighbour(self):
+        for source, targets in self.neighbours().items():
+            self.assertNotIn(source, [target for target, _, _ in targets])
+
+    def test_top_k_and_min_common_cutoffs(self):
+        self.assertEqual(self.neighbours(top_k=1), {
+            0: [(1, 0.671, 0)],
+            1: [(0, 0.671, 0)],
+            2: [(1, 0.577, 0)],
+            3: [(0, 0.447, 0)],
+        })
+        self.assertNotIn(3, self.neighbours(min_common=2))
+
+    def test_no_co_purchase(self):
+        self.assertEqual(list(top_k_neighbours(np.array([0, 1]), np.array([0, 1]), 2, 10, 1)), [])
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        make_category('ebooks')
+
+    def import_rows(self, *rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8') as handle:
+            handle.write('\n'.join(json.dumps(row) for row in rows))
+            handle.flush()
+            errors = StringIO()
+            call_command('import_catalog', handle.name, stdout=StringIO(), stderr=errors)
+        return errors.getvalue()
+
+    def test_rejects_prices_the_column_cannot_store(self):
+        base = {'category': 'ebooks', 'file_type': 'pdf'}
+        errors = self.import_rows(
+            {**base, 'title': 'NaN', 'price': 'NaN'},
+            {**base, 'title': 'Infini', 'price': 'Infinity'},
+            {**base, 'title': 'Négatif', 'price': '-1'},
+            {**base, 'title': 'Énorme', 'price': 1e20},
+            {**base, 'title': 'Arrondi', 'price': '99999999.999'},
+            {**base, 'title': 'Valide', 'price': '12.5'},
+        )
+        self.assertEqual(errors.count('prix invalide'), 5)
+        self.assertEqual(list(Product.objects.values_list('title', 'price')), [('Valide', Decimal('12.50'))])
+
+    def test_columns_missing_from_the_first_row_are_still_updated(self):
+        make_product(slug='a', featured=False)
+        make_product(slug='b', featured=True)
+        base = {'category': 'ebooks', 'file_type': 'pdf', 'price': '10'}
+        self.import_rows(
+            {**base, 'slug': 'a', 'title': 'A'},
+            {**base, 'slug': 'b', 'title': 'B', 'featured': False},
+            {**base, 'slug': 'c', 'title': 'C', 'featured': True},
+        )
+        featured = dict(Product.objects.values_list('slug', 'featured'))
+        # 'a' n'a pas de colonne featured : valeur existante conservée
+        self.assertEqual(featured, {'a': False, 'b': False, 'c': True})
+
+
+class ProductSearchTests(APITestCase):
+    """Recherche plein texte (FTS5 sous SQLite) : accents, pluriels, préfixe, index maintenu"""
+
+    def setUp(self):
+        cache.clear()
+        self.recettes = make_product(title='Idées de recettes végétariennes', description='Cuisine facile')
+        self.canva = make_product(title='Templates Canva', description='Modèles pour réseaux sociaux')
+
+    def titles(self, term):
+        return list(search_products(Product.objects.all(), term).values_list('title', flat=True))
+
+    def test_accents_and_plurals_are_folded(self):
+        self.assertEqual(self.titles('idee recette vegetarienne'), [self.recettes.title])
+        self.assertEqual(self.titles('modele'), [self.canva.title])
+
+    def test_last_term_is_a_prefix(self):
+        self.assertEqual(self.titles('templ'), [self.canva.title])
+        self.assertEqual(self.titles('cuisine templ'), [])
+
+    def test_postgres_query_uses_a_prefix_on_the_last_word(self):
+        self.assertEqual(build_tsquery('Idées de recet'), 'Idées & recet:*')
+        self.assertEqual(build_tsquery("l'été & !canva"), 'été & canva:*')
+        self.assertEqual(build_tsquery('de la'), '')
+        self.assertEqual(build_tsquery(' -_ '), '')
+
+    def test_index_follows_updates_and_deletes(self):
+        self.canva.title = 'Planner Notion'
+        self.canva.save()
+        self.assertEqual(self.titles('canva'), [])
+        self.assertEqual(self.titles('notion'), ['Planner Notion'])
+        self.canva.delete()
+        self.assertEqual(self.titles('notion'), [])
+
+    def test_stopwords_only_search_is_ignored(self):
+        self.assertEqual(len(self.titles('de la')), 2)
+
+    def test_title_matches_rank_first_in_the_list(self):
+        make_product(title='Guide', description='Recettes pour débuter')
+        response = self.client.get('/api/products/products/', {'search': 'recettes'})
+        self.assertEqual(response.status_code, 200)
+        titles = [product['title'] for product in response.data['results']]
+        self.assertEqual(titles, [self.recettes.title, 'Guide'])
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields= / ?omit= réduisent la réponse et le SELECT"""
+
+    url = '/api/products/products/'
+
+    def setUp(self):
+        cache.clear()
+        make_product(title='Long', description='x' * 1000)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        product_sql = [query['sql'] for query in context.captured_queries if 'FROM "products_product"' in query['sql']]
+        return response.data['results'][0], product_sql[-1]
+
+    def test_explicit_fields(self):
+        product, sql = self.get(fields='title,price')
+        self.assertEqual(set(product), {'id', 'title', 'price'})
+        self.assertNotIn('"description"', sql)
+
+    def test_card_profile_truncates_description(self):
+        product, sql = self.get(fields='card')
+        self.assertIn('category_name', product)
+        self.assertEqual(len(product['description']), CARD_DESCRIPTION_LENGTH)
+        # Seul un extrait de la description est lu
+        self.assertIn('SUBSTR("products_product"."description"', sql)
+        self.assertNotIn(', "products_product"."description"', sql)
+
+    def test_omit(self):
+        product, _ = self.get(omit='description')
+        self.assertNotIn('description', product)
+        self.assertIn('title', product)
+
+
+class ProductDetailTests(APITestCase):
+    """Détail : derniers avis embarqués, la suite via reviews_url"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = make_product()
+        self.url = f'/api/products/products/{self.product.pk}/'
+
+    def add_reviews(self, count):
+        start = Review.objects.count()
+        for index in range(start, start + count):
+            user = User.objects.create_user(email=f'avis{index}@example.com', password='x')
+            Review.objects.create(product=self.product, user=user, rating=4, comment='Bien')
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_depend_on_the_number_of_reviews(self):
+        self.add_reviews(8)
+        # updated_at (validateurs), produit + catégorie, fichiers, avis + auteurs
+        with self.assertNumQueries(4):
+            self.get()
+
+    def test_reviews_url_continues_after_the_embedded_reviews(self):
+        self.add_reviews(8)
+        detail = self.get()
+        embedded = [review['id'] for review in detail['reviews']]
+        self.assertEqual(len(embedded), 5)
+
+        response = self.client.get(detail['reviews_url'])
+        self.assertEqual(response.status_code, 200)
+        rest = [review['id'] for review in response.data['results']]
+        expected = list(
+            Review.objects.filter(product=self.product).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(embedded + rest, expected)
+
+    def test_no_reviews_url_when_every_review_is_embedded(self):
+        self.add_reviews(5)
+        detail = self.get()
+        self.assertEqual(len(detail['reviews']), 5)
+        self.assertIsNone(detail['reviews_url'])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, DOWNLOADS_SENDFILE_BACKEND='')
+class ProductFileDownloadTests(APITestCase):
+    """Téléchargement des fichiers achetés : plages, validateurs et historique"""
+
+    content = b'0123456789'
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(spool_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, DOWNLOAD_LOG_SPOOL_DIR=spool_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Buffer neuf, qui écrit son spool dans le répertoire temporaire
+        buffer_patch = mock.patch('orders.download_log._buffer', None)
+        buffer_patch.start()
+        self.addCleanup(buffer_patch.stop)
+
+        self.user = User.objects.create_user(email='client@example.com', password='x')
+        self.product = make_product()
+        self.file = ProductFile.objects.create(
+            product=self.product,
+            file_type='pdf',
+            file=SimpleUploadedFile('guide.pdf', self.content),
+            name='Guide'
+        )
+        order = Order.objects.create(user=self.user, subtotal=Decimal('10.00'), total=Decimal('10.00'))
+        Entitlement.objects.create(user=self.user, product=self.product, order=order)
+        self.url = f'/api/products/products/{self.product.pk}/files/{self.file.pk}/download/'
+        self.client.force_authenticate(self.user)
+
+    def request(self, method='get', **headers):
+        response = getattr(self.client, method)(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_download_is_logged_once(self):
+        response, body = self.request()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Guide.pdf', response['Content-Disposition'])
+        self.assertEqual(Download.objects.filter(user=self.user, product=self.product).count(), 1)
+
+    def test_head_is_not_logged(self):
+        response, _ = self.request('head')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Download.objects.exists())
+
+    def test_range_returns_partial_content_and_resumes_are_not_logged(self):
+        response, body = self.request(Range='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, b'0123')
+        self.assertEqual(response['Content-Range'], 'bytes 0-3/10')
+
+        response, body = self.request(Range='bytes=4-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, b'456789')
+        self.assertEqual(response['Content-Range'], 'bytes 4-9/10')
+        self.assertEqual(Download.objects.count(), 1)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.request(Range='bytes=50-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        self.assertFalse(Download.objects.exists())
+
+    def test_if_range_with_a_stale_etag_serves_the_whole_file(self):
+        response, body = self.request(Range='bytes=4-', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+
+    def test_matching_etag_returns_not_modified(self):
+        first, _ = self.request()
+        response, body = self.request(**{'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(Download.objects.count(), 1)
+
+    def test_files_of_a_product_not_bought_are_forbidden(self):
+        self.client.force_authenticate(User.objects.create_user(email='autre@example.com', password='x'))
+        response, _ = self.request()
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Download.objects.exists())
@@ -3,7 +3,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
 
-from .views import CategoryViewSet, ProductViewSet, ReviewViewSet
+from .views import CategoryViewSet, ProductViewSet, ProductFileViewSet, ReviewViewSet
 
 app_name = 'products'
 
@@ -12,9 +12,10 @@ router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'products', ProductViewSet, basename='product')
 
-# Router nested pour les reviews (produits > reviews)
+# Router nested pour les reviews et les fichiers (produits > reviews, produits > files)
 products_router = routers.NestedDefaultRouter(router, r'products', lookup='product')
 products_router.register(r'reviews', ReviewViewSet, basename='product-reviews')
+products_router.register(r'files', ProductFileViewSet, basename='product-files')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,45 +1,128 @@
 # backend/products/views.py
-from rest_framework import viewsets, filters, permissions, status
+import os
+
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
-from django.db.models import Q, Avg
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Substr
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Category, Product, Review
+from orders.download_log import record_download
+from orders.models import Entitlement
+from tatlight_backend.conditional import conditional_view, list_validators, object_validators
+from tatlight_backend.downloads import client_ip, serve_file
+from tatlight_backend.fieldsets import SparseFieldsetMixin
+from tatlight_backend.pagination import KeysetPaginationMixin
+
+from .facets import catalog_facets
+from .filters import ProductSearchFilter, ProductOrderingFilter
+from .cache import (
+    CATALOG_TAG,
+    CATEGORIES_TAG,
+    cache_catalog_response,
+    get_tag_versions,
+    product_tag,
+    tags_last_modified,
+)
+from .models import Category, Product, ProductFile, Review
 from .serializers import (
     CategorySerializer,
     ProductListSerializer,
     ProductDetailSerializer,
     ProductCreateUpdateSerializer,
+    ProductFileSerializer,
     ReviewSerializer,
+    CARD_DESCRIPTION_LENGTH,
+    get_owned_product_ids,
 )
 
 
+def latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def product_list_validators(view, request, *args, **kwargs):
+    """
+    Liste : COUNT + MAX(updated_at) des produits filtrés, versions du cache catalogue.
+    MAX(updated_at) ignore les produits désactivés ou supprimés : Last-Modified
+    prend aussi la date de la dernière invalidation du catalogue.
+    """
+    parts, last_modified = list_validators(view.filter_queryset(view.get_queryset()))
+    versions = get_tag_versions([CATALOG_TAG, CATEGORIES_TAG])
+    parts += versions
+    # is_owned dépend des achats de l'utilisateur
+    parts.append(sorted(get_owned_product_ids(request)))
+    return parts, latest(last_modified, tags_last_modified(versions))
+
+
+def product_detail_validators(view, request, *args, **kwargs):
+    """
+    Détail : updated_at du produit et versions du cache ; les avis et les ventes
+    ne changent pas updated_at mais invalident le catalogue (ProductQuerySet.update)
+    """
+    pk = kwargs.get('pk')
+    try:
+        result = object_validators(view.get_queryset(), pk)
+    except (ValueError, ValidationError):
+        return None
+    if result is None:
+        return None
+    parts, last_modified = result
+    versions = get_tag_versions([CATALOG_TAG, product_tag(pk)])
+    parts += versions
+    parts.append(int(pk) in get_owned_product_ids(request))
+    return parts, latest(last_modified, tags_last_modified(versions))
+
+
+def review_list_validators(view, request, *args, **kwargs):
+    """Avis d'un produit : COUNT + MAX(updated_at)"""
+    try:
+        return list_validators(view.filter_queryset(view.get_queryset()))
+    except (ValueError, ValidationError):
+        return None
+
+
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint pour les catégories
     GET /api/products/categories/ - Liste des catégories
     GET /api/products/categories/{slug}/ - Détail d'une catégorie
     """
-    queryset = Category.objects.all()
+    queryset = Category.objects.order_by('name')
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
+    
+    @cache_catalog_response(CATEGORIES_TAG)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_catalog_response(CATEGORIES_TAG)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint pour les produits
     GET /api/products/ - Liste des produits
+    GET /api/products/?pagination=cursor - Liste paginée par curseur (sans COUNT)
+    GET /api/products/?fields=id,title,price | ?fields=card | ?omit=description - Champs réduits
+    GET /api/products/facets/ - Compteurs de facettes pour les filtres courants
     GET /api/products/{id}/ - Détail d'un produit
     POST /api/products/ - Créer un produit (admin uniquement)
     PUT/PATCH /api/products/{id}/ - Modifier un produit (admin uniquement)
     DELETE /api/products/{id}/ - Supprimer un produit (admin uniquement)
     """
     queryset = Product.objects.filter(is_active=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     filterset_fields = ['category__slug', 'file_type', 'featured']
-    search_fields = ['title', 'description']
+    search_fields = ['title', 'description']  # Indexés par products.search
     ordering_fields = ['created_at', 'price', 'rating', 'sales_count']
     ordering = ['-created_at']
     
@@ -79,9 +162,30 @@ class ProductViewSet(viewsets.ModelViewSet):
         if self.request.user.is_staff:
             queryset = Product.objects.all()
         
+        queryset = queryset.select_related('category')
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('files')
+        
+        # ?fields= / ?omit= : seules les colonnes utiles sont lues
+        queryset = self.restrict_queryset(queryset)
+        if self.get_sparse_fields()[1] == 'card':
+            # Extrait calculé en SQL : la description complète n'est jamais transférée
+            queryset = queryset.defer('description').annotate(
+                description_excerpt=Substr('description', 1, CARD_DESCRIPTION_LENGTH + 1)
+            )
         return queryset
     
+    @conditional_view(product_list_validators)
+    @cache_catalog_response(CATALOG_TAG)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_view(product_detail_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @cache_catalog_response(CATALOG_TAG)
     def featured(self, request):
         """
         Endpoint pour les produits mis en avant
@@ -91,39 +195,73 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(featured_products, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    @cache_catalog_response(CATALOG_TAG, CATEGORIES_TAG)
+    def facets(self, request):
+        """
+        Compteurs pour les filtres du catalogue
+        GET /api/products/facets/?search=...&category=...&min_price=...
+        
+        Mêmes filtres que la liste ; une seule requête d'agrégation
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(catalog_facets(queryset))
+    
     @action(detail=True, methods=['get'])
+    @cache_catalog_response(CATALOG_TAG, 'product:{pk}')
     def related(self, request, pk=None):
         """
         Endpoint pour les produits similaires
         GET /api/products/{id}/related/
+        
+        Lus depuis ProductRecommendation (build_recommendations) ; complétés
+        par les meilleures ventes de la catégorie pour les produits sans historique
         """
         product = self.get_object()
-        related = Product.objects.filter(
-            category=product.category,
-            is_active=True
-        ).exclude(id=product.id).order_by('-sales_count')[:3]
+        limit = 3
+        
+        related = list(
+            Product.objects.filter(
+                recommended_for__product=product,
+                is_active=True
+            ).select_related('category').order_by('recommended_for__rank')[:limit]
+        )
+        
+        if len(related) < limit:
+            related += Product.objects.filter(
+                category=product.category,
+                is_active=True
+            ).exclude(
+                id__in=[product.id] + [p.id for p in related]
+            ).select_related('category').order_by('-sales_count')[:limit - len(related)]
         
         serializer = ProductListSerializer(related, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint pour les avis
     GET /api/products/{product_id}/reviews/ - Liste des avis d'un produit
+    GET /api/products/{product_id}/reviews/?pagination=cursor - Liste paginée par curseur
     POST /api/products/{product_id}/reviews/ - Ajouter un avis (authentifié)
     PUT/PATCH /api/products/{product_id}/reviews/{id}/ - Modifier son avis
     DELETE /api/products/{product_id}/reviews/{id}/ - Supprimer son avis
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    ordering = ['-created_at']
     
     def get_queryset(self):
         """Filtrer les avis par produit"""
         product_id = self.kwargs.get('product_pk')
         if product_id:
-            return Review.objects.filter(product_id=product_id).order_by('-created_at')
-        return Review.objects.all()
+            return Review.objects.filter(product_id=product_id).select_related('user').order_by('-created_at')
+        return Review.objects.select_related('user')
+    
+    @conditional_view(review_list_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         """Créer un avis pour un produit"""
@@ -136,31 +274,68 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 "Vous avez déjà laissé un avis pour ce produit."
             )
         
-        # Sauvegarder l'avis
-        review = serializer.save(user=self.request.user, product=product)
-        
-        # Mettre à jour la note moyenne du produit
-        self.update_product_rating(product)
+        # Sauvegarder l'avis ; la note du produit est mise à jour dans la même
+        # transaction par products.signals (Product.objects.apply_review_delta)
+        with transaction.atomic():
+            serializer.save(user=self.request.user, product=product)
     
     def perform_update(self, serializer):
         """Mettre à jour un avis"""
-        review = serializer.save()
-        self.update_product_rating(review.product)
+        with transaction.atomic():
+            serializer.save()
     
     def perform_destroy(self, instance):
         """Supprimer un avis"""
-        product = instance.product
-        instance.delete()
-        self.update_product_rating(product)
-    
-    def update_product_rating(self, product):
-        """Recalculer la note moyenne d'un produit"""
-        reviews = Review.objects.filter(product=product)
-        if reviews.exists():
-            avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-            product.rating = round(avg_rating, 1)
-            product.reviews_count = reviews.count()
-        else:
-            product.rating = 0
-            product.reviews_count = 0
-        product.save()
\ No newline at end of file
+        with transaction.atomic():
+            instance.delete()
+
+
+class ProductFileViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint pour les fichiers d'un produit acheté
+    GET /api/products/{product_id}/files/ - Liste des fichiers
+    GET /api/products/{product_id}/files/{id}/download/ - Télécharger (Range / reprise supportés)
+    """
+    serializer_class = ProductFileSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ProductFile.objects.filter(product_id=self.kwargs.get('product_pk'))
+    
+    def get_entitlement(self):
+        """Droit d'accès de l'utilisateur au produit (None pour le staff sans achat)"""
+        entitlement = Entitlement.objects.filter(
+            user=self.request.user,
+            product_id=self.kwargs.get('product_pk')
+        ).only('order_id').first()
+        if entitlement is None and not self.request.user.is_staff:
+            raise PermissionDenied("Vous devez acheter ce produit pour accéder à ses fichiers.")
+        return entitlement
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.entitlement = self.get_entitlement()
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, product_pk=None, pk=None):
+        """Télécharger un fichier : transfert délégué au serveur web si configuré"""
+        product_file = self.get_object()
+        filename = product_file.name
+        extension = os.path.splitext(product_file.file.name)[1]
+        if extension and not filename.endswith(extension):
+            filename += extension
+        
+        response = serve_file(request, product_file.file, filename)
+        
+        # Une seule entrée par téléchargement : ni HEAD, ni les reprises (Range), ni les 304
+        range_header = request.headers.get('Range', '')
+        is_resume = bool(range_header) and not range_header.startswith('bytes=0-')
+        is_transfer = request.method == 'GET' and response.status_code in (200, 206)
+        if self.entitlement and is_transfer and not is_resume:
+            record_download(
+                request.user.pk,
+                product_file.product_id,
+                self.entitlement.order_id,
+                client_ip(request)
+            )
+        return response
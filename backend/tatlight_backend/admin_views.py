@@ -13,6 +13,9 @@ from decimal import Decimal
 
 from accounts.models import User
 from products.models import Product, Category, Review
+from products.search import search_products
+from .fieldsets import model_columns, only_columns, requested_fields
+from .images import variant_urls
 from orders.models import Order, OrderItem
 
 
@@ -119,7 +122,8 @@ def admin_top_products(request):
             'sales': product.sales_count,
             'revenue': float(revenue),
             'status': 'Actif' if product.is_active else 'Inactif',
-            'image': product.image.url if product.image else None
+            'image': product.image.url if product.image else None,
+            'image_variants': variant_urls(product.image_variants)
         })
     
     return Response(result)
@@ -162,7 +166,8 @@ def admin_recent_users(request):
             'email': user.email,
             'joined': joined,
             'purchases': purchases,
-            'avatar': user.avatar.url if user.avatar else None
+            'avatar': user.avatar.url if user.avatar else None,
+            'avatar_variants': variant_urls(user.avatar_variants)
         })
     
     return Response(result)
@@ -202,12 +207,54 @@ def admin_revenue_chart(request):
     return Response(data)
 
 
+# Champs des listes admin (sélectionnables via ?fields= / ?omit=)
+ADMIN_USER_FIELDS = {
+    'id': lambda user: user.id,
+    'name': lambda user: user.full_name,
+    'email': lambda user: user.email,
+    'date_joined': lambda user: user.date_joined.isoformat(),
+    'purchases': lambda user: user.purchases,
+    'loyalty_tier': lambda user: user.loyalty_tier,
+    'loyalty_points': lambda user: user.loyalty_points,
+    'total_spent': lambda user: float(user.total_spent),
+    'is_active': lambda user: user.is_active,
+    'avatar': lambda user: user.avatar.url if user.avatar else None,
+    'avatar_variants': lambda user: variant_urls(user.avatar_variants),
+}
+ADMIN_USER_COLUMNS = {
+    'name': ('first_name', 'last_name', 'email'),
+    'purchases': (),
+}
+
+ADMIN_PRODUCT_FIELDS = {
+    'id': lambda product: product.id,
+    'title': lambda product: product.title,
+    'slug': lambda product: product.slug,
+    'category': lambda product: product.category.get_name_display(),
+    'category_slug': lambda product: product.category.slug,
+    'file_type': lambda product: product.file_type,
+    'price': lambda product: float(product.price),
+    'rating': lambda product: product.rating,
+    'sales_count': lambda product: product.sales_count,
+    'is_active': lambda product: product.is_active,
+    'featured': lambda product: product.featured,
+    'image': lambda product: product.image.url if product.image else None,
+    'image_variants': lambda product: variant_urls(product.image_variants),
+    'created_at': lambda product: product.created_at.isoformat(),
+}
+ADMIN_PRODUCT_COLUMNS = {
+    'category': ('category__name',),
+    'category_slug': ('category__slug',),
+}
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def admin_all_users(request):
     """
     Liste complète des utilisateurs avec filtres
     GET /api/admin/users/
+    GET /api/admin/users/?fields=id,name,email | ?omit=avatar,avatar_variants
     """
     users = User.objects.all()
     
@@ -227,28 +274,21 @@ def admin_all_users(request):
     start = (page - 1) * per_page
     end = start + per_page
     
+    # ?fields= / ?omit= : colonnes et sous-requêtes limitées aux champs demandés
+    fields, _ = requested_fields(request, list(ADMIN_USER_FIELDS))
+    fields = fields or list(ADMIN_USER_FIELDS)
+    
     total = users.count()
-    users = users[start:end]
+    if 'purchases' in fields:
+        users = users.annotate(
+            purchases=Count('orders', filter=Q(orders__status='COMPLETED'))
+        )
+    users = only_columns(users, model_columns(User, fields, ADMIN_USER_COLUMNS))[start:end]
     
-    result = []
-    for user in users:
-        purchases = Order.objects.filter(
-            user=user,
-            status='COMPLETED'
-        ).count()
-        
-        result.append({
-            'id': user.id,
-            'name': user.full_name,
-            'email': user.email,
-            'date_joined': user.date_joined.isoformat(),
-            'purchases': purchases,
-            'loyalty_tier': user.loyalty_tier,
-            'loyalty_points': user.loyalty_points,
-            'total_spent': float(user.total_spent),
-            'is_active': user.is_active,
-            'avatar': user.avatar.url if user.avatar else None
-        })
+    result = [
+        {name: ADMIN_USER_FIELDS[name](user) for name in fields}
+        for user in users
+    ]
     
     return Response({
         'results': result,
@@ -265,16 +305,14 @@ def admin_all_products(request):
     """
     Liste complète des produits avec filtres
     GET /api/admin/products/
+    GET /api/admin/products/?fields=id,title,price | ?omit=image,image_variants
     """
     products = Product.objects.all()
     
     # Filtres
     search = request.query_params.get('search', '')
     if search:
-        products = products.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search)
-        )
+        products = search_products(products, search)
     
     category = request.query_params.get('category', '')
     if category:
@@ -291,26 +329,20 @@ def admin_all_products(request):
     start = (page - 1) * per_page
     end = start + per_page
     
+    fields, _ = requested_fields(request, list(ADMIN_PRODUCT_FIELDS))
+    fields = fields or list(ADMIN_PRODUCT_FIELDS)
+    products = only_columns(products, model_columns(Product, fields, ADMIN_PRODUCT_COLUMNS))
+    
     total = products.count()
-    products = products.order_by('-created_at')[start:end]
+    if 'search_score' in products.query.annotations:
+        products = products.order_by('-search_score', '-created_at')[start:end]
+    else:
+        products = products.order_by('-created_at')[start:end]
     
-    result = []
-    for product in products:
-        result.append({
-            'id': product.id,
-            'title': product.title,
-            'slug': product.slug,
-            'category': product.category.get_name_display(),
-            'category_slug': product.category.slug,
-            'file_type': product.file_type,
-            'price': float(product.price),
-            'rating': product.rating,
-            'sales_count': product.sales_count,
-            'is_active': product.is_active,
-            'featured': product.featured,
-            'image': product.image.url if product.image else None,
-            'created_at': product.created_at.isoformat()
-        })
+    result = [
+        {name: ADMIN_PRODUCT_FIELDS[name](product) for name in fields}
+        for product in products
+    ]
     
     return Response({
         'results': result,
@@ -349,7 +381,7 @@ def admin_toggle_product_status(request, product_id):
     try:
         product = Product.objects.get(id=product_id)
         product.is_active = not product.is_active
-        product.save()
+        product.save(update_fields=['is_active', 'updated_at'])
         
         return Response({
             'message': f"Produit {'activé' if product.is_active else 'désactivé'}",
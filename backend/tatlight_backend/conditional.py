@@ -0,0 +1,75 @@
+# backend/tatlight_backend/conditional.py
+"""
+GET conditionnels (ETag / Last-Modified) pour les vues DRF
+
+Les validateurs sont calculés AVANT la vue, à partir de données peu coûteuses
+(Max('updated_at') + Count pour une liste, horodatage de la ligne pour un
+détail) : si le client possède déjà la bonne version, on répond 304 sans
+charger ni sérialiser les objets.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def list_validators(queryset, field='updated_at'):
+    """(count, dernière modification) d'une liste, en une requête"""
+    stats = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max(field))
+    return [stats['count']], stats['last_modified']
+
+
+def object_validators(queryset, pk, field='updated_at'):
+    """Horodatage d'une ligne, None si elle n'existe pas (la vue répondra 404)"""
+    last_modified = queryset.order_by().filter(pk=pk).values_list(field, flat=True).first()
+    if last_modified is None:
+        return None
+    return [pk], last_modified
+
+
+def make_etag(request, parts):
+    """ETag faible : il dépend de la représentation (URL, format, utilisateur), pas des octets"""
+    user = request.user.pk if request.user.is_authenticated else None
+    renderer = getattr(request, 'accepted_media_type', '')
+    raw = repr((request.get_full_path(), renderer, user, parts))
+    return 'W/"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_view(validators):
+    """
+    Décorateur pour les méthodes GET d'une vue DRF.
+    `validators(view, request, *args, **kwargs)` retourne (parts, last_modified)
+    ou None pour désactiver la validation (la vue est alors exécutée normalement).
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            result = validators(self, request, *args, **kwargs)
+            if result is None:
+                return view_method(self, request, *args, **kwargs)
+
+            parts, last_modified = result
+            etag = make_etag(request, parts)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,34 @@
+# backend/tatlight_backend/db_operations.py
+"""
+Opérations de migration dépendant du moteur
+
+AddIndexConcurrently : sur PostgreSQL, CREATE INDEX CONCURRENTLY via
+django.contrib.postgres (pas de verrou bloquant les écritures pendant la
+construction) ; ailleurs (SQLite en local), AddIndex classique. La migration
+doit déclarer `atomic = False`.
+"""
+
+from django.db import migrations
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex construit sans bloquer les écritures sur PostgreSQL"""
+
+    def _postgres_operation(self):
+        # Import tardif : django.contrib.postgres exige psycopg, inutile sous SQLite
+        from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndexConcurrently
+
+        return PostgresAddIndexConcurrently(self.model_name, self.index)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return self._postgres_operation().database_forwards(app_label, schema_editor, from_state, to_state)
+        return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return self._postgres_operation().database_backwards(app_label, schema_editor, from_state, to_state)
+        return super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f"Concurrently create index {self.index.name} on field(s) {', '.join(self.index.fields)} of model {self.model_name}"
@@ -0,0 +1,161 @@
+# backend/tatlight_backend/downloads.py
+"""
+Livraison de fichiers protégés (formations vidéo, instrumentales...)
+
+Django vérifie les droits puis délègue le transfert :
+- DOWNLOADS_SENDFILE_BACKEND = 'nginx'  -> X-Accel-Redirect vers DOWNLOADS_ACCEL_PREFIX
+- DOWNLOADS_SENDFILE_BACKEND = 'apache' -> X-Sendfile (chemin absolu)
+- sinon FileResponse : le serveur WSGI utilise wsgi.file_wrapper (sendfile)
+  quand le fichier a un descripteur, y compris pour une plage d'octets.
+
+Requêtes conditionnelles (ETag / Last-Modified) et plages (Range / If-Range)
+sont gérées dans tous les cas, pour reprendre un téléchargement interrompu.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_validators(field_file):
+    """(etag, last_modified) d'un fichier stocké ; last_modified peut être None"""
+    storage = field_file.storage
+    size = field_file.size
+    try:
+        last_modified = int(storage.get_modified_time(field_file.name).timestamp())
+    except (NotImplementedError, OSError):
+        last_modified = None
+    etag = f'"{size:x}-{last_modified or 0:x}"'
+    return etag, last_modified
+
+
+def parse_range(header, size):
+    """
+    Plage demandée sous forme (début, fin) inclusifs.
+    None : en-tête absent, invalide ou multi-plages (on sert le fichier entier).
+    False : plage non satisfiable (416).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-500 : les 500 derniers octets
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range : la plage n'est servie que si le fichier n'a pas changé"""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    since = parse_http_date_safe(value)
+    return since is not None and last_modified is not None and last_modified <= since
+
+
+class RangeFile:
+    """
+    Vue en lecture seule sur [début, fin] d'un fichier déjà positionné.
+    fileno() est conservé pour que gunicorn puisse utiliser sendfile (il lit la
+    position courante et s'arrête à Content-Length).
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+        if hasattr(file, 'fileno'):
+            self.fileno = file.fileno
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _sendfile_response(field_file, content_type):
+    backend = settings.DOWNLOADS_SENDFILE_BACKEND
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.DOWNLOADS_ACCEL_PREFIX + field_file.name)
+        return response
+    if backend == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+    return None
+
+
+def serve_file(request, field_file, filename=None):
+    """
+    Réponse HTTP pour un FieldFile, après contrôle des droits par l'appelant.
+    Retourne 200, 206, 304, 412 ou 416.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    etag, last_modified = file_validators(field_file)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _sendfile_response(field_file, content_type)
+
+    if response is None:
+        size = field_file.size
+        byte_range = None
+        if if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        else:
+            file = field_file.storage.open(field_file.name, 'rb')
+            if byte_range:
+                start, end = byte_range
+                file.seek(start)
+                response = FileResponse(RangeFile(file, end - start + 1), status=206, content_type=content_type)
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = end - start + 1
+            else:
+                response = FileResponse(file, content_type=content_type)
+
+    # En-têtes communs (y compris 304, pour que le client garde ses validateurs)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, no-transform'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or None
@@ -0,0 +1,147 @@
+# backend/tatlight_backend/fieldsets.py
+"""
+Sparse fieldsets : ?fields= et ?omit=
+
+    ?fields=id,title,price   -> uniquement ces champs
+    ?fields=card             -> profil prédéfini par le serializer (field_profiles)
+    ?omit=description        -> tous les champs sauf ceux-ci
+
+La sélection réduit la sortie du serializer ET le SELECT SQL (queryset.only()),
+les colonnes inutiles ne sont donc jamais lues en base.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def requested_fields(request, available, profiles=None):
+    """
+    (champs, profil) demandés par le client, dans l'ordre de `available`.
+    champs vaut None si le client n'a rien demandé (représentation complète).
+    """
+    params = request.query_params
+    fields_value = params.get(FIELDS_PARAM, '').strip()
+    omit = set(_split(params.get(OMIT_PARAM, '')))
+    if not fields_value and not omit:
+        return None, None
+
+    profile = fields_value if fields_value in (profiles or {}) else None
+    if profile:
+        selected = set(profiles[profile])
+    elif fields_value:
+        selected = set(_split(fields_value))
+    else:
+        selected = set(available)
+
+    selected -= omit
+    selected.add('id')  # toujours présent : clé côté client
+    return [name for name in available if name in selected], profile
+
+
+def model_columns(model, fields, field_columns=None):
+    """
+    Colonnes à charger pour ces champs de serializer.
+    field_columns : {champ: (colonnes...)} pour les champs calculés ou relationnels ;
+    par défaut un champ portant le nom d'un champ du modèle charge cette colonne.
+    """
+    field_columns = field_columns or {}
+    columns = {model._meta.pk.name}
+    for name in fields:
+        if name in field_columns:
+            columns.update(field_columns[name])
+            continue
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        columns.add(name)
+    return columns
+
+
+def only_columns(queryset, columns):
+    """queryset.only(), en ne gardant que les select_related utiles"""
+    related = {column.split('__', 1)[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns, *related)
+
+
+class SparseFieldsetSerializerMixin:
+    """Serializer : ne garde que les champs listés dans context['fields']"""
+
+    # {'nom': (champs...)} : profils utilisables via ?fields=nom
+    field_profiles = {}
+    # {champ: (colonnes...)} : colonnes nécessaires aux champs calculés
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet : lit ?fields=/?omit= pour les actions de `sparse_actions`,
+    les transmet au serializer et restreint le SELECT via restrict_queryset()
+    """
+
+    sparse_actions = ('list',)
+
+    def get_sparse_fields(self):
+        """(champs, profil) ; (None, None) = représentation complète"""
+        if getattr(self, 'action', None) not in self.sparse_actions:
+            return None, None
+        if not hasattr(self, '_sparse_fields'):
+            serializer_class = self.get_serializer_class()
+            self._sparse_fields = requested_fields(
+                self.request,
+                list(serializer_class.Meta.fields),
+                getattr(serializer_class, 'field_profiles', None),
+            )
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, _ = self.get_sparse_fields()
+        if fields is not None:
+            context['fields'] = fields
+        return context
+
+    def get_ordering_columns(self, model):
+        """Champ de tri : lu par la pagination par curseur, il doit rester chargé"""
+        requested = self.request.query_params.get('ordering', '').split(',')
+        candidates = [name.strip().lstrip('-') for name in requested]
+        candidates = [name for name in candidates if name in (getattr(self, 'ordering_fields', None) or ())]
+        ordering = getattr(self, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        candidates += [name.lstrip('-') for name in ordering]
+
+        columns = set()
+        for name in candidates:
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            columns.add(name)
+        return columns
+
+    def restrict_queryset(self, queryset):
+        fields, _ = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        columns = model_columns(queryset.model, fields, getattr(serializer_class, 'field_columns', None))
+        columns |= self.get_ordering_columns(queryset.model)
+        return only_columns(queryset, columns)
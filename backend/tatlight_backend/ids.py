@@ -0,0 +1,60 @@
+# backend/tatlight_backend/ids.py
+"""
+Identifiants UUID ordonnés dans le temps (UUIDv7, RFC 9562)
+
+48 bits de timestamp Unix en millisecondes, puis 12 bits de séquence et 62
+bits aléatoires. Les nouvelles clés arrivent à la fin des index B-tree (clé
+primaire et clés étrangères qui la référencent) au lieu d'une page au hasard
+comme uuid4. Les valeurs restent des UUID valides : les anciennes clés uuid4
+cohabitent avec les nouvelles.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+SEQUENCE_MASK = 0xFFF
+
+
+def uuid7():
+    """
+    UUIDv7 strictement croissant dans le processus : dans une même
+    milliseconde, la séquence (12 bits) est incrémentée ; si elle déborde, le
+    timestamp est avancé d'une milliseconde
+    """
+    global _last_ms, _sequence
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Départ aléatoire dans la moitié basse : place pour incrémenter
+            _sequence = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        else:
+            _sequence += 1
+            if _sequence > SEQUENCE_MASK:
+                _last_ms += 1
+                _sequence = 0
+        timestamp_ms, sequence = _last_ms, _sequence
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | sequence << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7_datetime(value):
+    """Date de création d'un UUIDv7 (UTC), None pour une autre version"""
+    if value is None or value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
@@ -0,0 +1,123 @@
+# backend/tatlight_backend/images.py
+"""
+Variantes responsives des images (Product.image, User.avatar)
+
+Pour chaque image envoyée, on génère des miniatures WebP et JPEG à largeur fixe :
+    products/photo.png -> products/variants/photo-png-320w.webp, products/variants/photo-png-320w.jpg
+L'extension d'origine fait partie du nom : photo.png et photo.jpg n'écrasent pas leurs variantes.
+Les noms générés sont stockés dans un JSONField du modèle ({'320': {'webp': ..., 'jpeg': ...}}),
+les serializers n'ont donc jamais besoin d'interroger le stockage.
+"""
+
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 640)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(name, width, extension):
+    directory, filename = os.path.split(name)
+    stem, source_extension = os.path.splitext(filename)
+    if source_extension:
+        stem = f"{stem}-{source_extension.lstrip('.').lower()}"
+    return os.path.join(directory, 'variants', f'{stem}-{width}w.{extension}')
+
+
+def _flatten(image):
+    """JPEG ne gère pas la transparence : fond blanc"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(name, storage=default_storage):
+    """Générer toutes les variantes d'une image et retourner leurs noms"""
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    variants = {}
+    for width in VARIANT_WIDTHS:
+        # Pas d'agrandissement : on s'arrête à la largeur d'origine
+        if width > original.width and variants:
+            break
+
+        resized = original.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+
+        formats = {}
+        for key, (pil_format, extension, params) in VARIANT_FORMATS.items():
+            image = resized if pil_format == 'WEBP' else _flatten(resized)
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **params)
+
+            target = variant_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            formats[key] = storage.save(target, ContentFile(buffer.getvalue()))
+
+        variants[str(width)] = formats
+
+    return variants
+
+
+def update_image_variants(model, pk, field, variants_field):
+    """Tâche : (re)générer les variantes d'une instance si l'image n'a pas changé entre-temps"""
+    name = model._default_manager.filter(pk=pk).values_list(field, flat=True).first()
+    if not name:
+        return
+
+    try:
+        variants = generate_variants(name)
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("Impossible de générer les variantes de %s", name, exc_info=True)
+        return
+
+    model._default_manager.filter(pk=pk, **{field: name}).update(**{variants_field: variants})
+
+
+def schedule_image_variants(instance, field, variants_field):
+    """Planifier la génération après le commit, sur le pool de tâches"""
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(
+        lambda: run_in_background(update_image_variants, model, pk, field, variants_field)
+    )
+
+
+def variant_urls(variants, request=None, storage=default_storage):
+    """{'320': {'webp': <url>, 'jpeg': <url>}} à partir des noms stockés"""
+    urls = {}
+    for width, formats in (variants or {}).items():
+        urls[width] = {}
+        for key, name in formats.items():
+            url = storage.url(name)
+            urls[width][key] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def smallest_variant_url(variants, key='webp', storage=default_storage):
+    """URL de la plus petite variante (aperçus admin), None si non générée"""
+    if not variants:
+        return None
+    width = min(variants, key=int)
+    name = variants[width].get(key)
+    return storage.url(name) if name else None
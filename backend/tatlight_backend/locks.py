@@ -0,0 +1,59 @@
+# backend/tatlight_backend/locks.py
+"""
+Verrous exclusifs entre processus et entre machines (tâches planifiées)
+
+- PostgreSQL : verrou consultatif de session (pg_try_advisory_lock), libéré
+  en fin de bloc ou par le serveur si le processus meurt.
+- Autres bases : cache.add() sur le cache par défaut, qui doit être partagé
+  (redis, fichiers...) ; un cache locmem n'est visible que du processus
+  courant et ne protège de rien.
+"""
+
+import hashlib
+from contextlib import contextmanager
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+
+def advisory_key(name):
+    """Clé bigint stable dérivée du nom du verrou"""
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@contextmanager
+def exclusive_lock(name, timeout):
+    """
+    Verrou non bloquant : le bloc reçoit True si le verrou est obtenu, False
+    s'il est déjà tenu ailleurs. timeout (secondes) borne la durée du verrou
+    en cache si le processus meurt sans le libérer.
+    """
+    if connection.vendor == 'postgresql':
+        key = advisory_key(name)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+        return
+
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"Verrou « {name} » : le cache par défaut est propre au processus, "
+            "configurez un cache partagé (CACHE_URL) ou PostgreSQL"
+        )
+    cache_key = f'lock:{name}'
+    acquired = cache.add(cache_key, 1, timeout=timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(cache_key)
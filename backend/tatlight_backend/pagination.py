@@ -0,0 +1,174 @@
+# backend/tatlight_backend/pagination.py
+"""
+Pagination par curseur (keyset)
+
+Contrairement à PageNumberPagination, aucune requête COUNT(*) ni OFFSET :
+chaque page est lue par `WHERE champ <= v AND (champ < v OR (champ = v AND
+id < dernier id))`, équivalent de `(champ, id) < (v, dernier id)` dont la
+borne de tête permet un parcours d'index à partir du curseur : le coût
+d'une page reste constant quelle que soit la profondeur.
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(queryset, field, descending, value, pk):
+    """
+    Lignes situées après (valeur, pk) dans l'ordre (champ, pk).
+    Borne de plage en tête (champ <= valeur) : l'index (champ, id) est
+    parcouru à partir du curseur, le OR ne fait que départager les égalités.
+    """
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(**{f'{field}__{op}e': value}),
+        Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk})
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset sur un champ de tri + la clé primaire comme départage.
+    Le champ de tri vient de ?ordering= (parmi view.ordering_fields), sinon
+    du tri par défaut de la vue.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    default_ordering = '-created_at'
+
+    def __init__(self, ordering_fields=None, default_ordering=None):
+        self.ordering_fields = ordering_fields
+        if default_ordering:
+            self.default_ordering = default_ordering
+
+    @classmethod
+    def is_requested(cls, request):
+        """Mode opt-in : ?cursor=... ou ?pagination=cursor"""
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def get_ordering(self, request, queryset, view):
+        allowed = self.ordering_fields
+        if allowed is None:
+            allowed = getattr(view, 'ordering_fields', None) or ()
+
+        requested = request.query_params.get(self.ordering_param, '').split(',')[0].strip()
+        if requested and requested.lstrip('-') in allowed:
+            return requested
+
+        # Pas de curseur sur la pertinence (search_score) : un score flottant
+        # ne se compare pas de façon fiable par égalité. Une recherche paginée
+        # par curseur suit donc le tri de la vue (pagination classique pour
+        # le tri par pertinence).
+        view_ordering = getattr(view, 'ordering', None)
+        if isinstance(view_ordering, (list, tuple)) and view_ordering:
+            return view_ordering[0]
+        return view_ordering or self.default_ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # Encodage du curseur
+
+    def encode_cursor(self, ordering, value, pk):
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        payload = json.dumps({'o': ordering, 'v': value, 'pk': str(pk)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, raw, ordering, queryset):
+        try:
+            padded = raw + '=' * (-len(raw) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload['o'] != ordering:
+                raise ValueError('ordering mismatch')
+
+            model = queryset.model
+            value = model._meta.get_field(ordering.lstrip('-')).to_python(payload['v'])
+            pk = model._meta.pk.to_python(payload['pk'])
+        except (KeyError, TypeError, ValueError, ValidationError, FieldDoesNotExist):
+            raise NotFound('Curseur invalide.')
+        return value, pk
+
+    # API BasePagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.page_size_value = self.get_page_size(request)
+
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        queryset = queryset.order_by(self.ordering, '-pk' if descending else 'pk')
+
+        raw_cursor = request.query_params.get(self.cursor_query_param)
+        if raw_cursor:
+            value, pk = self.decode_cursor(raw_cursor, self.ordering, queryset)
+            queryset = keyset_filter(queryset, field, descending, value, pk)
+
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(self.ordering, getattr(last, field), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Pour les ViewSets : bascule sur KeysetPagination quand le client le demande,
+    sinon conserve DEFAULT_PAGINATION_CLASS
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.keyset_pagination_class.is_requested(self.request):
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
@@ -108,6 +108,35 @@ DATABASES = {
 }
 
 
+# Cache
+# Local: locmemcache:// ou filecache:///tmp/tatlight-cache
+# Production (partagé entre workers): redis://host:6379/1
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Cache des réponses publiques du catalogue (products.cache)
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=60 * 15)
+
+
+# Tâches en arrière-plan (tatlight_backend.tasks)
+BACKGROUND_WORKERS = env.int('BACKGROUND_WORKERS', default=2)
+BACKGROUND_TASKS_EAGER = env.bool('BACKGROUND_TASKS_EAGER', default=False)
+
+
+# Téléchargement des fichiers produits (tatlight_backend.downloads)
+# 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile) ou '' (FileResponse)
+DOWNLOADS_SENDFILE_BACKEND = env('DOWNLOADS_SENDFILE_BACKEND', default='')
+# Location nginx "internal" pointant sur MEDIA_ROOT
+DOWNLOADS_ACCEL_PREFIX = env('DOWNLOADS_ACCEL_PREFIX', default='/protected-media/')
+
+# Historique des téléchargements bufferisé (orders.download_log)
+DOWNLOAD_LOG_BATCH_SIZE = env.int('DOWNLOAD_LOG_BATCH_SIZE', default=200)
+DOWNLOAD_LOG_FLUSH_INTERVAL = env.int('DOWNLOAD_LOG_FLUSH_INTERVAL', default=5)
+DOWNLOAD_LOG_SPOOL_DIR = env('DOWNLOAD_LOG_SPOOL_DIR', default=str(BASE_DIR / 'var' / 'download-spool'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -211,6 +240,29 @@ LOYALTY_TIERS = {
     'PLATINUM': {'min_points': 1000, 'discount': 15},
 }
 
+# Points de fidélité gagnés par euro dépensé (User.record_purchase)
+POINTS_PER_EURO = env.int('POINTS_PER_EURO', default=1)
+
+
+# Paiements Flutterwave
+# Secret "verif-hash" configuré sur le dashboard Flutterwave (webhooks)
+FLUTTERWAVE_SECRET_HASH = env('FLUTTERWAVE_SECRET_HASH', default='')
+FLUTTERWAVE_CURRENCY = env('FLUTTERWAVE_CURRENCY', default='EUR')
+FLUTTERWAVE_SECRET_KEY = env('FLUTTERWAVE_SECRET_KEY', default='')
+FLUTTERWAVE_BASE_URL = env('FLUTTERWAVE_BASE_URL', default='https://api.flutterwave.com/v3')
+# Client HTTP partagé (payments.flutterwave) : délais en secondes, reprises, disjoncteur
+FLUTTERWAVE_CONNECT_TIMEOUT = env.float('FLUTTERWAVE_CONNECT_TIMEOUT', default=3.05)
+FLUTTERWAVE_READ_TIMEOUT = env.float('FLUTTERWAVE_READ_TIMEOUT', default=10)
+FLUTTERWAVE_MAX_RETRIES = env.int('FLUTTERWAVE_MAX_RETRIES', default=2)
+FLUTTERWAVE_POOL_SIZE = env.int('FLUTTERWAVE_POOL_SIZE', default=10)
+FLUTTERWAVE_BREAKER_THRESHOLD = env.int('FLUTTERWAVE_BREAKER_THRESHOLD', default=5)
+FLUTTERWAVE_BREAKER_RESET_TIMEOUT = env.int('FLUTTERWAVE_BREAKER_RESET_TIMEOUT', default=30)
+# Durée de validité des liens de paiement (minutes, 1440 au maximum chez Flutterwave)
+FLUTTERWAVE_PAYMENT_LINK_LIFETIME = env.int('FLUTTERWAVE_PAYMENT_LINK_LIFETIME', default=60 * 24)
+# Cache des vérifications par tx_ref (payments.verification) : transaction réussie / autres états
+PAYMENT_VERIFICATION_FINAL_TIMEOUT = env.int('PAYMENT_VERIFICATION_FINAL_TIMEOUT', default=60 * 60 * 24)
+PAYMENT_VERIFICATION_PENDING_TIMEOUT = env.int('PAYMENT_VERIFICATION_PENDING_TIMEOUT', default=5)
+
 
 
 
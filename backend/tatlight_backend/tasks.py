@@ -0,0 +1,46 @@
+# backend/tatlight_backend/tasks.py
+"""
+Exécution de tâches hors du cycle requête/réponse
+
+Pool de threads partagé par le processus (un par worker gunicorn). Suffisant
+pour des tâches courtes (miniatures, journalisation) ; les tâches doivent être
+idempotentes car elles sont perdues si le processus s'arrête.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='tatlight-worker'
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Échec de la tâche %s", getattr(func, '__name__', func))
+    finally:
+        # Les threads du pool ne passent pas par request_finished
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Planifier func(*args, **kwargs) sur le pool (synchrone si BACKGROUND_TASKS_EAGER)"""
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return get_executor().submit(_run, func, args, kwargs)